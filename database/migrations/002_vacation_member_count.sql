@@ -0,0 +1,39 @@
+-- Maintained member counts and a covering membership index
+-- Lets the trip list read a user's vacations through one index range scan
+-- instead of counting every member of every trip on each request
+
+-- Member count kept in step with vacation_members by a trigger
+ALTER TABLE vacations ADD COLUMN IF NOT EXISTS member_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE vacations v
+SET member_count = counts.member_count
+FROM (
+    SELECT vacation_id, COUNT(*) AS member_count
+    FROM vacation_members
+    GROUP BY vacation_id
+) counts
+WHERE counts.vacation_id = v.id AND v.member_count <> counts.member_count;
+
+CREATE OR REPLACE FUNCTION update_vacation_member_count()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE vacations SET member_count = member_count + 1 WHERE id = NEW.vacation_id;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE vacations SET member_count = member_count - 1 WHERE id = OLD.vacation_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS update_vacation_member_count ON vacation_members;
+CREATE TRIGGER update_vacation_member_count
+    AFTER INSERT OR DELETE OR UPDATE OF vacation_id ON vacation_members
+    FOR EACH ROW EXECUTE FUNCTION update_vacation_member_count();
+
+-- (user_id, vacation_id) answers "which trips is this user on" from the
+-- index alone; it also covers every lookup the user_id index served
+CREATE INDEX IF NOT EXISTS idx_vacation_members_user_vacation
+    ON vacation_members(user_id, vacation_id) INCLUDE (role);
+DROP INDEX IF EXISTS idx_vacation_members_user_id;
@@ -0,0 +1,41 @@
+-- Composite indexes matching how the API reads each table
+-- Every per-vacation list filters on the parent ID and sorts on date/time or
+-- creation order; with only single-column indexes Postgres fetches all of a
+-- vacation's rows and sorts them. These indexes return rows already in
+-- order, so a page stops after LIMIT rows and keyset cursors seek directly.
+-- Each replaces the single-column index it makes redundant.
+
+-- Events: list_events keyset order (untimed events last within a day)
+CREATE INDEX IF NOT EXISTS idx_events_vacation_schedule
+    ON events(vacation_id, event_date, (event_time IS NULL), (COALESCE(event_time, '00:00'::time)), id);
+DROP INDEX IF EXISTS idx_events_vacation_id;
+DROP INDEX IF EXISTS idx_events_date;
+
+-- Excursions: per-vacation schedule order
+CREATE INDEX IF NOT EXISTS idx_excursions_vacation_schedule
+    ON excursions(vacation_id, start_date, start_time, id);
+DROP INDEX IF EXISTS idx_excursions_vacation_id;
+
+-- Packing items: grouped by category, then name
+CREATE INDEX IF NOT EXISTS idx_packing_items_vacation_category
+    ON packing_items(vacation_id, category, item_name, id);
+DROP INDEX IF EXISTS idx_packing_items_vacation_id;
+
+-- Itineraries: a user's itineraries for one vacation
+CREATE INDEX IF NOT EXISTS idx_itineraries_vacation_user
+    ON itineraries(vacation_id, user_id, created_at, id);
+DROP INDEX IF EXISTS idx_itineraries_vacation_id;
+
+-- Itinerary items: schedule order within an itinerary
+CREATE INDEX IF NOT EXISTS idx_itinerary_items_schedule
+    ON itinerary_items(itinerary_id, scheduled_date, scheduled_time, display_order, id);
+DROP INDEX IF EXISTS idx_itinerary_items_itinerary_id;
+
+-- Photos: newest uploads first per vacation
+CREATE INDEX IF NOT EXISTS idx_photos_vacation_uploaded
+    ON photos(vacation_id, uploaded_at, id);
+DROP INDEX IF EXISTS idx_photos_vacation_id;
+
+-- vacation_members(vacation_id) is the leading column of the
+-- UNIQUE (vacation_id, user_id) index already
+DROP INDEX IF EXISTS idx_vacation_members_vacation_id;
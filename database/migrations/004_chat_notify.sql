@@ -0,0 +1,16 @@
+-- Wake long-polling chat readers when a message is posted
+-- Each vacation has its own channel, chat_<vacation id without dashes>;
+-- the payload is the message ID. Notifications are sent on commit.
+
+CREATE OR REPLACE FUNCTION notify_chat_message()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('chat_' || replace(NEW.vacation_id::text, '-', ''), NEW.id::text);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS notify_chat_message ON chat_messages;
+CREATE TRIGGER notify_chat_message
+    AFTER INSERT ON chat_messages
+    FOR EACH ROW EXECUTE FUNCTION notify_chat_message();
@@ -0,0 +1,15 @@
+-- Two-phase photo uploads
+-- A photo row is created as 'pending' when its upload URL is issued and
+-- becomes 'ready' once the S3 upload event has been processed (or 'failed').
+-- Existing rows were uploaded through the API and are ready already.
+
+ALTER TABLE photos ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'ready';
+ALTER TABLE photos ALTER COLUMN status SET DEFAULT 'pending';
+ALTER TABLE photos ADD COLUMN IF NOT EXISTS upload_id VARCHAR(1024);  -- S3 multipart upload ID
+ALTER TABLE photos ADD COLUMN IF NOT EXISTS width INTEGER;
+ALTER TABLE photos ADD COLUMN IF NOT EXISTS height INTEGER;
+ALTER TABLE photos ADD COLUMN IF NOT EXISTS thumbnail_s3_key VARCHAR(500);
+ALTER TABLE photos ALTER COLUMN file_size TYPE BIGINT;
+
+-- S3 events identify the photo by its object key
+CREATE UNIQUE INDEX IF NOT EXISTS idx_photos_s3_key ON photos(s3_bucket, s3_key);
@@ -0,0 +1,104 @@
+-- Precomputed recommendations
+-- recommendations holds each vacation's scored results, written by the
+-- refresh job and read as-is by the API. recommendation_state records when
+-- a vacation's set was computed and from what, and is flagged stale by
+-- triggers when anything the scores depend on changes.
+
+-- score is a keyset sort key, so it is double precision: a REAL cursor
+-- value sent back by the client would compare unequal to the stored float4
+ALTER TABLE recommendations ADD COLUMN IF NOT EXISTS score DOUBLE PRECISION NOT NULL DEFAULT 0;
+ALTER TABLE recommendations ADD COLUMN IF NOT EXISTS reason TEXT;
+
+-- Reads filter by category and page in score order
+CREATE INDEX IF NOT EXISTS idx_recommendations_vacation_category_score
+    ON recommendations(vacation_id, category, score, id);
+DROP INDEX IF EXISTS idx_recommendations_vacation_id;
+
+CREATE TABLE IF NOT EXISTS recommendation_state (
+    vacation_id UUID PRIMARY KEY REFERENCES vacations(id) ON DELETE CASCADE,
+    stale BOOLEAN NOT NULL DEFAULT TRUE,
+    computed_at TIMESTAMP WITH TIME ZONE,
+    inputs_hash VARCHAR(64),               -- sha256 of the inputs last scored
+    refresh_requested_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Reads request a refresh by stamping refresh_requested_at; the scheduled
+-- sweep picks those up first
+CREATE INDEX IF NOT EXISTS idx_recommendation_state_requested
+    ON recommendation_state(refresh_requested_at)
+    WHERE refresh_requested_at IS NOT NULL;
+
+-- Events and excursions feed the scores (already planned, repeated themes).
+-- The updates are unconditional on purpose: a refresh holds the state row
+-- locked while it scores, so a change made meanwhile waits for it and then
+-- flags the new set stale instead of being lost.
+-- Inserts and deletes flag each vacation once per statement, so bulk
+-- writes cost one update rather than one per row
+CREATE OR REPLACE FUNCTION mark_recommendations_stale()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE recommendation_state SET stale = TRUE
+    WHERE vacation_id IN (SELECT DISTINCT vacation_id FROM changed_rows);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- Title changes
+CREATE OR REPLACE FUNCTION mark_row_recommendations_stale()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE recommendation_state SET stale = TRUE WHERE vacation_id = NEW.vacation_id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+-- The vacation's own location, vibe and dates
+CREATE OR REPLACE FUNCTION mark_vacation_recommendations_stale()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE recommendation_state SET stale = TRUE WHERE vacation_id = NEW.id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS events_insert_recommendations_stale ON events;
+CREATE TRIGGER events_insert_recommendations_stale
+    AFTER INSERT ON events REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_recommendations_stale();
+
+DROP TRIGGER IF EXISTS events_delete_recommendations_stale ON events;
+CREATE TRIGGER events_delete_recommendations_stale
+    AFTER DELETE ON events REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_recommendations_stale();
+
+DROP TRIGGER IF EXISTS events_update_recommendations_stale ON events;
+CREATE TRIGGER events_update_recommendations_stale
+    AFTER UPDATE OF title ON events
+    FOR EACH ROW WHEN (OLD.title IS DISTINCT FROM NEW.title)
+    EXECUTE FUNCTION mark_row_recommendations_stale();
+
+DROP TRIGGER IF EXISTS excursions_insert_recommendations_stale ON excursions;
+CREATE TRIGGER excursions_insert_recommendations_stale
+    AFTER INSERT ON excursions REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_recommendations_stale();
+
+DROP TRIGGER IF EXISTS excursions_delete_recommendations_stale ON excursions;
+CREATE TRIGGER excursions_delete_recommendations_stale
+    AFTER DELETE ON excursions REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION mark_recommendations_stale();
+
+DROP TRIGGER IF EXISTS excursions_update_recommendations_stale ON excursions;
+CREATE TRIGGER excursions_update_recommendations_stale
+    AFTER UPDATE OF title ON excursions
+    FOR EACH ROW WHEN (OLD.title IS DISTINCT FROM NEW.title)
+    EXECUTE FUNCTION mark_row_recommendations_stale();
+
+DROP TRIGGER IF EXISTS vacations_recommendations_stale ON vacations;
+CREATE TRIGGER vacations_recommendations_stale
+    AFTER UPDATE OF location, vibe, start_date, end_date ON vacations
+    FOR EACH ROW
+    WHEN (OLD.location IS DISTINCT FROM NEW.location
+          OR OLD.vibe IS DISTINCT FROM NEW.vibe
+          OR OLD.start_date IS DISTINCT FROM NEW.start_date
+          OR OLD.end_date IS DISTINCT FROM NEW.end_date)
+    EXECUTE FUNCTION mark_vacation_recommendations_stale();
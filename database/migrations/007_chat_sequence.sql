@@ -0,0 +1,51 @@
+-- Commit-ordered chat messages
+-- Delta reads return messages after the last one a client saw. Ordered by
+-- created_at, a message whose transaction committed after a later-stamped
+-- one had been delivered fell behind every reader's position and was
+-- never delivered. seq is numbered per vacation from a counter row that
+-- stays locked until the inserting transaction ends, so messages of a
+-- vacation commit in seq order and a reader that has seen seq n has
+-- already been able to see everything before it.
+
+ALTER TABLE chat_messages ADD COLUMN IF NOT EXISTS seq BIGINT;
+
+CREATE TABLE IF NOT EXISTS chat_sequences (
+    vacation_id UUID PRIMARY KEY REFERENCES vacations(id) ON DELETE CASCADE,
+    last_seq BIGINT NOT NULL
+);
+
+-- Number existing messages in their created_at order
+UPDATE chat_messages c SET seq = n.seq
+FROM (
+    SELECT id, ROW_NUMBER() OVER (PARTITION BY vacation_id ORDER BY created_at, id) AS seq
+    FROM chat_messages
+) n
+WHERE c.id = n.id AND c.seq IS NULL;
+
+INSERT INTO chat_sequences (vacation_id, last_seq)
+SELECT vacation_id, MAX(seq) FROM chat_messages GROUP BY vacation_id
+ON CONFLICT (vacation_id) DO UPDATE SET last_seq = GREATEST(chat_sequences.last_seq, EXCLUDED.last_seq);
+
+ALTER TABLE chat_messages ALTER COLUMN seq SET NOT NULL;
+
+CREATE OR REPLACE FUNCTION assign_chat_message_seq()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO chat_sequences AS s (vacation_id, last_seq)
+    VALUES (NEW.vacation_id, 1)
+    ON CONFLICT (vacation_id) DO UPDATE SET last_seq = s.last_seq + 1
+    RETURNING s.last_seq INTO NEW.seq;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS assign_chat_message_seq ON chat_messages;
+CREATE TRIGGER assign_chat_message_seq
+    BEFORE INSERT ON chat_messages
+    FOR EACH ROW EXECUTE FUNCTION assign_chat_message_seq();
+
+-- History and deltas both page on seq. The index replaces the
+-- single-column ones, like those in 003
+CREATE UNIQUE INDEX IF NOT EXISTS idx_chat_messages_vacation_seq ON chat_messages(vacation_id, seq);
+DROP INDEX IF EXISTS idx_chat_messages_vacation_id;
+DROP INDEX IF EXISTS idx_chat_messages_created_at;
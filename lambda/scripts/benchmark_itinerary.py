@@ -0,0 +1,112 @@
+"""
+Benchmark itinerary conflict detection
+
+Builds a synthetic long trip (by default a six-week cruise with hundreds of
+events, excursions and custom items) and times the sweep-line overlap search
+used by the itinerary API against comparing every pair, then times building
+the whole timeline. No database is needed.
+
+Usage:
+    python lambda/scripts/benchmark_itinerary.py [--weeks 6] [--per-day 20] [--runs 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(SCRIPTS_DIR, '..', 'src')
+
+sys.path.insert(0, SRC_DIR)
+
+from utils.timeline import find_overlaps  # noqa: E402
+from controllers.itinerary import _build_timeline  # noqa: E402
+
+
+def make_rows(weeks: int, per_day: int, seed: int = 7):
+    """Timeline query rows for a synthetic trip"""
+    rng = random.Random(seed)
+    start = date(2026, 6, 1)
+    rows = []
+
+    for day in range(weeks * 7):
+        for _ in range(per_day):
+            kind = rng.choice(('event', 'event', 'excursion', 'custom'))
+            scheduled = start + timedelta(days=day)
+            starts_at = datetime.combine(scheduled, datetime.min.time()) + timedelta(
+                minutes=rng.randrange(6 * 60, 23 * 60, 15)
+            )
+            ends_at = starts_at + timedelta(minutes=rng.choice((30, 60, 90, 180, 480)))
+            timed = rng.random() > 0.1
+            is_item = kind == 'custom'
+
+            rows.append({
+                'item_type': kind,
+                'item_id': None if is_item else uuid.uuid4(),
+                'itinerary_item_id': uuid.uuid4() if is_item else None,
+                'itinerary_id': None,
+                'itinerary_created_at': None,
+                'title': f'{kind} {len(rows)}',
+                'description': None,
+                'location': None,
+                'start_date': scheduled,
+                'start_time': starts_at.time() if timed else None,
+                'end_date': ends_at.date() if kind == 'excursion' else None,
+                'end_time': ends_at.time() if kind == 'excursion' and timed else None,
+                'display_order': 0,
+                'original_date': None,
+                'original_time': None,
+            })
+
+    return rows
+
+
+def pairwise_overlaps(intervals):
+    """Reference implementation: compare every pair"""
+    overlaps = []
+    for i in range(len(intervals)):
+        for j in range(i + 1, len(intervals)):
+            if intervals[i][0] < intervals[j][1] and intervals[j][0] < intervals[i][1]:
+                overlaps.append((i, j))
+    return overlaps
+
+
+def timed(function, runs: int) -> float:
+    """Mean milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--weeks', type=int, default=6, help='trip length in weeks')
+    parser.add_argument('--per-day', type=int, default=20, help='items per day')
+    parser.add_argument('--runs', type=int, default=20, help='timed runs per measurement')
+    args = parser.parse_args()
+
+    rows = make_rows(args.weeks, args.per_day)
+    intervals = []
+    for row in rows:
+        if row['start_time'] is not None:
+            starts_at = datetime.combine(row['start_date'], row['start_time'])
+            intervals.append((starts_at, starts_at + timedelta(hours=1)))
+
+    sweep = {tuple(sorted(pair)) for pair in find_overlaps(intervals)}
+    pairwise = set(pairwise_overlaps(intervals))
+    assert sweep == pairwise, 'sweep line and pairwise results differ'
+
+    print(f'{len(rows)} items over {args.weeks * 7} days, {len(intervals)} timed, {len(sweep)} overlapping pairs')
+    print(f'  sweep line      {timed(lambda: find_overlaps(intervals), args.runs):8.2f} ms')
+    print(f'  pairwise        {timed(lambda: pairwise_overlaps(intervals), max(1, args.runs // 10)):8.2f} ms')
+    print(f'  whole timeline  {timed(lambda: _build_timeline(rows, date.min, date.max), args.runs):8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark response serialization
+
+Builds excursion-shaped RealDictRow results (UUIDs, dates, times,
+timestamptz and Decimal) and times json.dumps(default=str), which the
+responses used before utils/serializer.py, against the serializer's stdlib
+fallback and orjson. Checks that both serializers produce the same JSON.
+No database is needed.
+
+Usage:
+    python lambda/scripts/benchmark_serializer.py [--rows 100 1000 5000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import date, datetime, timezone
+from datetime import time as time_of_day
+from decimal import Decimal
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(SCRIPTS_DIR, '..', 'src')
+
+sys.path.insert(0, SRC_DIR)
+
+from psycopg2.extras import RealDictRow  # noqa: E402
+from utils import serializer  # noqa: E402
+
+
+def make_row(index: int) -> RealDictRow:
+    """One row as psycopg2 returns it from the excursions table"""
+    now = datetime.now(timezone.utc)
+    row = RealDictRow()
+    row.update(
+        id=uuid.uuid4(),
+        vacation_id=uuid.uuid4(),
+        title=f'Excursion {index}',
+        description='Snorkel tour with lunch ' * 3,
+        location='Molokini',
+        start_date=date(2026, 1, 1),
+        end_date=date(2026, 1, 2),
+        start_time=time_of_day(9, 30),
+        end_time=time_of_day(13, 0),
+        cost=Decimal('149.99'),
+        booking_url='https://example.com/booking',
+        created_by='user-123',
+        created_at=now,
+        updated_at=now,
+    )
+    return row
+
+
+def timed(function, value, runs: int) -> float:
+    """Mean milliseconds per call"""
+    start = time.perf_counter()
+    for _ in range(runs):
+        function(value)
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000, 5000], help='rows per response')
+    args = parser.parse_args()
+
+    candidates = [('json.dumps(default=str)', lambda value: json.dumps(value, default=str))]
+    candidates += [(f'{name} serializer', dumps) for name, dumps in serializer.SERIALIZERS.items()]
+
+    print(f"{'rows':>6}  " + '  '.join(f'{name:>24}' for name, _ in candidates))
+    for rows in args.rows:
+        body = {'success': True, 'data': [make_row(index) for index in range(rows)]}
+        outputs = [json.loads(dumps(body)) for _, dumps in candidates[1:]]
+        assert all(output == outputs[0] for output in outputs), 'serializers disagree'
+
+        runs = max(3, 2000 // rows)
+        print(f'{rows:6}  ' + '  '.join(f'{timed(dumps, body, runs):21.2f} ms' for _, dumps in candidates))
+
+
+if __name__ == '__main__':
+    main()
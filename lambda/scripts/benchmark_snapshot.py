@@ -0,0 +1,148 @@
+"""
+Benchmark the vacation snapshot
+
+Seeds a vacation (12 members, 60 events, 20 excursions, 60 packing items
+and an itinerary of 30 items) and times what a client loading it needed
+before GET /vacations/{id}/snapshot: eight separate queries, each building
+row dicts that are then serialized. It compares that with the snapshot
+handler end to end, where Postgres builds the JSON in one query.
+
+Needs a migrated database. The seeded vacation is committed, because the
+handler reads it on its own connection, and deleted again at the end.
+
+Usage:
+    python lambda/scripts/benchmark_snapshot.py --dsn postgresql://localhost/vacaagent_test [--runs 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(SCRIPTS_DIR, '..', 'src')
+
+sys.path.insert(0, SRC_DIR)
+
+USER_ID = 'benchmark-user'
+
+# What the client fetched for one vacation screen before the snapshot
+SEPARATE_QUERIES = (
+    'SELECT 1 FROM vacation_members WHERE vacation_id = %(vacation_id)s AND user_id = %(user_id)s',
+    """SELECT v.*,
+              (SELECT COUNT(*) FROM events e WHERE e.vacation_id = v.id) AS event_count,
+              (SELECT COUNT(*) FROM excursions ex WHERE ex.vacation_id = v.id) AS excursion_count
+       FROM vacations v WHERE v.id = %(vacation_id)s""",
+    'SELECT * FROM vacation_members WHERE vacation_id = %(vacation_id)s ORDER BY joined_at',
+    'SELECT * FROM events WHERE vacation_id = %(vacation_id)s ORDER BY event_date, event_time',
+    'SELECT * FROM excursions WHERE vacation_id = %(vacation_id)s ORDER BY start_date, start_time',
+    'SELECT * FROM packing_items WHERE vacation_id = %(vacation_id)s ORDER BY category, item_name',
+    'SELECT * FROM itineraries WHERE vacation_id = %(vacation_id)s AND user_id = %(user_id)s',
+    """SELECT ii.* FROM itinerary_items ii JOIN itineraries i ON i.id = ii.itinerary_id
+       WHERE i.vacation_id = %(vacation_id)s AND i.user_id = %(user_id)s
+       ORDER BY ii.scheduled_date, ii.scheduled_time, ii.display_order""",
+)
+
+
+def seed(cursor) -> str:
+    """A vacation of typical size; returns its ID"""
+    cursor.execute(
+        """INSERT INTO vacations (name, location, start_date, end_date, created_by)
+           VALUES ('Benchmark', 'Maui', '2026-01-01', '2026-02-01', %s)
+           RETURNING id""",
+        (USER_ID,)
+    )
+    vacation_id = cursor.fetchone()[0]
+    cursor.execute(
+        """INSERT INTO vacation_members (vacation_id, user_id, role)
+           SELECT %s::uuid, %s, 'owner'
+           UNION ALL
+           SELECT %s::uuid, 'member-' || g, 'member' FROM generate_series(1, 11) g""",
+        (vacation_id, USER_ID, vacation_id)
+    )
+    cursor.execute(
+        """INSERT INTO events (vacation_id, title, event_date, event_time, created_by)
+           SELECT %s, 'Event ' || g, date '2026-01-02' + g %% 20, '10:00', %s
+           FROM generate_series(1, 60) g""",
+        (vacation_id, USER_ID)
+    )
+    cursor.execute(
+        """INSERT INTO excursions (vacation_id, title, start_date, cost, created_by)
+           SELECT %s, 'Excursion ' || g, '2026-01-02', 99.50, %s FROM generate_series(1, 20) g""",
+        (vacation_id, USER_ID)
+    )
+    cursor.execute(
+        """INSERT INTO packing_items (vacation_id, item_name, category, added_by)
+           SELECT %s, 'Item ' || g, 'Clothes', %s FROM generate_series(1, 60) g""",
+        (vacation_id, USER_ID)
+    )
+    cursor.execute(
+        "INSERT INTO itineraries (vacation_id, user_id, title) VALUES (%s, %s, 'Mine') RETURNING id",
+        (vacation_id, USER_ID)
+    )
+    itinerary_id = cursor.fetchone()[0]
+    cursor.execute(
+        """INSERT INTO itinerary_items (itinerary_id, item_type, custom_title, scheduled_date)
+           SELECT %s, 'custom', 'Item ' || g, '2026-01-03' FROM generate_series(1, 30) g""",
+        (itinerary_id,)
+    )
+    return vacation_id
+
+
+def timed(function, runs: int) -> float:
+    """Mean milliseconds per call"""
+    function()
+    start = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - start) / runs * 1000
+
+
+def main() -> None:
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'), help='database to benchmark against')
+    parser.add_argument('--runs', type=int, default=200, help='timed runs per measurement')
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error('--dsn or DATABASE_URL is required')
+
+    from utils import database, serializer
+    from routes import router
+
+    database._open_connection = lambda: psycopg2.connect(args.dsn, cursor_factory=RealDictCursor)
+
+    conn = psycopg2.connect(args.dsn)
+    vacation_id = seed(conn.cursor())
+    conn.commit()
+
+    try:
+        params = {'vacation_id': vacation_id, 'user_id': USER_ID}
+        cursor = conn.cursor(cursor_factory=RealDictCursor)
+
+        def separate():
+            results = []
+            for query in SEPARATE_QUERIES:
+                cursor.execute(query, params)
+                results.append(cursor.fetchall())
+            serializer.dumps(results)
+
+        def snapshot():
+            response = router.route('GET', f'/vacations/{vacation_id}/snapshot', {'user': {'user_id': USER_ID}})
+            assert response['statusCode'] == 200, response
+
+        print(f'{len(SEPARATE_QUERIES)} separate queries + row dicts + serialize: {timed(separate, args.runs):6.2f} ms')
+        print(f'snapshot handler, end to end:               {timed(snapshot, args.runs):6.2f} ms')
+    finally:
+        conn.rollback()
+        conn.cursor().execute('DELETE FROM vacations WHERE id = %s', (vacation_id,))
+        conn.commit()
+        conn.close()
+        database.close_db_connection()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark the trip list query
+
+Seeds one user on a growing number of trips, among background trips of
+other users, and times the first page of GET /vacations: the old query,
+which counted every member of every trip with COUNT(DISTINCT) behind an IN
+subquery, against the current one, which reads the user's memberships off
+idx_vacation_members_user_vacation and takes member_count from the row.
+
+Needs a database migrated to at least version 2. Everything runs in one
+transaction that is rolled back, so a disposable copy is best but nothing
+is left behind; the old query runs against the old user_id index.
+
+Usage:
+    python lambda/scripts/benchmark_trip_list.py --dsn postgresql://localhost/vacaagent_test [--runs 50]
+"""
+
+import argparse
+import os
+import time
+
+
+OLD_QUERY = """
+    SELECT v.*, COUNT(DISTINCT vm.user_id) AS member_count
+    FROM vacations v
+    LEFT JOIN vacation_members vm ON v.id = vm.vacation_id
+    WHERE v.id IN (SELECT vacation_id FROM vacation_members WHERE user_id = %s)
+    GROUP BY v.id
+    ORDER BY v.start_date DESC, v.id DESC
+    LIMIT 101
+"""
+
+NEW_QUERY = """
+    SELECT v.*
+    FROM vacation_members vm
+    JOIN vacations v ON v.id = vm.vacation_id
+    WHERE vm.user_id = %s
+    ORDER BY v.start_date DESC, v.id DESC
+    LIMIT 101
+"""
+
+USER_ID = 'benchmark-user'
+BACKGROUND_TRIPS = 2500
+BACKGROUND_USERS = 500
+
+# (trips the user is on, members per trip)
+SIZES = ((5, 5), (50, 10), (200, 50), (1000, 200))
+
+
+def seed(cursor, trips: int, members: int) -> None:
+    """The user's trips with their members, plus background trips"""
+    cursor.execute(
+        """INSERT INTO vacations (name, location, start_date, end_date, created_by)
+           SELECT 'Trip ' || g, 'Somewhere', date '2026-01-01' + g %% 300, date '2026-01-06' + g %% 300, %s
+           FROM generate_series(1, %s) g""",
+        (USER_ID, trips + BACKGROUND_TRIPS)
+    )
+    cursor.execute(
+        """WITH trips AS (
+               SELECT id, row_number() OVER (ORDER BY id) AS n FROM vacations WHERE created_by = %s
+           )
+           INSERT INTO vacation_members (vacation_id, user_id)
+           SELECT id, %s FROM trips WHERE n <= %s
+           UNION ALL
+           SELECT id, 'member-' || m FROM trips, generate_series(1, %s) m WHERE n <= %s
+           UNION ALL
+           SELECT id, 'background-' || ((n + m) %% %s) FROM trips, generate_series(1, 5) m WHERE n > %s""",
+        (USER_ID, USER_ID, trips, members, trips, BACKGROUND_USERS, trips)
+    )
+    cursor.execute('ANALYZE vacations, vacation_members')
+
+
+def use_old_index(cursor) -> None:
+    """Put back the user_id index migration 002 replaced"""
+    cursor.execute('DROP INDEX idx_vacation_members_user_vacation')
+    cursor.execute('CREATE INDEX idx_vacation_members_user_id ON vacation_members(user_id)')
+    cursor.execute('ANALYZE vacation_members')
+
+
+def timed(cursor, query: str, runs: int):
+    """Mean milliseconds per run, and the number of rows returned"""
+    cursor.execute(query, (USER_ID,))
+    rows = cursor.fetchall()
+    start = time.perf_counter()
+    for _ in range(runs):
+        cursor.execute(query, (USER_ID,))
+        cursor.fetchall()
+    return (time.perf_counter() - start) / runs * 1000, len(rows)
+
+
+def main() -> None:
+    import psycopg2
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'), help='database to benchmark against')
+    parser.add_argument('--runs', type=int, default=50, help='timed runs per measurement')
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error('--dsn or DATABASE_URL is required')
+
+    conn = psycopg2.connect(args.dsn)
+    try:
+        print('trips  members/trip        old        new')
+        for trips, members in SIZES:
+            cursor = conn.cursor()
+            seed(cursor, trips, members)
+            new_ms, new_rows = timed(cursor, NEW_QUERY, args.runs)
+            use_old_index(cursor)
+            old_ms, old_rows = timed(cursor, OLD_QUERY, args.runs)
+            assert old_rows == new_rows, 'old and new queries return different pages'
+            print(f'{trips:5}  {members:12}  {old_ms:7.2f} ms {new_ms:7.2f} ms')
+            conn.rollback()
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark the get_vacation counts
+
+Seeds one vacation with growing numbers of members, events and excursions
+and times the old query, which LEFT JOINed all three tables and counted
+with COUNT(DISTINCT) over their product, against independent COUNT(*)
+subqueries, one index lookup per table. The old query takes seconds at the
+larger sizes, so keep --runs small.
+
+Needs a migrated database. Everything runs in one transaction that is
+rolled back, so nothing is left behind.
+
+Usage:
+    python lambda/scripts/benchmark_vacation_counts.py --dsn postgresql://localhost/vacaagent_test [--runs 3]
+"""
+
+import argparse
+import os
+import time
+
+
+OLD_QUERY = """
+    SELECT v.*,
+           COUNT(DISTINCT vm.user_id) AS member_count,
+           COUNT(DISTINCT e.id) AS event_count,
+           COUNT(DISTINCT ex.id) AS excursion_count
+    FROM vacations v
+    LEFT JOIN vacation_members vm ON v.id = vm.vacation_id
+    LEFT JOIN events e ON v.id = e.vacation_id
+    LEFT JOIN excursions ex ON v.id = ex.vacation_id
+    WHERE v.id = %s
+    GROUP BY v.id
+"""
+
+NEW_QUERY = """
+    SELECT v.*,
+           (SELECT COUNT(*) FROM vacation_members vm WHERE vm.vacation_id = v.id) AS member_count,
+           (SELECT COUNT(*) FROM events e WHERE e.vacation_id = v.id) AS event_count,
+           (SELECT COUNT(*) FROM excursions ex WHERE ex.vacation_id = v.id) AS excursion_count
+    FROM vacations v
+    WHERE v.id = %s
+"""
+
+# (members, events and excursions each)
+SIZES = ((10, 10), (10, 100), (20, 300), (20, 500))
+
+
+def seed(cursor, members: int, items: int) -> str:
+    """A vacation with members, events and excursions; returns its ID"""
+    cursor.execute(
+        """INSERT INTO vacations (name, location, start_date, end_date, created_by)
+           VALUES ('Benchmark', 'Somewhere', '2026-01-01', '2026-01-20', 'member-1')
+           RETURNING id"""
+    )
+    vacation_id = cursor.fetchone()[0]
+    cursor.execute(
+        """INSERT INTO vacation_members (vacation_id, user_id)
+           SELECT %s, 'member-' || g FROM generate_series(1, %s) g""",
+        (vacation_id, members)
+    )
+    cursor.execute(
+        """INSERT INTO events (vacation_id, title, event_date, created_by)
+           SELECT %s, 'Event ' || g, '2026-01-02', 'member-1' FROM generate_series(1, %s) g""",
+        (vacation_id, items)
+    )
+    cursor.execute(
+        """INSERT INTO excursions (vacation_id, title, start_date, created_by)
+           SELECT %s, 'Excursion ' || g, '2026-01-02', 'member-1' FROM generate_series(1, %s) g""",
+        (vacation_id, items)
+    )
+    cursor.execute('ANALYZE vacation_members, events, excursions')
+    return vacation_id
+
+
+def timed(cursor, query: str, vacation_id: str, runs: int):
+    """Mean milliseconds per run, and the (member, event, excursion) counts"""
+    cursor.execute(query, (vacation_id,))
+    counts = cursor.fetchone()[-3:]
+    start = time.perf_counter()
+    for _ in range(runs):
+        cursor.execute(query, (vacation_id,))
+        cursor.fetchone()
+    return (time.perf_counter() - start) / runs * 1000, counts
+
+
+def main() -> None:
+    import psycopg2
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'), help='database to benchmark against')
+    parser.add_argument('--runs', type=int, default=3, help='timed runs per measurement')
+    args = parser.parse_args()
+    if not args.dsn:
+        parser.error('--dsn or DATABASE_URL is required')
+
+    conn = psycopg2.connect(args.dsn)
+    try:
+        print('members  events/excursions         old        new')
+        for members, items in SIZES:
+            cursor = conn.cursor()
+            vacation_id = seed(cursor, members, items)
+            old_ms, old_counts = timed(cursor, OLD_QUERY, vacation_id, args.runs)
+            new_ms, new_counts = timed(cursor, NEW_QUERY, vacation_id, args.runs)
+            assert old_counts == new_counts, 'old and new queries count differently'
+            print(f'{members:7}  {items:17}  {old_ms:9.2f} ms {new_ms:7.2f} ms')
+            conn.rollback()
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Apply pending database migrations
+
+Runs every database/migrations/NNN_*.sql file that schema_migrations has not
+recorded yet, oldest first. Safe to run repeatedly and from several places at
+once. Connects with --dsn or DATABASE_URL, or else with the Secrets Manager
+credentials the Lambda uses (DB_SECRET_ARN).
+
+Usage:
+    python lambda/scripts/migrate.py [--dsn postgresql://...] [--target 3] [--dry-run]
+"""
+
+import argparse
+import os
+import sys
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(SCRIPTS_DIR, '..', 'src')
+MIGRATIONS_DIR = os.path.join(SCRIPTS_DIR, '..', '..', 'database', 'migrations')
+
+sys.path.insert(0, SRC_DIR)
+
+from utils.migrations import MigrationError, apply_migrations  # noqa: E402
+
+
+def connect(dsn: str):
+    """Open a connection from a DSN, or from the Lambda's own credentials"""
+    import psycopg2
+
+    if dsn:
+        return psycopg2.connect(dsn)
+
+    from utils.database import get_db_credentials
+    credentials = get_db_credentials()
+    return psycopg2.connect(
+        host=credentials['host'],
+        port=credentials['port'],
+        database=credentials['dbname'],
+        user=credentials['username'],
+        password=credentials['password']
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'),
+                        help='libpq connection string (default: $DATABASE_URL)')
+    parser.add_argument('--dir', default=MIGRATIONS_DIR,
+                        help='migrations directory (default: database/migrations)')
+    parser.add_argument('--target', type=int, help='highest version to apply')
+    parser.add_argument('--dry-run', action='store_true', help='list pending migrations only')
+    args = parser.parse_args()
+
+    conn = connect(args.dsn)
+    try:
+        results = apply_migrations(conn, args.dir, target=args.target, dry_run=args.dry_run)
+    except MigrationError as e:
+        sys.exit(f'Migration failed: {str(e)}')
+    finally:
+        conn.close()
+
+    if not results:
+        print('Database is up to date')
+    for migration, status in results:
+        print(f'{status:>8}  {migration}')
+
+
+if __name__ == '__main__':
+    main()
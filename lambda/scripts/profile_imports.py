@@ -0,0 +1,79 @@
+"""
+Import-time profiling report for the Lambda package
+
+Runs a fresh interpreter with -X importtime against lambda/src and prints
+the slowest modules in milliseconds, so cold-start regressions show up
+before deployment.
+
+Usage:
+    python lambda/scripts/profile_imports.py [--preload] [--top 25]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import List, Tuple
+
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+
+def profile_imports(preload: bool) -> List[Tuple[str, float, float, int]]:
+    """
+    Import the handler in a fresh interpreter and collect -X importtime output
+
+    Args:
+        preload: Also import every controller, as the first requests would
+
+    Returns:
+        List of (module, self ms, cumulative ms, nesting depth) tuples
+    """
+    code = 'import index'
+    if preload:
+        code += '; from routes import router; router.preload()'
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=SRC_DIR,
+        capture_output=True,
+        text=True
+    )
+
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000, depth))
+
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--preload', action='store_true',
+                        help='also import every controller module')
+    parser.add_argument('--top', type=int, default=25,
+                        help='number of modules to list')
+    args = parser.parse_args()
+
+    rows = profile_imports(args.preload)
+    top_level = [row for row in rows if row[3] == 0]
+    total_ms = sum(row[2] for row in top_level)
+
+    print(f"Total import time: {total_ms:.1f} ms ({len(rows)} modules)")
+    print()
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+
+    for name, self_ms, cumulative_ms, _ in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"{cumulative_ms:>14.1f} {self_ms:>9.1f}  {name}")
+
+
+if __name__ == '__main__':
+    main()
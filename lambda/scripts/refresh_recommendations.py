@@ -0,0 +1,48 @@
+"""
+Recompute precomputed recommendations
+
+Without arguments, runs the same sweep as the scheduled event: vacations
+whose recommendations are stale or past their TTL, for trips that haven't
+ended. With --vacation, refreshes just those vacations. Useful where no
+schedule runs the sweep, e.g. when running locally. Connects with the
+Secrets Manager credentials the Lambda uses (DB_SECRET_ARN).
+
+Usage:
+    python lambda/scripts/refresh_recommendations.py [--vacation ID ...] [--limit 50]
+"""
+
+import argparse
+import os
+import sys
+
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(SCRIPTS_DIR, '..', 'src')
+
+sys.path.insert(0, SRC_DIR)
+
+from controllers.recommendations import (  # noqa: E402
+    REFRESH_SWEEP_SIZE, refresh_due_recommendations, refresh_recommendations
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--vacation', action='append', default=[], metavar='ID',
+                        help='vacation to refresh (repeatable; default: every due vacation)')
+    parser.add_argument('--limit', type=int, default=REFRESH_SWEEP_SIZE,
+                        help='most vacations to refresh in a sweep')
+    args = parser.parse_args()
+
+    if args.vacation:
+        for vacation_id in args.vacation:
+            changed = refresh_recommendations(vacation_id)
+            print(f"{'updated' if changed else 'unchanged':>9}  {vacation_id}")
+        return
+
+    refreshed = refresh_due_recommendations(args.limit)
+    print(f'Refreshed {len(refreshed)} vacation(s)')
+
+
+if __name__ == '__main__':
+    main()
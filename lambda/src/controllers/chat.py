@@ -1,19 +1,169 @@
-from utils.response import success_response
-def list_chat(e): return success_response([])
-def get_chat(e): return success_response({})
-def create_chat(e): return success_response({})
-def update_chat(e): return success_response({})
-def delete_chat(e): return success_response({})
-def add_chat(e): return success_response({})
-def remove_chat(e): return success_response({})
-def send_message(e): return success_response({})
-def delete_message(e): return success_response({})
-def list_messages(e): return success_response([])
-def upload_photo(e): return success_response({})
-def get_photo_url(e): return success_response({})
-def add_packing_item(e): return success_response({})
-def update_packing_item(e): return success_response({})
-def delete_packing_item(e): return success_response({})
-def get_packing_list(e): return success_response([])
-def get_itinerary(e): return success_response([])
-def get_recommendations(e): return success_response([])
+"""Chat controller - handles vacation group chat messages"""
+
+import os
+import time
+import uuid
+from typing import Dict, Any
+from utils.response import (
+    created_response, success_response, cached_response, not_found, bad_request, server_error
+)
+from utils.database import execute_returning, listen
+from utils.auth import get_user_id
+from utils.access import fetch_member_rows, member_exists
+from utils.pagination import Page, PaginationError, get_query_params
+
+
+CHAT_FIELDS = ('id', 'vacation_id', 'user_id', 'message', 'seq', 'created_at', 'updated_at')
+
+# seq numbers a vacation's messages in commit order (see migration 007), so
+# a since token never skips a message that committed late. Matches
+# idx_chat_messages_vacation_seq, so pages never scan history
+CHAT_SORT_KEYS = ('t.seq',)
+
+MAX_MESSAGE_LENGTH = 4000
+
+# Upper bound for long-poll waits, kept under the API Gateway timeout
+CHAT_MAX_WAIT = float(os.environ.get('CHAT_MAX_WAIT', '20'))
+
+
+def list_messages(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    List chat messages for a vacation
+
+    Without since, returns a page of history newest first; cursor walks
+    back through older messages. The response's since token marks the
+    newest message seen.
+
+    With since (empty for "from the start"), returns only messages posted
+    after that token, oldest first, plus the token to use next time. Adding
+    wait=N holds the request open for up to N seconds until a message is
+    posted, instead of returning an empty page.
+    """
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        params = get_query_params(event)
+
+        if 'since' in params:
+            return _list_new_messages(event, vacation_id, params)
+
+        page = Page(event, CHAT_SORT_KEYS, CHAT_FIELDS, descending=True)
+        messages = _fetch_page(event, vacation_id, page)
+        if messages is None:
+            return not_found()
+
+        messages, next_cursor = page.finish(messages)
+
+        # Only the first page starts at the newest message
+        since = page.first_cursor if page.after is None else None
+        return cached_response(event, messages, next_cursor=next_cursor, since=since)
+    except PaginationError as e:
+        return bad_request(str(e))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def _list_new_messages(event: Dict[str, Any], vacation_id: str, params: Dict[str, str]) -> Dict[str, Any]:
+    """Delta mode of list_messages, optionally long-polling"""
+    page = Page(event, CHAT_SORT_KEYS, CHAT_FIELDS, cursor_param='since')
+
+    try:
+        channel = f'chat_{uuid.UUID(vacation_id).hex}'
+    except ValueError:
+        return not_found()
+
+    try:
+        wait = float(params.get('wait') or 0)
+    except ValueError:
+        return bad_request('wait must be a number of seconds')
+    if not 0 <= wait:
+        return bad_request('wait must be a number of seconds')
+    wait = min(wait, CHAT_MAX_WAIT)
+
+    if wait > 0:
+        deadline = time.monotonic() + wait
+
+        # Subscribe before the first read so a message posted in between wakes us
+        with listen(channel) as listener:
+            messages = _fetch_page(event, vacation_id, page)
+            while messages == [] and listener.wait(deadline - time.monotonic()):
+                messages = _fetch_page(event, vacation_id, page)
+    else:
+        messages = _fetch_page(event, vacation_id, page)
+
+    if messages is None:
+        return not_found()
+
+    messages, next_cursor = page.finish(messages)
+
+    # Nothing new keeps the client's token, so an idle poll revalidates to 304
+    since = page.last_cursor or params.get('since')
+    return cached_response(event, messages, next_cursor=next_cursor, since=since)
+
+
+def _fetch_page(event: Dict[str, Any], vacation_id: str, page: Page):
+    """Fetch one page of messages with the access check; None for non-members"""
+    keyset, keyset_params = page.keyset_condition()
+
+    return fetch_member_rows(
+        event, vacation_id, 'chat_messages',
+        order_by=page.order_by(),
+        columns=f"{page.columns('t')}, {page.cursor_columns()}",
+        join_filter=keyset,
+        params=keyset_params,
+        limit=page.fetch_limit
+    )
+
+
+def send_message(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Post a chat message"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        user_id = get_user_id(event)
+        message = event.get('body_json', {}).get('message')
+
+        if not isinstance(message, str) or not message.strip():
+            return bad_request('Missing required field: message')
+        if len(message) > MAX_MESSAGE_LENGTH:
+            return bad_request(f'message must be at most {MAX_MESSAGE_LENGTH} characters')
+
+        # Triggers assign seq and notify long-polling readers on commit
+        new_message = execute_returning(
+            f"""INSERT INTO chat_messages (vacation_id, user_id, message)
+                SELECT %s, %s, %s
+                WHERE {member_exists('%s::uuid')}
+                RETURNING *""",
+            (vacation_id, user_id, message, vacation_id, user_id)
+        )
+
+        if not new_message:
+            return not_found()
+
+        return created_response(new_message)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def delete_message(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Delete a chat message (its author or the vacation owner)"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        message_id = event.get('path_parameters', {}).get('message_id')
+        user_id = get_user_id(event)
+
+        deleted = execute_returning(
+            f"""DELETE FROM chat_messages
+                WHERE id = %s AND vacation_id = %s AND {member_exists('chat_messages.vacation_id')}
+                  AND (user_id = %s OR {member_exists('chat_messages.vacation_id', owner_only=True)})
+                RETURNING id""",
+            (message_id, vacation_id, user_id, user_id, user_id)
+        )
+
+        if not deleted:
+            return not_found()
+
+        return success_response({}, 'Message deleted')
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
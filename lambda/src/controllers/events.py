@@ -1,27 +1,63 @@
 """Event controller - handles vacation events"""
 
 from typing import Dict, Any
-from utils.response import success_response, created_response, not_found, server_error
-from utils.database import execute_query, execute_insert
+from utils.response import (
+    success_response, created_response, cached_response, not_found, bad_request, server_error
+)
+from utils.database import execute_returning
 from utils.auth import get_user_id
+from utils.access import (
+    has_access, fetch_member_rows, member_exists, remember_role, invalidate_vacation
+)
+from utils.pagination import Page, PaginationError
+from utils.bulk import (
+    ValidationError, create_items, update_items, require, parse_str, parse_uuid, parse_date, parse_time
+)
+
+
+EVENT_FIELDS = (
+    'id', 'vacation_id', 'title', 'description', 'event_date', 'event_time',
+    'dress_code', 'created_by', 'created_at', 'updated_at'
+)
+
+# Columns a bulk update may change, with their SQL types
+EVENT_UPDATE_TYPES = {
+    'title': 'varchar',
+    'description': 'text',
+    'event_date': 'date',
+    'event_time': 'time',
+    'dress_code': 'varchar',
+}
+
+# Untimed events sort after timed ones on the same day, as NULLS LAST did
+EVENT_SORT_KEYS = (
+    't.event_date', '(t.event_time IS NULL)', "COALESCE(t.event_time, '00:00'::time)", 't.id'
+)
 
 
 def list_events(event: Dict[str, Any]) -> Dict[str, Any]:
-    """List all events for a vacation"""
+    """List a page of events for a vacation"""
     try:
         vacation_id = event.get('path_parameters', {}).get('vacation_id')
-        user_id = get_user_id(event)
-
-        # Verify access
-        if not _has_access(vacation_id, user_id):
-            return not_found()
-
-        events = execute_query(
-            "SELECT * FROM events WHERE vacation_id = %s ORDER BY event_date, event_time",
-            (vacation_id,)
+        page = Page(event, EVENT_SORT_KEYS, EVENT_FIELDS)
+        keyset, keyset_params = page.keyset_condition()
+
+        # Access check is folded into the query; None means not a member
+        events = fetch_member_rows(
+            event, vacation_id, 'events',
+            order_by=page.order_by(),
+            columns=f"{page.columns('t')}, {page.cursor_columns()}",
+            join_filter=keyset,
+            params=keyset_params,
+            limit=page.fetch_limit
         )
+        if events is None:
+            return not_found()
 
-        return success_response(events or [])
+        events, next_cursor = page.finish(events)
+        return cached_response(event, events, next_cursor=next_cursor)
+    except PaginationError as e:
+        return bad_request(str(e))
     except Exception as e:
         print(f"Error: {str(e)}")
         return server_error()
@@ -34,17 +70,22 @@ def create_event(event: Dict[str, Any]) -> Dict[str, Any]:
         user_id = get_user_id(event)
         body = event.get('body_json', {})
 
-        if not _has_access(vacation_id, user_id):
-            return not_found()
-
-        event_id = execute_insert(
-            """INSERT INTO events (vacation_id, title, description, event_date, event_time, dress_code, created_by)
-               VALUES (%s, %s, %s, %s, %s, %s, %s) RETURNING id""",
+        # Only inserts when the user is a member of the vacation
+        new_event = execute_returning(
+            f"""INSERT INTO events (vacation_id, title, description, event_date, event_time, dress_code, created_by)
+                SELECT %s, %s, %s, %s, %s, %s, %s
+                WHERE {member_exists('%s::uuid')}
+                RETURNING *""",
             (vacation_id, body['title'], body.get('description'), body['event_date'],
-             body.get('event_time'), body.get('dress_code'), user_id)
+             body.get('event_time'), body.get('dress_code'), user_id, vacation_id, user_id)
         )
 
-        new_event = execute_query("SELECT * FROM events WHERE id = %s", (event_id,), fetch_one=True)
+        if not new_event:
+            remember_role(vacation_id, user_id, None)
+            return not_found()
+
+        invalidate_vacation(vacation_id)
+
         return created_response(new_event)
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -56,23 +97,26 @@ def update_event(event: Dict[str, Any]) -> Dict[str, Any]:
     try:
         vacation_id = event.get('path_parameters', {}).get('vacation_id')
         event_id = event.get('path_parameters', {}).get('event_id')
-        user_id = get_user_id(event)
         body = event.get('body_json', {})
 
-        if not _has_access(vacation_id, user_id):
-            return not_found()
-
         fields = ['title', 'description', 'event_date', 'event_time', 'dress_code']
         updates = [f"{f} = %s" for f in fields if f in body]
-        params = [body[f] for f in fields if f in body] + [event_id, vacation_id]
+        params = [body[f] for f in fields if f in body] + [event_id, vacation_id, get_user_id(event)]
 
+        # One statement either way; the membership check is part of it
         if updates:
-            execute_query(
-                f"UPDATE events SET {', '.join(updates)} WHERE id = %s AND vacation_id = %s",
-                tuple(params)
-            )
+            query = f"""UPDATE events SET {', '.join(updates)}
+                        WHERE id = %s AND vacation_id = %s AND {member_exists('events.vacation_id')}
+                        RETURNING *"""
+        else:
+            query = f"""SELECT * FROM events
+                        WHERE id = %s AND vacation_id = %s AND {member_exists('events.vacation_id')}"""
+
+        updated = execute_returning(query, tuple(params))
+
+        if not updated:
+            return not_found()
 
-        updated = execute_query("SELECT * FROM events WHERE id = %s", (event_id,), fetch_one=True)
         return success_response(updated)
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -84,22 +128,96 @@ def delete_event(event: Dict[str, Any]) -> Dict[str, Any]:
     try:
         vacation_id = event.get('path_parameters', {}).get('vacation_id')
         event_id = event.get('path_parameters', {}).get('event_id')
-        user_id = get_user_id(event)
 
-        if not _has_access(vacation_id, user_id):
+        deleted = execute_returning(
+            f"""DELETE FROM events
+                WHERE id = %s AND vacation_id = %s AND {member_exists('events.vacation_id')}
+                RETURNING id""",
+            (event_id, vacation_id, get_user_id(event))
+        )
+
+        if not deleted:
             return not_found()
 
-        execute_query("DELETE FROM events WHERE id = %s AND vacation_id = %s", (event_id, vacation_id))
+        invalidate_vacation(vacation_id)
+
         return success_response({}, 'Event deleted')
     except Exception as e:
         print(f"Error: {str(e)}")
         return server_error()
 
 
-def _has_access(vacation_id: str, user_id: str) -> bool:
-    """Check if user has access to vacation"""
-    result = execute_query(
-        "SELECT 1 FROM vacation_members WHERE vacation_id = %s AND user_id = %s",
-        (vacation_id, user_id), fetch_one=True
+def bulk_create_events(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Create many events with one multi-row insert"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        user_id = get_user_id(event)
+
+        # The write below does not re-check membership, so read it uncached
+        if not has_access(event, vacation_id, use_cache=False):
+            return not_found()
+
+        invalidate_vacation(vacation_id)
+
+        return create_items(
+            event.get('body_json', {}), _validate_new_event, 'events',
+            ['vacation_id', 'title', 'description', 'event_date', 'event_time', 'dress_code', 'created_by'],
+            prefix=(vacation_id,), suffix=(user_id,)
+        )
+    except ValidationError as e:
+        return bad_request(str(e))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def bulk_update_events(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Update many events with one statement"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+
+        # The write below does not re-check membership, so read it uncached
+        if not has_access(event, vacation_id, use_cache=False):
+            return not_found()
+
+        return update_items(
+            event.get('body_json', {}), _validate_event_update, 'events',
+            EVENT_UPDATE_TYPES, 'vacation_id', vacation_id
+        )
+    except ValidationError as e:
+        return bad_request(str(e))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def _validate_new_event(item: Dict[str, Any]) -> tuple:
+    """Validate a bulk-created event, returning its column values"""
+    return (
+        parse_str(require(item, 'title'), 'title', 255),
+        parse_str(item.get('description'), 'description'),
+        parse_date(require(item, 'event_date'), 'event_date'),
+        parse_time(item.get('event_time'), 'event_time'),
+        parse_str(item.get('dress_code'), 'dress_code', 100),
     )
-    return result is not None
+
+
+def _validate_event_update(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate a bulk event update, keeping only updatable fields"""
+    update = {'id': parse_uuid(require(item, 'id'), 'id')}
+    for field in EVENT_UPDATE_TYPES:
+        if field in item:
+            update[field] = item[field]
+
+    if 'title' in update:
+        update['title'] = parse_str(require(update, 'title'), 'title', 255)
+    if 'description' in update:
+        update['description'] = parse_str(update['description'], 'description')
+    if 'dress_code' in update:
+        update['dress_code'] = parse_str(update['dress_code'], 'dress_code', 100)
+    if 'event_date' in update:
+        update['event_date'] = parse_date(require(update, 'event_date'), 'event_date')
+    if 'event_time' in update:
+        update['event_time'] = parse_time(update['event_time'], 'event_time')
+
+    return update
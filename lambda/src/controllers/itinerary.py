@@ -1,19 +1,440 @@
-from utils.response import success_response
-def list_itinerary(e): return success_response([])
-def get_itinerary(e): return success_response({})
-def create_itinerary(e): return success_response({})
-def update_itinerary(e): return success_response({})
-def delete_itinerary(e): return success_response({})
-def add_itinerary(e): return success_response({})
-def remove_itinerary(e): return success_response({})
-def send_message(e): return success_response({})
-def delete_message(e): return success_response({})
-def list_messages(e): return success_response([])
-def upload_photo(e): return success_response({})
-def get_photo_url(e): return success_response({})
-def add_packing_item(e): return success_response({})
-def update_packing_item(e): return success_response({})
-def delete_packing_item(e): return success_response({})
-def get_packing_list(e): return success_response([])
-def get_itinerary(e): return success_response([])
-def get_recommendations(e): return success_response([])
+"""Itinerary controller - handles a user's itineraries and the trip timeline
+
+get_itinerary merges the vacation's events and excursions with the items of
+the user's itineraries into one day-by-day timeline, and flags items whose
+times overlap.
+"""
+
+import os
+import uuid
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Any, List, Tuple
+from utils.response import (
+    success_response, created_response, cached_response, not_found, bad_request, server_error
+)
+from utils.database import execute_query, execute_returning
+from utils.auth import get_user_id
+from utils.access import has_access, member_exists
+from utils.pagination import get_query_params
+from utils.timeline import find_overlaps
+from utils.bulk import (
+    MAX_BULK_ITEMS, ValidationError, create_items, update_items, require, parse_str, parse_uuid,
+    parse_date, parse_time, parse_int
+)
+
+
+ITEM_TYPES = ('event', 'excursion', 'custom')
+
+# Columns a bulk update may change, with their SQL types
+ITINERARY_ITEM_UPDATE_TYPES = {
+    'custom_title': 'varchar',
+    'custom_description': 'text',
+    'scheduled_date': 'date',
+    'scheduled_time': 'time',
+    'display_order': 'integer',
+}
+
+# Items without an end time are assumed to take this long
+DEFAULT_DURATION = timedelta(minutes=int(os.environ.get('ITINERARY_DEFAULT_DURATION', '60')))
+
+# Events and excursions, plus the user's itinerary items. An item that
+# schedules an event or excursion brings its title and original times along,
+# and is read whatever its date, since it moves its source out of its
+# original place. The date window is inclusive.
+TIMELINE_QUERY = """
+    SELECT 'event' AS item_type, e.id AS item_id, NULL::uuid AS itinerary_item_id,
+           NULL::uuid AS itinerary_id, NULL::timestamptz AS itinerary_created_at,
+           e.title, e.description, NULL::varchar AS location,
+           e.event_date AS start_date, e.event_time AS start_time,
+           NULL::date AS end_date, NULL::time AS end_time, 0 AS display_order,
+           NULL::date AS original_date, NULL::time AS original_time
+    FROM events e
+    WHERE e.vacation_id = %s AND e.event_date BETWEEN %s AND %s
+    UNION ALL
+    SELECT 'excursion', x.id, NULL, NULL, NULL,
+           x.title, x.description, x.location,
+           x.start_date, x.start_time, x.end_date, x.end_time, 0,
+           NULL, NULL
+    FROM excursions x
+    WHERE x.vacation_id = %s AND x.start_date <= %s AND COALESCE(x.end_date, x.start_date) >= %s
+    UNION ALL
+    SELECT ii.item_type, ii.item_id, ii.id, ii.itinerary_id, i.created_at,
+           COALESCE(ii.custom_title, e.title, x.title),
+           COALESCE(ii.custom_description, e.description, x.description), x.location,
+           ii.scheduled_date, ii.scheduled_time, x.end_date, x.end_time, COALESCE(ii.display_order, 0),
+           COALESCE(e.event_date, x.start_date), COALESCE(e.event_time, x.start_time)
+    FROM itineraries i
+    JOIN itinerary_items ii ON ii.itinerary_id = i.id
+    LEFT JOIN events e ON ii.item_type = 'event' AND e.id = ii.item_id AND e.vacation_id = i.vacation_id
+    LEFT JOIN excursions x ON ii.item_type = 'excursion' AND x.id = ii.item_id AND x.vacation_id = i.vacation_id
+    WHERE i.vacation_id = %s AND i.user_id = %s AND i.id = COALESCE(%s::uuid, i.id)
+      AND (ii.item_type <> 'custom' OR ii.scheduled_date BETWEEN %s AND %s)
+      AND (ii.item_type = 'custom' OR e.id IS NOT NULL OR x.id IS NOT NULL)
+"""
+
+
+def get_itinerary(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get the user's itineraries and the vacation's day-by-day timeline
+
+    The timeline holds the vacation's events and excursions and the items
+    of the user's itineraries (only itinerary_id's, if given). An itinerary
+    item that schedules an event or excursion replaces it in the timeline.
+    Each day lists its timed items by start time, then its untimed ones;
+    display_order breaks ties. Items overlapping others list their IDs in
+    conflicts_with. from and to (YYYY-MM-DD) limit the days returned.
+    """
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        user_id = get_user_id(event)
+        params = get_query_params(event)
+
+        try:
+            date_from = date.fromisoformat(parse_date(params.get('from'), 'from') or date.min.isoformat())
+            date_to = date.fromisoformat(parse_date(params.get('to'), 'to') or date.max.isoformat())
+            itinerary_id = params.get('itinerary_id')
+            if itinerary_id:
+                itinerary_id = parse_uuid(itinerary_id, 'itinerary_id')
+        except ValidationError as e:
+            return bad_request(str(e))
+
+        if not has_access(event, vacation_id):
+            return not_found()
+
+        itineraries = execute_query(
+            "SELECT * FROM itineraries WHERE vacation_id = %s AND user_id = %s ORDER BY created_at, id",
+            (vacation_id, user_id)
+        )
+        rows = execute_query(TIMELINE_QUERY, (
+            vacation_id, date_from, date_to,
+            vacation_id, date_to, date_from,
+            vacation_id, user_id, itinerary_id or None, date_from, date_to
+        ))
+
+        days, conflict_count = _build_timeline(rows, date_from, date_to)
+        return cached_response(event, {
+            'itineraries': itineraries,
+            'days': days,
+            'conflict_count': conflict_count,
+        })
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def _build_timeline(rows: List[Dict], date_from: date, date_to: date) -> Tuple[List[Dict], int]:
+    """
+    Merge timeline rows into days and mark overlapping items
+
+    Returns:
+        (days as [{'date', 'items'}], number of overlapping pairs)
+    """
+    # The first itinerary to schedule an event or excursion places it
+    scheduled = {}
+    for row in rows:
+        if row['itinerary_item_id'] is not None and row['item_type'] != 'custom':
+            key = (row['item_type'], row['item_id'])
+            current = scheduled.get(key)
+            if current is None or (row['itinerary_created_at'], str(row['itinerary_item_id'])) < (
+                    current['itinerary_created_at'], str(current['itinerary_item_id'])):
+                scheduled[key] = row
+
+    items = []
+    for row in rows:
+        if row['item_type'] != 'custom':
+            placed = scheduled.get((row['item_type'], row['item_id']))
+            if placed is not None and placed is not row:
+                continue
+        item = _timeline_item(row)
+        if item['date'] <= date_to and (item['end_date'] or item['date']) >= date_from:
+            items.append(item)
+
+    timed = [item for item in items if item['_starts_at'] is not None]
+    for first, second in find_overlaps([(item['_starts_at'], item['_ends_at']) for item in timed]):
+        timed[first]['conflicts_with'].append(timed[second]['id'])
+        timed[second]['conflicts_with'].append(timed[first]['id'])
+    conflict_count = sum(len(item['conflicts_with']) for item in timed) // 2
+
+    items.sort(key=lambda item: (
+        item['date'], item['start_time'] is None, item['start_time'] or time.min,
+        item['display_order'], str(item['id'])
+    ))
+
+    days = []
+    for item in items:
+        del item['_starts_at'], item['_ends_at']
+        if not days or days[-1]['date'] != item['date']:
+            days.append({'date': item['date'], 'items': []})
+        days[-1]['items'].append(item)
+
+    return days, conflict_count
+
+
+def _timeline_item(row: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a timeline item from a row, working out when it ends
+
+    Excursions keep their length when an itinerary moves them; events and
+    custom items, which have no end, last DEFAULT_DURATION.
+    """
+    start_date, start_time = row['start_date'], row['start_time']
+    original_date = row['original_date'] or start_date
+    original_time = row['original_time'] or start_time
+    end_date = row['end_date']
+    if end_date is not None:
+        end_date += start_date - original_date
+
+    starts_at = ends_at = None
+    end_time = None
+    if start_time is not None:
+        starts_at = datetime.combine(start_date, start_time)
+        duration = DEFAULT_DURATION
+        if row['end_time'] is not None and original_time is not None:
+            original_end = datetime.combine(row['end_date'] or original_date, row['end_time'])
+            original_duration = original_end - datetime.combine(original_date, original_time)
+            if original_duration > timedelta(0):
+                duration = original_duration
+        ends_at = starts_at + duration
+        end_date, end_time = ends_at.date(), ends_at.time()
+
+    return {
+        'id': row['itinerary_item_id'] or row['item_id'],
+        'item_type': row['item_type'],
+        'item_id': row['item_id'],
+        'itinerary_item_id': row['itinerary_item_id'],
+        'itinerary_id': row['itinerary_id'],
+        'title': row['title'],
+        'description': row['description'],
+        'location': row['location'],
+        'date': start_date,
+        'start_time': start_time,
+        'end_date': end_date if end_date != start_date else None,
+        'end_time': end_time,
+        'display_order': row['display_order'],
+        'conflicts_with': [],
+        '_starts_at': starts_at,
+        '_ends_at': ends_at,
+    }
+
+
+def create_itinerary(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Create an itinerary for the user"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        user_id = get_user_id(event)
+        body = event.get('body_json', {})
+
+        if not body.get('title'):
+            return bad_request('Missing required field: title')
+
+        itinerary = execute_returning(
+            f"""INSERT INTO itineraries (vacation_id, user_id, title, description)
+                SELECT %s, %s, %s, %s
+                WHERE {member_exists('%s::uuid')}
+                RETURNING *""",
+            (vacation_id, user_id, body['title'], body.get('description'), vacation_id, user_id)
+        )
+
+        if not itinerary:
+            return not_found()
+
+        return created_response(itinerary, 'Itinerary created successfully')
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def update_itinerary(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Update one of the user's itineraries"""
+    try:
+        path_parameters = event.get('path_parameters', {})
+        user_id = get_user_id(event)
+        body = event.get('body_json', {})
+
+        update_fields = []
+        params = []
+        for field in ('title', 'description'):
+            if field in body:
+                update_fields.append(f"{field} = %s")
+                params.append(body[field])
+
+        if not update_fields:
+            return bad_request('No fields to update')
+        if 'title' in body and not body['title']:
+            return bad_request('title cannot be empty')
+
+        params.extend([path_parameters.get('itinerary_id'), path_parameters.get('vacation_id'), user_id, user_id])
+
+        itinerary = execute_returning(
+            f"""UPDATE itineraries
+                SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s AND vacation_id = %s AND user_id = %s AND {member_exists('itineraries.vacation_id')}
+                RETURNING *""",
+            tuple(params)
+        )
+
+        if not itinerary:
+            return not_found('Itinerary not found')
+
+        return success_response(itinerary, 'Itinerary updated successfully')
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def reorder_itinerary_items(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Set the display order of an itinerary's items in one statement
+
+    Body: {"item_ids": [...]} in the new order. Each listed item's
+    display_order becomes its position; only rows whose position changed
+    are written, and items not listed keep theirs. Any ID that is not an
+    item of the itinerary fails the whole request.
+    """
+    try:
+        itinerary_id = _owned_itinerary_id(event)
+        if not itinerary_id:
+            return not_found('Itinerary not found')
+
+        item_ids = event.get('body_json', {}).get('item_ids')
+        if not isinstance(item_ids, list) or not item_ids:
+            return bad_request('item_ids must be a non-empty list')
+        if len(item_ids) > MAX_BULK_ITEMS:
+            return bad_request(f'At most {MAX_BULK_ITEMS} item_ids per request')
+        try:
+            item_ids = [str(uuid.UUID(str(item_id))) for item_id in item_ids]
+        except ValueError:
+            return bad_request('item_ids must be UUIDs')
+        if len(set(item_ids)) != len(item_ids):
+            return bad_request('item_ids must not repeat')
+
+        # psycopg2 sends the list as text[]; cast it explicitly so the
+        # prepared form of this query accepts it
+        result = execute_query(
+            """WITH positions AS (
+                   SELECT id, (position - 1)::integer AS display_order
+                   FROM unnest(%s::text[]::uuid[]) WITH ORDINALITY AS p(id, position)
+               ), matched AS (
+                   SELECT ii.id FROM itinerary_items ii
+                   JOIN positions p ON p.id = ii.id
+                   WHERE ii.itinerary_id = %s
+               ), updated AS (
+                   UPDATE itinerary_items ii SET display_order = p.display_order
+                   FROM positions p
+                   WHERE ii.id = p.id AND ii.itinerary_id = %s
+                     AND ii.display_order IS DISTINCT FROM p.display_order
+                   RETURNING ii.id
+               )
+               SELECT ARRAY(SELECT id::text FROM matched) AS matched,
+                      (SELECT COUNT(*) FROM updated) AS updated""",
+            (item_ids, itinerary_id, itinerary_id),
+            fetch_one=True
+        )
+
+        missing = sorted(set(item_ids) - set(result['matched']))
+        if missing:
+            return bad_request('Some items are not in this itinerary', missing)
+
+        return success_response({'updated': result['updated']}, 'Itinerary reordered')
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def bulk_add_itinerary_items(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Add many items to one of the user's itineraries with one insert"""
+    try:
+        itinerary_id = _owned_itinerary_id(event)
+        if not itinerary_id:
+            return not_found('Itinerary not found')
+
+        return create_items(
+            event.get('body_json', {}), _validate_new_itinerary_item, 'itinerary_items',
+            ['itinerary_id', 'item_type', 'item_id', 'custom_title', 'custom_description',
+             'scheduled_date', 'scheduled_time', 'display_order'],
+            prefix=(itinerary_id,)
+        )
+    except ValidationError as e:
+        return bad_request(str(e))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def bulk_update_itinerary_items(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Update many items of one of the user's itineraries with one statement"""
+    try:
+        itinerary_id = _owned_itinerary_id(event)
+        if not itinerary_id:
+            return not_found('Itinerary not found')
+
+        return update_items(
+            event.get('body_json', {}), _validate_itinerary_item_update, 'itinerary_items',
+            ITINERARY_ITEM_UPDATE_TYPES, 'itinerary_id', itinerary_id
+        )
+    except ValidationError as e:
+        return bad_request(str(e))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def _owned_itinerary_id(event: Dict[str, Any]):
+    """Return the path's itinerary ID if it belongs to the user and vacation"""
+    path_parameters = event.get('path_parameters', {})
+    vacation_id = path_parameters.get('vacation_id')
+    itinerary_id = path_parameters.get('itinerary_id')
+
+    result = execute_query(
+        f"""SELECT i.id FROM itineraries i
+            WHERE i.id = %s AND i.vacation_id = %s AND i.user_id = %s
+              AND {member_exists('i.vacation_id')}""",
+        (itinerary_id, vacation_id, get_user_id(event), get_user_id(event)),
+        fetch_one=True
+    )
+    return result['id'] if result else None
+
+
+def _validate_new_itinerary_item(item: Dict[str, Any]) -> tuple:
+    """Validate a bulk-added itinerary item, returning its column values"""
+    item_type = require(item, 'item_type')
+    if item_type not in ITEM_TYPES:
+        raise ValidationError(f"item_type must be one of: {', '.join(ITEM_TYPES)}")
+
+    if item_type == 'custom':
+        require(item, 'custom_title')
+        item_id = None
+    else:
+        item_id = parse_uuid(require(item, 'item_id'), 'item_id')
+
+    display_order = parse_int(item.get('display_order'), 'display_order')
+    return (
+        item_type,
+        item_id,
+        parse_str(item.get('custom_title'), 'custom_title', 255),
+        parse_str(item.get('custom_description'), 'custom_description'),
+        parse_date(require(item, 'scheduled_date'), 'scheduled_date'),
+        parse_time(item.get('scheduled_time'), 'scheduled_time'),
+        0 if display_order is None else display_order,
+    )
+
+
+def _validate_itinerary_item_update(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate a bulk itinerary item update, keeping only updatable fields"""
+    update = {'id': parse_uuid(require(item, 'id'), 'id')}
+    for field in ITINERARY_ITEM_UPDATE_TYPES:
+        if field in item:
+            update[field] = item[field]
+
+    if 'custom_title' in update:
+        update['custom_title'] = parse_str(update['custom_title'], 'custom_title', 255)
+    if 'custom_description' in update:
+        update['custom_description'] = parse_str(update['custom_description'], 'custom_description')
+    if 'scheduled_date' in update:
+        update['scheduled_date'] = parse_date(require(update, 'scheduled_date'), 'scheduled_date')
+    if 'scheduled_time' in update:
+        update['scheduled_time'] = parse_time(update['scheduled_time'], 'scheduled_time')
+    if 'display_order' in update:
+        update['display_order'] = parse_int(require(update, 'display_order'), 'display_order')
+
+    return update
@@ -1,19 +1,109 @@
-from utils.response import success_response
-def list_members(e): return success_response([])
-def get_members(e): return success_response({})
-def create_members(e): return success_response({})
-def update_members(e): return success_response({})
-def delete_members(e): return success_response({})
-def add_members(e): return success_response({})
-def remove_members(e): return success_response({})
-def send_message(e): return success_response({})
-def delete_message(e): return success_response({})
-def list_messages(e): return success_response([])
-def upload_photo(e): return success_response({})
-def get_photo_url(e): return success_response({})
-def add_packing_item(e): return success_response({})
-def update_packing_item(e): return success_response({})
-def delete_packing_item(e): return success_response({})
-def get_packing_list(e): return success_response([])
-def get_itinerary(e): return success_response([])
-def get_recommendations(e): return success_response([])
+"""Member controller - handles who belongs to a vacation"""
+
+from typing import Dict, Any
+from utils.response import (
+    success_response, created_response, cached_response, make_etag, error_response, not_found,
+    bad_request, server_error
+)
+from utils.database import execute_returning
+from utils.auth import get_user_id
+from utils.access import (
+    fetch_member_rows, get_member_role, member_exists, remember_role, invalidate_vacation,
+    invalidate_membership
+)
+
+
+MEMBER_ROLES = ('owner', 'member')
+
+
+def list_members(event: Dict[str, Any]) -> Dict[str, Any]:
+    """List the members of a vacation; polled, so it answers 304 when unchanged"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+
+        members = fetch_member_rows(
+            event, vacation_id, 'vacation_members', order_by='t.joined_at, t.id'
+        )
+        if members is None:
+            return not_found()
+
+        # Members are only ever added, removed or given a role, so their
+        # ids and roles change whenever the list does
+        etag = make_etag(vacation_id, *(f"{member['id']}:{member['role']}" for member in members))
+        return cached_response(event, members, etag)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def add_member(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Add a user to a vacation (owner only)"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        body = event.get('body_json', {})
+
+        member_user_id = body.get('user_id')
+        role = body.get('role', 'member')
+        if not member_user_id:
+            return bad_request('Missing required field: user_id')
+        if role not in MEMBER_ROLES:
+            return bad_request(f"role must be one of: {', '.join(MEMBER_ROLES)}")
+
+        if get_member_role(event, vacation_id) != 'owner':
+            return not_found('Vacation not found or insufficient permissions')
+
+        # The owner check is repeated in the statement, so a role cached by
+        # this container can never let a former owner add members
+        member = execute_returning(
+            f"""INSERT INTO vacation_members (vacation_id, user_id, role)
+                SELECT %s, %s, %s
+                WHERE {member_exists('%s::uuid', owner_only=True)}
+                ON CONFLICT (vacation_id, user_id) DO NOTHING
+                RETURNING *""",
+            (vacation_id, member_user_id, role, vacation_id, get_user_id(event))
+        )
+
+        if not member:
+            # Either a conflict or a stale cached role; re-read it to tell
+            invalidate_membership(vacation_id, get_user_id(event))
+            event['memberships'].pop(vacation_id, None)
+            if get_member_role(event, vacation_id) != 'owner':
+                return not_found('Vacation not found or insufficient permissions')
+            return error_response(409, 'User is already a member of this vacation')
+
+        remember_role(vacation_id, member_user_id, role)
+        invalidate_vacation(vacation_id)
+
+        return created_response(member)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def remove_member(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Remove a member; owners can remove anyone else, members only themselves"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        member_id = event.get('path_parameters', {}).get('member_id')
+        user_id = get_user_id(event)
+
+        removed = execute_returning(
+            f"""DELETE FROM vacation_members
+                WHERE id = %s AND vacation_id = %s AND role <> 'owner'
+                  AND (user_id = %s OR {member_exists('vacation_members.vacation_id', owner_only=True)})
+                RETURNING user_id""",
+            (member_id, vacation_id, user_id, user_id)
+        )
+
+        if not removed:
+            return not_found('Member not found or insufficient permissions')
+
+        invalidate_membership(vacation_id, removed['user_id'])
+        invalidate_vacation(vacation_id)
+        if removed['user_id'] == user_id:
+            event.setdefault('memberships', {})[vacation_id] = None
+
+        return success_response({}, 'Member removed')
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
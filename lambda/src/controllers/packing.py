@@ -1,19 +1,427 @@
-from utils.response import success_response
-def list_packing(e): return success_response([])
-def get_packing(e): return success_response({})
-def create_packing(e): return success_response({})
-def update_packing(e): return success_response({})
-def delete_packing(e): return success_response({})
-def add_packing(e): return success_response({})
-def remove_packing(e): return success_response({})
-def send_message(e): return success_response({})
-def delete_message(e): return success_response({})
-def list_messages(e): return success_response([])
-def upload_photo(e): return success_response({})
-def get_photo_url(e): return success_response({})
-def add_packing_item(e): return success_response({})
-def update_packing_item(e): return success_response({})
-def delete_packing_item(e): return success_response({})
-def get_packing_list(e): return success_response([])
-def get_itinerary(e): return success_response([])
-def get_recommendations(e): return success_response([])
+"""Packing controller - handles a vacation's shared packing list
+
+The list comes with per-category counts computed by Postgres. Templates
+(beach week, ski trip, ...) expand into a whole list scaled to the trip's
+length with one insert, and checkbox taps are batched client-side and
+applied with one statement.
+"""
+
+from typing import Dict, Any, List, Optional
+from utils.response import (
+    success_response, created_response, cached_response, cached_json_response, not_found, bad_request,
+    server_error
+)
+from utils.database import execute_query, execute_returning
+from utils.auth import get_user_id
+from utils.access import has_access, member_exists
+from utils.packing_templates import load_templates, get_template, expand_template, trip_days, MAX_TRIP_DAYS
+from utils.bulk import (
+    MAX_BULK_ITEMS, ValidationError, create_items, update_items, require, parse_str, parse_uuid, parse_int,
+    parse_bool
+)
+
+
+# Counts for a set of packing items, as a JSON object
+PACKING_AGGREGATES = """
+    'items', COUNT(*),
+    'packed', COUNT(*) FILTER (WHERE is_packed),
+    'quantity', COALESCE(SUM(quantity), 0),
+    'packed_quantity', COALESCE(SUM(quantity) FILTER (WHERE is_packed), 0)
+"""
+
+# Columns a bulk update may change, with their SQL types
+PACKING_UPDATE_TYPES = {
+    'item_name': 'varchar',
+    'category': 'varchar',
+    'quantity': 'integer',
+    'is_packed': 'boolean',
+}
+
+# Longest item_name and category the packing_items columns hold
+ITEM_NAME_LENGTH = 255
+CATEGORY_LENGTH = 100
+
+
+def get_packing_list(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get a vacation's packing list with per-category and overall counts
+
+    Postgres builds the whole document in one query, reading the items
+    through idx_packing_items_vacation_category in category order.
+    """
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+
+        query = f"""
+            SELECT json_build_object(
+                'items', COALESCE((
+                    SELECT json_agg(p ORDER BY p.category, p.item_name, p.id)
+                    FROM packing_items p WHERE p.vacation_id = v.id
+                ), '[]'::json),
+                'categories', COALESCE((
+                    SELECT json_agg(c.counts ORDER BY c.category)
+                    FROM (
+                        SELECT p.category, json_build_object('category', p.category, {PACKING_AGGREGATES}) AS counts
+                        FROM packing_items p WHERE p.vacation_id = v.id
+                        GROUP BY p.category
+                    ) c
+                ), '[]'::json),
+                'totals', (
+                    SELECT json_build_object({PACKING_AGGREGATES})
+                    FROM packing_items p WHERE p.vacation_id = v.id
+                )
+            )::text AS packing
+            FROM vacations v
+            WHERE v.id = %s AND {member_exists('v.id')}
+        """
+
+        result = execute_query(query, (vacation_id, get_user_id(event)), fetch_one=True)
+
+        if not result:
+            return not_found()
+
+        return cached_json_response(event, result['packing'])
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def add_packing_item(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Add an item to a vacation's packing list"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        user_id = get_user_id(event)
+        item_name, category, quantity, is_packed = _validate_new_packing_item(event.get('body_json', {}))
+
+        # Only inserts when the user is a member of the vacation
+        item = execute_returning(
+            f"""INSERT INTO packing_items (vacation_id, item_name, category, quantity, is_packed, added_by)
+                SELECT %s, %s, %s, %s, %s, %s
+                WHERE {member_exists('%s::uuid')}
+                RETURNING *""",
+            (vacation_id, item_name, category, quantity, is_packed, user_id, vacation_id, user_id)
+        )
+
+        if not item:
+            return not_found()
+
+        return created_response(item)
+    except ValidationError as e:
+        return bad_request(str(e))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def update_packing_item(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Update a packing item"""
+    try:
+        path_parameters = event.get('path_parameters', {})
+        item_id = _path_item_id(event)
+        if not item_id:
+            return not_found()
+
+        update = _validate_packing_update({**event.get('body_json', {}), 'id': item_id})
+
+        fields = [field for field in PACKING_UPDATE_TYPES if field in update]
+        if not fields:
+            return bad_request('No fields to update')
+
+        params = [update[field] for field in fields] + [
+            item_id, path_parameters.get('vacation_id'), get_user_id(event)
+        ]
+
+        item = execute_returning(
+            f"""UPDATE packing_items SET {', '.join(f"{field} = %s" for field in fields)}
+                WHERE id = %s AND vacation_id = %s AND {member_exists('packing_items.vacation_id')}
+                RETURNING *""",
+            tuple(params)
+        )
+
+        if not item:
+            return not_found()
+
+        return success_response(item)
+    except ValidationError as e:
+        return bad_request(str(e))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def delete_packing_item(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Delete a packing item"""
+    try:
+        item_id = _path_item_id(event)
+        if not item_id:
+            return not_found()
+
+        deleted = execute_returning(
+            f"""DELETE FROM packing_items
+                WHERE id = %s AND vacation_id = %s AND {member_exists('packing_items.vacation_id')}
+                RETURNING id""",
+            (item_id, event.get('path_parameters', {}).get('vacation_id'), get_user_id(event))
+        )
+
+        if not deleted:
+            return not_found()
+
+        return success_response({}, 'Packing item deleted')
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def bulk_add_packing_items(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Add many packing items with one multi-row insert"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        user_id = get_user_id(event)
+
+        # The write below does not re-check membership, so read it uncached
+        if not has_access(event, vacation_id, use_cache=False):
+            return not_found()
+
+        return create_items(
+            event.get('body_json', {}), _validate_new_packing_item, 'packing_items',
+            ['vacation_id', 'item_name', 'category', 'quantity', 'is_packed', 'added_by'],
+            prefix=(vacation_id,), suffix=(user_id,)
+        )
+    except ValidationError as e:
+        return bad_request(str(e))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def bulk_update_packing_items(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Update many packing items with one statement"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+
+        # The write below does not re-check membership, so read it uncached
+        if not has_access(event, vacation_id, use_cache=False):
+            return not_found()
+
+        return update_items(
+            event.get('body_json', {}), _validate_packing_update, 'packing_items',
+            PACKING_UPDATE_TYPES, 'vacation_id', vacation_id
+        )
+    except ValidationError as e:
+        return bad_request(str(e))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def set_packed_items(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check and uncheck many packing items in one statement
+
+    Body: {"packed": [...], "unpacked": [...]}, item IDs, either may be
+    omitted. Only rows whose state changes are written. Any ID that is not
+    an item of the vacation fails the whole request.
+    """
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        body = event.get('body_json', {})
+
+        try:
+            packed = _item_ids(body, 'packed')
+            unpacked = _item_ids(body, 'unpacked')
+        except ValidationError as e:
+            return bad_request(str(e))
+
+        item_ids = packed + unpacked
+        if not item_ids:
+            return bad_request('packed or unpacked must list at least one item')
+        if len(item_ids) > MAX_BULK_ITEMS:
+            return bad_request(f'At most {MAX_BULK_ITEMS} items per request')
+        if len(set(item_ids)) != len(item_ids):
+            return bad_request('An item may only be listed once')
+
+        # The write below does not re-check membership, so read it uncached
+        if not has_access(event, vacation_id, use_cache=False):
+            return not_found()
+
+        # psycopg2 sends the lists as text[]; cast them explicitly so the
+        # prepared form of this query accepts them
+        result = execute_query(
+            """WITH matched AS (
+                   SELECT id FROM packing_items
+                   WHERE vacation_id = %s AND id = ANY(%s::text[]::uuid[])
+               ), updated AS (
+                   UPDATE packing_items p SET is_packed = p.id = ANY(%s::text[]::uuid[])
+                   WHERE p.vacation_id = %s AND p.id = ANY(%s::text[]::uuid[])
+                     AND p.is_packed IS DISTINCT FROM (p.id = ANY(%s::text[]::uuid[]))
+                   RETURNING p.id
+               )
+               SELECT ARRAY(SELECT id::text FROM matched) AS matched,
+                      (SELECT COUNT(*) FROM updated) AS updated""",
+            (vacation_id, item_ids, packed, vacation_id, item_ids, packed),
+            fetch_one=True
+        )
+
+        missing = sorted(set(item_ids) - set(result['matched']))
+        if missing:
+            return bad_request('Some items are not on this packing list', missing)
+
+        return success_response({'updated': result['updated']})
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def list_packing_templates(event: Dict[str, Any]) -> Dict[str, Any]:
+    """List the packing templates, with items scaled to the vacation's length"""
+    try:
+        vacation = _get_trip_dates(event)
+        if not vacation:
+            return not_found()
+
+        days = trip_days(vacation['start_date'], vacation['end_date'])
+        templates = [
+            {
+                'id': template['id'],
+                'name': template['name'],
+                'description': template.get('description'),
+                'items': [
+                    {'item_name': item_name, 'category': category, 'quantity': quantity}
+                    for item_name, category, quantity in expand_template(template, days)
+                ],
+            }
+            for template in load_templates().values()
+        ]
+
+        return cached_response(event, templates, days=days)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def apply_packing_template(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Add a template's items to a vacation's packing list with one insert
+
+    Quantities are scaled to the trip's length, or to body "days" when
+    given. Items already on the list (by name, ignoring case) are skipped
+    unless "skip_existing" is false.
+    """
+    try:
+        path_parameters = event.get('path_parameters', {})
+        vacation_id = path_parameters.get('vacation_id')
+        body = event.get('body_json', {})
+
+        template = get_template(path_parameters.get('template_id'))
+        if not template:
+            return not_found('Template not found')
+
+        try:
+            days = parse_int(body.get('days'), 'days')
+            skip_existing = parse_bool(body.get('skip_existing'), 'skip_existing')
+        except ValidationError as e:
+            return bad_request(str(e))
+        if days is not None and not 1 <= days <= MAX_TRIP_DAYS:
+            return bad_request(f'days must be between 1 and {MAX_TRIP_DAYS}')
+
+        vacation = _get_trip_dates(event)
+        if not vacation:
+            return not_found()
+
+        if days is None:
+            days = trip_days(vacation['start_date'], vacation['end_date'])
+
+        # Templates are bundled, but hold them to the same limits as user input
+        try:
+            rows = [
+                _validate_new_packing_item({'item_name': item_name, 'category': category, 'quantity': quantity})
+                for item_name, category, quantity in expand_template(template, days)
+            ]
+        except ValidationError as e:
+            return bad_request(f"Template {template['id']}: {str(e)}")
+        item_names, categories, quantities, _ = zip(*rows)
+        params = [vacation_id, get_user_id(event), list(item_names), list(categories), list(quantities)]
+
+        skip_filter = ''
+        if skip_existing is not False:
+            skip_filter = """WHERE NOT EXISTS (
+                SELECT 1 FROM packing_items p
+                WHERE p.vacation_id = %s AND lower(p.item_name) = lower(t.item_name)
+            )"""
+            params.append(vacation_id)
+
+        items = execute_query(
+            f"""INSERT INTO packing_items (vacation_id, item_name, category, quantity, is_packed, added_by)
+                SELECT %s, t.item_name, t.category, t.quantity, FALSE, %s
+                FROM unnest(%s::text[], %s::text[], %s::integer[]) WITH ORDINALITY
+                    AS t(item_name, category, quantity, position)
+                {skip_filter}
+                ORDER BY t.position
+                RETURNING *""",
+            tuple(params)
+        )
+
+        return created_response(
+            {'template': template['id'], 'days': days, 'items': items, 'skipped': len(item_names) - len(items)},
+            f"Added {len(items)} items from {template['name']}"
+        )
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def _validate_new_packing_item(item: Dict[str, Any]) -> tuple:
+    """Validate a bulk-added packing item, returning its column values"""
+    quantity = parse_int(item.get('quantity'), 'quantity', minimum=1)
+    is_packed = parse_bool(item.get('is_packed'), 'is_packed')
+    return (
+        parse_str(require(item, 'item_name'), 'item_name', ITEM_NAME_LENGTH),
+        parse_str(item.get('category'), 'category', CATEGORY_LENGTH),
+        1 if quantity is None else quantity,
+        False if is_packed is None else is_packed,
+    )
+
+
+def _validate_packing_update(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate a bulk packing item update, keeping only updatable fields"""
+    update = {'id': parse_uuid(require(item, 'id'), 'id')}
+    for field in PACKING_UPDATE_TYPES:
+        if field in item:
+            update[field] = item[field]
+
+    if 'item_name' in update:
+        update['item_name'] = parse_str(require(update, 'item_name'), 'item_name', ITEM_NAME_LENGTH)
+    if 'category' in update:
+        update['category'] = parse_str(update['category'], 'category', CATEGORY_LENGTH)
+    if 'quantity' in update:
+        update['quantity'] = parse_int(require(update, 'quantity'), 'quantity', minimum=1)
+    if 'is_packed' in update:
+        update['is_packed'] = parse_bool(require(update, 'is_packed'), 'is_packed')
+
+    return update
+
+
+def _path_item_id(event: Dict[str, Any]) -> Optional[str]:
+    """The path's item ID, or None if it is not a UUID and so matches no item"""
+    try:
+        return parse_uuid(event.get('path_parameters', {}).get('item_id'), 'item_id')
+    except ValidationError:
+        return None
+
+
+def _item_ids(body: Dict[str, Any], field: str) -> List[str]:
+    """A body list of item IDs, normalized"""
+    item_ids = body.get(field) or []
+    if not isinstance(item_ids, list):
+        raise ValidationError(f'{field} must be a list')
+    return [parse_uuid(item_id, field) for item_id in item_ids]
+
+
+def _get_trip_dates(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The vacation's dates, or None if the user is not a member"""
+    return execute_query(
+        f"""SELECT start_date, end_date FROM vacations v
+            WHERE v.id = %s AND {member_exists('v.id')}""",
+        (event.get('path_parameters', {}).get('vacation_id'), get_user_id(event)),
+        fetch_one=True
+    )
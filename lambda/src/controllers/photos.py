@@ -1,19 +1,417 @@
-from utils.response import success_response
-def list_photos(e): return success_response([])
-def get_photos(e): return success_response({})
-def create_photos(e): return success_response({})
-def update_photos(e): return success_response({})
-def delete_photos(e): return success_response({})
-def add_photos(e): return success_response({})
-def remove_photos(e): return success_response({})
-def send_message(e): return success_response({})
-def delete_message(e): return success_response({})
-def list_messages(e): return success_response([])
-def upload_photo(e): return success_response({})
-def get_photo_url(e): return success_response({})
-def add_packing_item(e): return success_response({})
-def update_packing_item(e): return success_response({})
-def delete_packing_item(e): return success_response({})
-def get_packing_list(e): return success_response([])
-def get_itinerary(e): return success_response([])
-def get_recommendations(e): return success_response([])
+"""Photo controller - handles vacation photos stored in S3
+
+Photo bytes never pass through the API. upload_photo creates a pending
+photos row and hands out presigned S3 upload URLs; S3 then invokes the
+Lambda with an ObjectCreated event, and handle_upload_events() reads the
+image's metadata, stores a thumbnail and marks the photo ready.
+"""
+
+import os
+import math
+import uuid
+import tempfile
+import time
+from datetime import datetime, timezone
+from urllib.parse import unquote_plus
+from typing import Dict, Any, List, Optional
+from utils.response import (
+    create_response, success_response, created_response, cached_response, max_age, not_found,
+    bad_request, server_error
+)
+from utils.database import execute_query, execute_returning
+from utils.auth import get_user_id
+from utils.access import has_access, fetch_member_rows, member_exists
+from utils.pagination import Page, PaginationError
+from utils import storage
+
+
+PHOTO_FIELDS = (
+    'id', 'vacation_id', 'uploaded_by', 'file_name', 'file_size', 'mime_type', 'caption',
+    'taken_at', 'uploaded_at', 'status', 'width', 'height'
+)
+
+# Accepted uploads and the extension their objects are stored under
+PHOTO_TYPES = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/webp': '.webp',
+    'image/gif': '.gif',
+    'image/heic': '.heic',
+    'image/heif': '.heif',
+}
+
+MAX_PHOTO_SIZE = int(os.environ.get('MAX_PHOTO_SIZE', str(100 * 1024 * 1024)))
+
+# Larger uploads are split into parts the client can send (and retry) separately
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+
+DOWNLOAD_URL_EXPIRY = int(os.environ.get('DOWNLOAD_URL_EXPIRY', '3600'))
+
+# Most photos one batch URL request may name
+MAX_URL_BATCH = 200
+
+# Storage columns selected alongside a listing to sign its URLs, then dropped
+STORAGE_COLUMNS = 't.s3_bucket AS _s3_bucket, t.s3_key AS _s3_key, t.thumbnail_s3_key AS _thumbnail_s3_key'
+
+
+def list_photos(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    List a page of a vacation's uploaded photos, newest first
+
+    Each photo carries signed URLs for the original and its thumbnail, so
+    a gallery renders from this one call.
+    """
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        page = Page(event, ('t.uploaded_at', 't.id'), PHOTO_FIELDS, descending=True)
+        keyset, keyset_params = page.keyset_condition()
+
+        # Never t.*, which would expose the S3 keys and upload IDs
+        columns = page.columns('t') if page.fields else ', '.join(f't.{field}' for field in PHOTO_FIELDS)
+
+        photos = fetch_member_rows(
+            event, vacation_id, 'photos',
+            order_by=page.order_by(),
+            columns=f"{columns}, {STORAGE_COLUMNS}, {page.cursor_columns()}",
+            join_filter=f"t.status = 'ready' AND {keyset}",
+            params=keyset_params,
+            limit=page.fetch_limit
+        )
+        if photos is None:
+            return not_found()
+
+        photos, next_cursor = page.finish(photos)
+        for photo in photos:
+            photo.update(_signed_urls(
+                photo.pop('_s3_bucket'), photo.pop('_s3_key'), photo.pop('_thumbnail_s3_key')
+            ))
+
+        return cached_response(event, photos, next_cursor=next_cursor)
+    except PaginationError as e:
+        return bad_request(str(e))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def get_photo_urls(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get signed URLs for many photos in one call
+
+    Body: {"photo_ids": [...]}. Photos that don't exist, aren't ready or
+    belong to another vacation are left out of the result.
+    """
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        photo_ids = event.get('body_json', {}).get('photo_ids')
+
+        if not isinstance(photo_ids, list) or not photo_ids:
+            return bad_request('photo_ids must be a non-empty list')
+        if len(photo_ids) > MAX_URL_BATCH:
+            return bad_request(f'At most {MAX_URL_BATCH} photo_ids per request')
+        try:
+            photo_ids = [str(uuid.UUID(str(photo_id))) for photo_id in photo_ids]
+        except ValueError:
+            return bad_request('photo_ids must be UUIDs')
+
+        photos = fetch_member_rows(
+            event, vacation_id, 'photos',
+            columns=f't.id, {STORAGE_COLUMNS}',
+            # psycopg2 sends the list as text[]; cast it explicitly so the
+            # prepared form of this query accepts it
+            join_filter="t.status = 'ready' AND t.id = ANY(%s::text[]::uuid[])",
+            params=(photo_ids,)
+        )
+        if photos is None:
+            return not_found()
+
+        urls = {
+            str(photo['id']): _signed_urls(photo['_s3_bucket'], photo['_s3_key'], photo['_thumbnail_s3_key'])
+            for photo in photos
+        }
+        return _urls_response(urls, list(urls.values()))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def upload_photo(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Start a photo upload
+
+    Creates a pending photo and returns where to PUT the file: one
+    presigned URL, or for files over MULTIPART_THRESHOLD one URL per part,
+    after which the client calls complete_upload with the parts' ETags.
+    """
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        user_id = get_user_id(event)
+        body = event.get('body_json', {})
+
+        mime_type = body.get('mime_type')
+        file_size = body.get('file_size')
+        if mime_type not in PHOTO_TYPES:
+            return bad_request(f"mime_type must be one of: {', '.join(PHOTO_TYPES)}")
+        if not isinstance(file_size, int) or isinstance(file_size, bool) or file_size < 1:
+            return bad_request('file_size must be a positive integer')
+        if file_size > MAX_PHOTO_SIZE:
+            return bad_request(f'file_size must be at most {MAX_PHOTO_SIZE} bytes')
+
+        try:
+            uuid.UUID(vacation_id)
+        except (TypeError, ValueError):
+            return not_found()
+
+        if not has_access(event, vacation_id):
+            return not_found()
+
+        if not storage.PHOTOS_BUCKET:
+            print("Error: PHOTOS_BUCKET is not set")
+            return server_error()
+
+        bucket = storage.PHOTOS_BUCKET
+        photo_id = str(uuid.uuid4())
+        key = f'vacations/{vacation_id}/photos/{photo_id}/original{PHOTO_TYPES[mime_type]}'
+
+        upload_id = None
+        if file_size > MULTIPART_THRESHOLD:
+            upload_id = storage.start_multipart_upload(bucket, key, mime_type)
+
+        photo = execute_returning(
+            f"""INSERT INTO photos (id, vacation_id, uploaded_by, s3_key, s3_bucket, file_name,
+                                    file_size, mime_type, caption, status, upload_id)
+                SELECT %s, %s, %s, %s, %s, %s, %s, %s, %s, 'pending', %s
+                WHERE {member_exists('%s::uuid')}
+                RETURNING *""",
+            (photo_id, vacation_id, user_id, key, bucket, body.get('file_name'), file_size,
+             mime_type, body.get('caption'), upload_id, vacation_id, user_id)
+        )
+
+        if not photo:
+            if upload_id:
+                storage.abort_multipart_upload(bucket, key, upload_id)
+            return not_found()
+
+        if upload_id:
+            part_count = math.ceil(file_size / MULTIPART_PART_SIZE)
+            upload = {
+                'method': 'PUT',
+                'multipart': True,
+                'part_size': MULTIPART_PART_SIZE,
+                'parts': [
+                    {'part_number': n, 'url': storage.presign_upload_part(bucket, key, upload_id, n)}
+                    for n in range(1, part_count + 1)
+                ],
+                'complete_path': f'/vacations/{vacation_id}/photos/{photo_id}/complete',
+            }
+        else:
+            upload = {
+                'method': 'PUT',
+                'multipart': False,
+                'url': storage.presign_put(bucket, key, mime_type),
+                'headers': {'Content-Type': mime_type},
+            }
+        upload['expires_in'] = storage.UPLOAD_URL_EXPIRY
+
+        return created_response({'photo': _public(photo), 'upload': upload})
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def complete_upload(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Assemble a multipart photo upload from the parts the client sent"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        photo_id = event.get('path_parameters', {}).get('photo_id')
+        parts = event.get('body_json', {}).get('parts')
+
+        if not isinstance(parts, list) or not parts:
+            return bad_request('parts must be a non-empty list')
+        try:
+            s3_parts = sorted(
+                ({'PartNumber': int(part['part_number']), 'ETag': str(part['etag'])} for part in parts),
+                key=lambda part: part['PartNumber']
+            )
+        except (KeyError, TypeError, ValueError):
+            return bad_request('Each part needs a part_number and an etag')
+
+        photo = execute_query(
+            """SELECT * FROM photos
+               WHERE id = %s AND vacation_id = %s AND uploaded_by = %s
+                 AND status = 'pending' AND upload_id IS NOT NULL""",
+            (photo_id, vacation_id, get_user_id(event)),
+            fetch_one=True
+        )
+        if not photo:
+            return not_found()
+
+        storage.complete_multipart_upload(photo['s3_bucket'], photo['s3_key'], photo['upload_id'], s3_parts)
+
+        photo = execute_returning(
+            "UPDATE photos SET upload_id = NULL WHERE id = %s RETURNING *", (photo_id,)
+        )
+
+        return success_response(_public(photo), 'Upload complete')
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def get_photo_url(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Get presigned download URLs for a photo and its thumbnail"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        photo_id = event.get('path_parameters', {}).get('photo_id')
+
+        photo = execute_query(
+            f"""SELECT s3_bucket, s3_key, thumbnail_s3_key FROM photos
+                WHERE id = %s AND vacation_id = %s AND status = 'ready'
+                  AND {member_exists('photos.vacation_id')}""",
+            (photo_id, vacation_id, get_user_id(event)),
+            fetch_one=True
+        )
+        if not photo:
+            return not_found()
+
+        urls = _signed_urls(photo['s3_bucket'], photo['s3_key'], photo['thumbnail_s3_key'])
+        return _urls_response(urls, [urls])
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def delete_photo(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Delete a photo and its S3 objects (its uploader or the vacation owner)"""
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        photo_id = event.get('path_parameters', {}).get('photo_id')
+        user_id = get_user_id(event)
+
+        deleted = execute_returning(
+            f"""DELETE FROM photos
+                WHERE id = %s AND vacation_id = %s AND {member_exists('photos.vacation_id')}
+                  AND (uploaded_by = %s OR {member_exists('photos.vacation_id', owner_only=True)})
+                RETURNING s3_bucket, s3_key, thumbnail_s3_key, upload_id""",
+            (photo_id, vacation_id, user_id, user_id, user_id)
+        )
+
+        if not deleted:
+            return not_found()
+
+        # The row is gone either way; leftover objects are only storage
+        try:
+            if deleted['upload_id']:
+                storage.abort_multipart_upload(deleted['s3_bucket'], deleted['s3_key'], deleted['upload_id'])
+            storage.delete_objects(deleted['s3_bucket'], [deleted['s3_key'], deleted['thumbnail_s3_key']])
+        except Exception as e:
+            print(f"Error deleting photo objects: {str(e)}")
+
+        return success_response({}, 'Photo deleted')
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def handle_upload_events(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Finish uploads reported by S3 ObjectCreated notifications
+
+    For each new object that belongs to a pending photo, the object is
+    streamed to a temporary file, its dimensions and capture time are read,
+    a thumbnail is stored next to it and the photo is marked ready.
+    Objects that are not pending photos (thumbnails, re-deliveries of
+    processed uploads) are skipped. Unexpected errors are raised so the
+    asynchronous invocation is retried.
+
+    Args:
+        event: S3 notification event
+
+    Returns:
+        Dict with the number of photos processed
+    """
+    from utils.images import process_image
+
+    processed = 0
+    for record in event.get('Records', []):
+        if not record.get('eventName', '').startswith('ObjectCreated'):
+            continue
+
+        bucket = record['s3']['bucket']['name']
+        key = unquote_plus(record['s3']['object']['key'])
+        size = record['s3']['object'].get('size')
+
+        photo = execute_query(
+            "SELECT * FROM photos WHERE s3_bucket = %s AND s3_key = %s AND status = 'pending'",
+            (bucket, key),
+            fetch_one=True
+        )
+        if not photo:
+            continue
+
+        if size is not None and size > MAX_PHOTO_SIZE:
+            storage.delete_objects(bucket, [key])
+            execute_query("UPDATE photos SET status = 'failed' WHERE id = %s", (photo['id'],))
+            continue
+
+        # /tmp is disk, so large originals never sit in memory
+        with tempfile.NamedTemporaryFile(suffix=os.path.splitext(key)[1]) as original:
+            storage.download_to_file(bucket, key, original)
+            original.flush()
+            details = process_image(original.name)
+
+        thumbnail_key = None
+        if details['thumbnail']:
+            thumbnail_key = f'{os.path.dirname(key)}/thumbnail.jpg'
+            storage.put_object(bucket, thumbnail_key, details['thumbnail'], 'image/jpeg')
+
+        execute_query(
+            """UPDATE photos
+               SET status = 'ready', upload_id = NULL, file_size = COALESCE(%s, file_size),
+                   width = %s, height = %s, taken_at = COALESCE(%s, taken_at), thumbnail_s3_key = %s
+               WHERE id = %s""",
+            (size, details['width'], details['height'], details['taken_at'], thumbnail_key, photo['id'])
+        )
+        processed += 1
+
+    return {'processed': processed}
+
+
+def _signed_urls(bucket: str, key: str, thumbnail_key: Optional[str]) -> Dict[str, Any]:
+    """
+    Signed GET URLs for a photo and its thumbnail
+
+    Signatures come from storage's in-process cache, so the same photo gets
+    the same URLs until they are close to expiring.
+    """
+    url, expires_at = storage.presign_get(bucket, key, DOWNLOAD_URL_EXPIRY)
+    thumbnail_url = None
+    if thumbnail_key:
+        thumbnail_url, thumbnail_expires_at = storage.presign_get(bucket, thumbnail_key, DOWNLOAD_URL_EXPIRY)
+        expires_at = min(expires_at, thumbnail_expires_at)
+
+    return {
+        'url': url,
+        'thumbnail_url': thumbnail_url,
+        'urls_expire_at': datetime.fromtimestamp(expires_at, timezone.utc),
+    }
+
+
+def _urls_response(data: Any, signed: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    A 200 response holding signed URLs, with a Cache-Control max-age
+
+    Clients may reuse it for half the life the soonest-expiring URL has
+    left, so a reused URL still has time to load.
+    """
+    headers = {}
+    if signed:
+        expires_at = min(urls['urls_expire_at'] for urls in signed)
+        headers['Cache-Control'] = max_age((expires_at.timestamp() - time.time()) / 2)
+    return create_response(200, {'success': True, 'data': data}, headers)
+
+
+def _public(photo: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip storage internals from a photo row"""
+    return {field: photo[field] for field in PHOTO_FIELDS}
@@ -1,19 +1,267 @@
-from utils.response import success_response
-def list_recommendations(e): return success_response([])
-def get_recommendations(e): return success_response({})
-def create_recommendations(e): return success_response({})
-def update_recommendations(e): return success_response({})
-def delete_recommendations(e): return success_response({})
-def add_recommendations(e): return success_response({})
-def remove_recommendations(e): return success_response({})
-def send_message(e): return success_response({})
-def delete_message(e): return success_response({})
-def list_messages(e): return success_response([])
-def upload_photo(e): return success_response({})
-def get_photo_url(e): return success_response({})
-def add_packing_item(e): return success_response({})
-def update_packing_item(e): return success_response({})
-def delete_packing_item(e): return success_response({})
-def get_packing_list(e): return success_response([])
-def get_itinerary(e): return success_response([])
-def get_recommendations(e): return success_response([])
+"""Recommendations controller - serves precomputed recommendations
+
+Recommendations are scored ahead of time and stored in the recommendations
+table; get_recommendations only reads that table. When a vacation's set is
+missing, past its TTL or flagged stale (triggers flag it when the vacation,
+its events or its excursions change), the read requests a refresh and serves
+what is stored meanwhile. A scheduled sweep refreshes the requested sets
+first, then upcoming trips whose sets are due, so most reads never need to.
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict, Any, List
+from utils.response import REVALIDATE, cached_response, max_age, not_found, bad_request, server_error
+from utils.database import unit_of_work, execute_query
+from utils.access import fetch_member_rows
+from utils.bulk import bulk_insert
+from utils.pagination import Page, PaginationError, get_query_params
+from utils.recommender import RECOMMENDATION_CATEGORIES, dataset_version, score_candidates
+
+
+RECOMMENDATION_FIELDS = (
+    'id', 'vacation_id', 'category', 'name', 'description', 'location', 'rating',
+    'price_level', 'external_url', 'score', 'reason', 'created_at'
+)
+
+# Best first; a vacation has at most 20 rows per category, read through
+# idx_recommendations_vacation_category_score
+RECOMMENDATION_SORT_KEYS = ('t.score', 't.id')
+
+RECOMMENDATION_COLUMNS = (
+    'category', 'name', 'description', 'location', 'rating', 'price_level', 'external_url', 'score', 'reason'
+)
+
+# Seconds a computed set is served before it is recomputed
+RECOMMENDATIONS_TTL = int(os.environ.get('RECOMMENDATIONS_TTL', str(7 * 24 * 3600)))
+
+# Seconds a client may reuse a fresh set before revalidating; a set being
+# refreshed is always revalidated, so the new one shows up promptly
+RECOMMENDATIONS_MAX_AGE = int(os.environ.get('RECOMMENDATIONS_MAX_AGE', '300'))
+
+# Vacations refreshed per scheduled sweep
+REFRESH_SWEEP_SIZE = int(os.environ.get('RECOMMENDATIONS_SWEEP_SIZE', '50'))
+
+# A set is due when it is stale or older than the TTL
+DUE_CONDITION = "(s.stale OR s.computed_at IS NULL OR s.computed_at < now() - %s * interval '1 second')"
+
+
+def get_recommendations(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get a page of a vacation's recommendations, best first
+
+    category filters to one or more comma-separated categories. The
+    response carries computed_at, and refreshing is true while a newer set
+    is being computed.
+    """
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        params = get_query_params(event)
+
+        categories = [c.strip() for c in params.get('category', '').split(',') if c.strip()]
+        for category in categories:
+            if category not in RECOMMENDATION_CATEGORIES:
+                return bad_request(f"category must be one of: {', '.join(RECOMMENDATION_CATEGORIES)}")
+
+        page = Page(event, RECOMMENDATION_SORT_KEYS, RECOMMENDATION_FIELDS, descending=True)
+        keyset, keyset_params = page.keyset_condition()
+
+        join_filter, filter_params = keyset, keyset_params
+        if categories:
+            join_filter = f"t.category = ANY(%s::text[]) AND {keyset}"
+            filter_params = (categories,) + keyset_params
+
+        recommendations = fetch_member_rows(
+            event, vacation_id, 'recommendations',
+            order_by=page.order_by(),
+            columns=f"{page.columns('t')}, {page.cursor_columns()}",
+            join_filter=join_filter,
+            params=filter_params,
+            limit=page.fetch_limit
+        )
+        if recommendations is None:
+            return not_found()
+
+        recommendations, next_cursor = page.finish(recommendations)
+        state = _request_refresh_if_due(vacation_id)
+
+        return cached_response(
+            event, recommendations,
+            cache_control=REVALIDATE if state['refreshing'] else max_age(RECOMMENDATIONS_MAX_AGE),
+            next_cursor=next_cursor, computed_at=state['computed_at'], refreshing=state['refreshing']
+        )
+    except PaginationError as e:
+        return bad_request(str(e))
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return server_error()
+
+
+def _request_refresh_if_due(vacation_id: str) -> Dict[str, Any]:
+    """
+    Request a refresh if the vacation's set is due
+
+    A fresh set, or one already requested, costs one primary key lookup.
+    Otherwise refresh_requested_at is stamped for the scheduled sweep to
+    pick up; nothing outside the database is called during the request.
+
+    Returns:
+        Dict with computed_at and refreshing
+    """
+    state = execute_query(
+        f"""SELECT s.computed_at, {DUE_CONDITION} AS due, s.refresh_requested_at IS NOT NULL AS requested
+            FROM recommendation_state s
+            WHERE s.vacation_id = %s""",
+        (RECOMMENDATIONS_TTL, vacation_id),
+        fetch_one=True
+    )
+
+    if state and not state['due']:
+        return {'computed_at': state['computed_at'], 'refreshing': False}
+
+    if not state or not state['requested']:
+        execute_query(
+            f"""INSERT INTO recommendation_state AS s (vacation_id, refresh_requested_at)
+                VALUES (%s, now())
+                ON CONFLICT (vacation_id) DO UPDATE SET refresh_requested_at = now()
+                WHERE s.refresh_requested_at IS NULL AND {DUE_CONDITION}""",
+            (vacation_id, RECOMMENDATIONS_TTL)
+        )
+
+    return {'computed_at': state['computed_at'] if state else None, 'refreshing': True}
+
+
+def refresh_recommendations(vacation_id: str) -> bool:
+    """
+    Recompute one vacation's recommendations
+
+    The state row is locked first, so a change made while scoring waits
+    and flags the new set stale once it commits. Sets whose inputs are
+    unchanged since the last run are kept, and only marked fresh.
+
+    Args:
+        vacation_id: Vacation ID
+
+    Returns:
+        True if the stored recommendations were rewritten
+    """
+    with unit_of_work():
+        execute_query(
+            """INSERT INTO recommendation_state (vacation_id)
+               SELECT id FROM vacations WHERE id = %s
+               ON CONFLICT (vacation_id) DO NOTHING""",
+            (vacation_id,)
+        )
+        state = execute_query(
+            "SELECT inputs_hash FROM recommendation_state WHERE vacation_id = %s FOR UPDATE",
+            (vacation_id,),
+            fetch_one=True
+        )
+        if not state:
+            return False
+
+        vacation = execute_query(
+            "SELECT location, vibe, start_date, end_date FROM vacations WHERE id = %s",
+            (vacation_id,),
+            fetch_one=True
+        )
+        planned = execute_query(
+            """SELECT title FROM events WHERE vacation_id = %s
+               UNION ALL
+               SELECT title FROM excursions WHERE vacation_id = %s""",
+            (vacation_id, vacation_id)
+        )
+        planned_titles = sorted(row['title'] for row in planned)
+
+        inputs = [
+            dataset_version(), vacation['location'], vacation['vibe'],
+            vacation['start_date'].isoformat(), vacation['end_date'].isoformat(), planned_titles
+        ]
+        inputs_hash = hashlib.sha256(json.dumps(inputs).encode('utf-8')).hexdigest()
+
+        changed = inputs_hash != state['inputs_hash']
+        if changed:
+            recommendations = score_candidates(
+                vacation['location'], vacation['vibe'], vacation['start_date'], vacation['end_date'],
+                planned_titles
+            )
+            execute_query("DELETE FROM recommendations WHERE vacation_id = %s", (vacation_id,))
+            bulk_insert(
+                'recommendations',
+                ['vacation_id'] + list(RECOMMENDATION_COLUMNS),
+                [(vacation_id,) + tuple(row[column] for column in RECOMMENDATION_COLUMNS)
+                 for row in recommendations]
+            )
+
+        execute_query(
+            """UPDATE recommendation_state
+               SET stale = FALSE, computed_at = now(), inputs_hash = %s, refresh_requested_at = NULL
+               WHERE vacation_id = %s""",
+            (inputs_hash, vacation_id)
+        )
+
+    return changed
+
+
+def refresh_due_recommendations(limit: int = REFRESH_SWEEP_SIZE) -> List[str]:
+    """
+    Refresh the sets readers asked for, then those due for upcoming trips
+
+    Sets of past trips are left alone until someone reads them. A failure
+    is logged and the sweep moves on to the next vacation.
+
+    Returns:
+        IDs of the vacations refreshed
+    """
+    due = execute_query(
+        f"""(SELECT s.vacation_id, s.refresh_requested_at, s.computed_at
+             FROM recommendation_state s
+             WHERE s.refresh_requested_at IS NOT NULL
+             ORDER BY s.refresh_requested_at
+             LIMIT %s)
+            UNION
+            (SELECT s.vacation_id, s.refresh_requested_at, s.computed_at
+             FROM recommendation_state s
+             JOIN vacations v ON v.id = s.vacation_id
+             WHERE {DUE_CONDITION} AND v.end_date >= CURRENT_DATE
+             ORDER BY s.computed_at NULLS FIRST
+             LIMIT %s)
+            ORDER BY refresh_requested_at NULLS LAST, computed_at NULLS FIRST
+            LIMIT %s""",
+        (limit, RECOMMENDATIONS_TTL, limit, limit)
+    ) or []
+
+    refreshed = []
+    for row in due:
+        vacation_id = str(row['vacation_id'])
+        try:
+            refresh_recommendations(vacation_id)
+            refreshed.append(vacation_id)
+        except Exception as e:
+            print(f"Error refreshing recommendations for {vacation_id}: {str(e)}")
+
+    return refreshed
+
+
+def handle_refresh_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Run a refresh_recommendations task, or the scheduled sweep
+
+    Errors in a task are raised so the asynchronous invocation is retried.
+
+    Args:
+        event: {'task': 'refresh_recommendations', 'vacation_ids': [...]},
+            or an EventBridge scheduled event
+
+    Returns:
+        Dict with the number of vacations refreshed
+    """
+    if event.get('task') != 'refresh_recommendations':
+        return {'refreshed': len(refresh_due_recommendations())}
+
+    vacation_ids = event.get('vacation_ids') or []
+    for vacation_id in vacation_ids:
+        refresh_recommendations(vacation_id)
+
+    return {'refreshed': len(vacation_ids)}
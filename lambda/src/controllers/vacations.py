@@ -2,31 +2,58 @@
 Vacation controller - handles CRUD operations for vacations
 """
 
+import os
 from typing import Dict, Any
-from utils.response import success_response, created_response, not_found, bad_request, server_error
-from utils.database import execute_query, execute_insert
+from utils.response import (
+    success_response, created_response, cached_response, cached_json_response, make_etag, max_age,
+    not_found, bad_request, server_error
+)
+from utils.database import execute_query, execute_returning
 from utils.auth import get_user_id
+from utils.access import (
+    member_exists, get_member_role, remember_role, get_cached_vacation, cache_vacation,
+    invalidate_vacation, invalidate_membership
+)
+from utils.pagination import Page, PaginationError
 from datetime import datetime
 
 
+VACATION_FIELDS = (
+    'id', 'name', 'location', 'description', 'start_date', 'end_date', 'vibe',
+    'created_by', 'created_at', 'updated_at', 'member_count'
+)
+
+# Seconds a client may reuse a snapshot before revalidating it; a screen
+# that loads it and its parts in quick succession sends one request
+SNAPSHOT_MAX_AGE = int(os.environ.get('SNAPSHOT_MAX_AGE', '10'))
+
+
 def list_vacations(event: Dict[str, Any]) -> Dict[str, Any]:
-    """List all vacations for the authenticated user"""
+    """List a page of vacations for the authenticated user, newest first"""
     try:
         user_id = get_user_id(event)
+        page = Page(event, ('v.start_date', 'v.id'), VACATION_FIELDS, descending=True)
+        keyset, keyset_params = page.keyset_condition()
 
-        query = """
-            SELECT v.*, COUNT(DISTINCT vm.user_id) as member_count
-            FROM vacations v
-            LEFT JOIN vacation_members vm ON v.id = vm.vacation_id
-            WHERE v.id IN (SELECT vacation_id FROM vacation_members WHERE user_id = %s)
-            GROUP BY v.id
-            ORDER BY v.start_date DESC
+        # The user's memberships come straight off the (user_id, vacation_id)
+        # index and member_count is maintained by a trigger, so there is
+        # nothing to group or count per request
+        query = f"""
+            SELECT {page.columns('v')}, {page.cursor_columns()}
+            FROM vacation_members vm
+            JOIN vacations v ON v.id = vm.vacation_id
+            WHERE vm.user_id = %s AND {keyset}
+            ORDER BY {page.order_by()}
+            LIMIT %s
         """
 
-        vacations = execute_query(query, (user_id,))
+        vacations = execute_query(query, (user_id,) + keyset_params + (page.fetch_limit,))
 
-        return success_response(vacations or [])
+        vacations, next_cursor = page.finish(vacations or [])
+        return cached_response(event, vacations, next_cursor=next_cursor)
 
+    except PaginationError as e:
+        return bad_request(str(e))
     except Exception as e:
         print(f"Error listing vacations: {str(e)}")
         return server_error()
@@ -38,39 +65,105 @@ def get_vacation(event: Dict[str, Any]) -> Dict[str, Any]:
         vacation_id = event.get('path_parameters', {}).get('id')
         user_id = get_user_id(event)
 
-        # Check if user is a member of this vacation
-        member_check = execute_query(
-            "SELECT 1 FROM vacation_members WHERE vacation_id = %s AND user_id = %s",
-            (vacation_id, user_id),
-            fetch_one=True
+        # Served without a query when both the membership and the row are
+        # cached; the membership is only looked up if the row is
+        vacation = get_cached_vacation(vacation_id)
+        if vacation is not None and get_member_role(event, vacation_id) is None:
+            return not_found('Vacation not found or access denied')
+
+        if vacation is None:
+            # Get vacation details; the membership check is part of the query.
+            # member_count is a column; the other counts are each their own
+            # index lookup so large trips don't fan out into a join.
+            query = """
+                SELECT v.*,
+                       (SELECT COUNT(*) FROM events e WHERE e.vacation_id = v.id) as event_count,
+                       (SELECT COUNT(*) FROM excursions ex WHERE ex.vacation_id = v.id) as excursion_count,
+                       me.role as member_role
+                FROM vacations v
+                JOIN vacation_members me ON me.vacation_id = v.id AND me.user_id = %s
+                WHERE v.id = %s
+            """
+
+            vacation = execute_query(query, (user_id, vacation_id), fetch_one=True)
+
+            if not vacation:
+                remember_role(vacation_id, user_id, None)
+                return not_found('Vacation not found or access denied')
+
+            role = vacation.pop('member_role')
+            event.setdefault('memberships', {})[vacation_id] = role
+            remember_role(vacation_id, user_id, role)
+            cache_vacation(vacation)
+
+        # updated_at covers the vacation's own columns, the counts the rest
+        etag = make_etag(
+            vacation['id'], vacation['updated_at'], vacation['member_count'],
+            vacation['event_count'], vacation['excursion_count']
         )
+        return cached_response(event, vacation, etag)
 
-        if not member_check:
-            return not_found('Vacation not found or access denied')
+    except Exception as e:
+        print(f"Error getting vacation: {str(e)}")
+        return server_error()
+
+
+def get_vacation_snapshot(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Get a whole vacation in one document: details, members, events,
+    excursions, packing items and the user's itineraries with their items
 
-        # Get vacation details
-        query = """
-            SELECT v.*,
-                   COUNT(DISTINCT vm.user_id) as member_count,
-                   COUNT(DISTINCT e.id) as event_count,
-                   COUNT(DISTINCT ex.id) as excursion_count
+    Postgres assembles the nested JSON in a single query and the text is
+    passed through to the response without building Python rows.
+    """
+    try:
+        vacation_id = event.get('path_parameters', {}).get('vacation_id')
+        user_id = get_user_id(event)
+
+        query = f"""
+            SELECT json_build_object(
+                'vacation', to_json(v),
+                'members', COALESCE((
+                    SELECT json_agg(vm ORDER BY vm.joined_at, vm.id)
+                    FROM vacation_members vm WHERE vm.vacation_id = v.id
+                ), '[]'::json),
+                'events', COALESCE((
+                    SELECT json_agg(e ORDER BY e.event_date, e.event_time, e.id)
+                    FROM events e WHERE e.vacation_id = v.id
+                ), '[]'::json),
+                'excursions', COALESCE((
+                    SELECT json_agg(ex ORDER BY ex.start_date, ex.start_time, ex.id)
+                    FROM excursions ex WHERE ex.vacation_id = v.id
+                ), '[]'::json),
+                'packing_items', COALESCE((
+                    SELECT json_agg(p ORDER BY p.category, p.item_name, p.id)
+                    FROM packing_items p WHERE p.vacation_id = v.id
+                ), '[]'::json),
+                'itineraries', COALESCE((
+                    SELECT json_agg(
+                        to_jsonb(i) || jsonb_build_object('items', COALESCE((
+                            SELECT jsonb_agg(it ORDER BY it.scheduled_date, it.scheduled_time,
+                                                         it.display_order, it.id)
+                            FROM itinerary_items it WHERE it.itinerary_id = i.id
+                        ), '[]'::jsonb))
+                        ORDER BY i.created_at, i.id
+                    )
+                    FROM itineraries i WHERE i.vacation_id = v.id AND i.user_id = %s
+                ), '[]'::json)
+            )::text AS snapshot
             FROM vacations v
-            LEFT JOIN vacation_members vm ON v.id = vm.vacation_id
-            LEFT JOIN events e ON v.id = e.vacation_id
-            LEFT JOIN excursions ex ON v.id = ex.vacation_id
-            WHERE v.id = %s
-            GROUP BY v.id
+            WHERE v.id = %s AND {member_exists('v.id')}
         """
 
-        vacation = execute_query(query, (vacation_id,), fetch_one=True)
+        result = execute_query(query, (user_id, vacation_id, user_id), fetch_one=True)
 
-        if not vacation:
-            return not_found('Vacation not found')
+        if not result:
+            return not_found('Vacation not found or access denied')
 
-        return success_response(vacation)
+        return cached_json_response(event, result['snapshot'], max_age(SNAPSHOT_MAX_AGE))
 
     except Exception as e:
-        print(f"Error getting vacation: {str(e)}")
+        print(f"Error getting vacation snapshot: {str(e)}")
         return server_error()
 
 
@@ -86,35 +179,35 @@ def create_vacation(event: Dict[str, Any]) -> Dict[str, Any]:
             if not body.get(field):
                 return bad_request(f'Missing required field: {field}')
 
-        # Insert vacation
-        query = """
-            INSERT INTO vacations (name, location, description, start_date, end_date, vibe, created_by)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            RETURNING id
+        # Insert the vacation and its owner membership in one statement. The
+        # owner's member_count trigger runs after new_vacation's RETURNING,
+        # which still has 0, so the count is the owner alone
+        columns = ', '.join(f'nv.{field}' for field in VACATION_FIELDS if field != 'member_count')
+        query = f"""
+            WITH new_vacation AS (
+                INSERT INTO vacations (name, location, description, start_date, end_date, vibe, created_by)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING *
+            ), owner AS (
+                INSERT INTO vacation_members (vacation_id, user_id, role)
+                SELECT id, %s, 'owner' FROM new_vacation
+            )
+            SELECT {columns}, 1 AS member_count FROM new_vacation nv
         """
 
-        vacation_id = execute_insert(query, (
+        vacation = execute_returning(query, (
             body['name'],
             body['location'],
             body.get('description'),
             body['start_date'],
             body['end_date'],
             body.get('vibe'),
+            user_id,
             user_id
         ))
 
-        # Add creator as a member
-        execute_query(
-            "INSERT INTO vacation_members (vacation_id, user_id, role) VALUES (%s, %s, %s)",
-            (vacation_id, user_id, 'owner')
-        )
-
-        # Get the created vacation
-        vacation = execute_query(
-            "SELECT * FROM vacations WHERE id = %s",
-            (vacation_id,),
-            fetch_one=True
-        )
+        event.setdefault('memberships', {})[str(vacation['id'])] = 'owner'
+        remember_role(vacation['id'], user_id, 'owner')
 
         return created_response(vacation, 'Vacation created successfully')
 
@@ -127,19 +220,8 @@ def update_vacation(event: Dict[str, Any]) -> Dict[str, Any]:
     """Update a vacation"""
     try:
         vacation_id = event.get('path_parameters', {}).get('id')
-        user_id = get_user_id(event)
         body = event.get('body_json', {})
 
-        # Check if user is a member
-        member_check = execute_query(
-            "SELECT role FROM vacation_members WHERE vacation_id = %s AND user_id = %s",
-            (vacation_id, user_id),
-            fetch_one=True
-        )
-
-        if not member_check:
-            return not_found('Vacation not found or access denied')
-
         # Build update query dynamically based on provided fields
         update_fields = []
         params = []
@@ -154,22 +236,22 @@ def update_vacation(event: Dict[str, Any]) -> Dict[str, Any]:
         if not update_fields:
             return bad_request('No fields to update')
 
-        params.append(vacation_id)
+        params.extend([vacation_id, get_user_id(event)])
 
+        # The membership check is part of the statement
         query = f"""
             UPDATE vacations
             SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP
-            WHERE id = %s
+            WHERE id = %s AND {member_exists('vacations.id')}
+            RETURNING *
         """
 
-        execute_query(query, tuple(params))
+        vacation = execute_returning(query, tuple(params))
 
-        # Get updated vacation
-        vacation = execute_query(
-            "SELECT * FROM vacations WHERE id = %s",
-            (vacation_id,),
-            fetch_one=True
-        )
+        if not vacation:
+            return not_found('Vacation not found or access denied')
+
+        invalidate_vacation(vacation_id)
 
         return success_response(vacation, 'Vacation updated successfully')
 
@@ -182,20 +264,19 @@ def delete_vacation(event: Dict[str, Any]) -> Dict[str, Any]:
     """Delete a vacation (owner only)"""
     try:
         vacation_id = event.get('path_parameters', {}).get('id')
-        user_id = get_user_id(event)
 
-        # Check if user is the owner
-        member_check = execute_query(
-            "SELECT role FROM vacation_members WHERE vacation_id = %s AND user_id = %s",
-            (vacation_id, user_id),
-            fetch_one=True
+        # Delete vacation if the user owns it (cascade will delete related records)
+        deleted = execute_returning(
+            f"DELETE FROM vacations WHERE id = %s AND {member_exists('vacations.id', owner_only=True)} RETURNING id",
+            (vacation_id, get_user_id(event))
         )
 
-        if not member_check or member_check['role'] != 'owner':
+        if not deleted:
             return not_found('Vacation not found or insufficient permissions')
 
-        # Delete vacation (cascade will delete related records)
-        execute_query("DELETE FROM vacations WHERE id = %s", (vacation_id,))
+        event.setdefault('memberships', {}).pop(vacation_id, None)
+        invalidate_vacation(vacation_id)
+        invalidate_membership(vacation_id)
 
         return success_response({}, 'Vacation deleted successfully')
 
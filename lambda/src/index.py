@@ -8,7 +8,6 @@ import os
 from typing import Dict, Any
 from routes import router
 from utils.response import create_response
-from utils.auth import verify_token
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -16,6 +15,16 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     Main Lambda handler function
     Routes requests to appropriate handlers
     """
+    # S3 upload notifications; errors propagate so S3 retries the event
+    if event.get('Records'):
+        from controllers.photos import handle_upload_events
+        return handle_upload_events(event)
+
+    # Recommendation refreshes: the scheduled sweep, or a manual task invoke
+    if event.get('task') == 'refresh_recommendations' or event.get('source') == 'aws.events':
+        from controllers.recommendations import handle_refresh_event
+        return handle_refresh_event(event)
+
     try:
         # Extract request details
         http_method = event.get('requestContext', {}).get('http', {}).get('method', '')
@@ -39,7 +48,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         if not auth_header:
             return create_response(401, {'error': 'Missing authorization header'})
 
-        # Verify JWT token
+        # Verify JWT token; imported here so /health never loads PyJWT
+        from utils.auth import verify_token
         user_info = verify_token(auth_header)
         if not user_info:
             return create_response(401, {'error': 'Invalid or expired token'})
@@ -48,8 +58,22 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         event['user'] = user_info
         event['body_json'] = body_json
 
-        # Route the request
-        response = router.route(http_method, path, event)
+        # Imported here so /health never loads psycopg2
+        from utils.database import unit_of_work, take_statements_invalidated
+
+        # Route the request; all of its statements share one transaction,
+        # which is only committed for successful responses. A request that
+        # failed because a migration invalidated the prepared statements
+        # was rolled back, so it is run once more
+        for attempt in range(2):
+            event['memberships'] = {}
+            with unit_of_work() as work:
+                response = router.route(http_method, path, event)
+                if response.get('statusCode', 500) >= 400:
+                    work.rollback_only = True
+
+            if not take_statements_invalidated() or response.get('statusCode', 500) < 500:
+                break
 
         return response
 
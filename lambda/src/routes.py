@@ -3,19 +3,20 @@ API Route Handler
 Maps HTTP methods and paths to controller functions
 """
 
-from typing import Dict, Any
-from controllers import (
-    vacations,
-    events,
-    excursions,
-    members,
-    photos,
-    chat,
-    recommendations,
-    packing,
-    itinerary
-)
-from utils.response import create_response
+import importlib
+import sys
+import time
+from typing import Dict, Any, List, Optional
+from utils.response import create_response, create_raw_response
+from utils import serializer
+
+
+# Handlers are named as '<controller module>.<function>' and imported on the
+# first request that needs them, keeping unused controllers out of cold starts
+CONTROLLERS_PACKAGE = 'controllers'
+
+# Maximum number of sub-requests in one POST /batch
+MAX_BATCH_SIZE = 25
 
 
 class Router:
@@ -24,87 +25,310 @@ class Router:
     def __init__(self):
         self.routes = {
             # Vacation routes
-            'GET /vacations': vacations.list_vacations,
-            'POST /vacations': vacations.create_vacation,
-            'GET /vacations/{id}': vacations.get_vacation,
-            'PUT /vacations/{id}': vacations.update_vacation,
-            'DELETE /vacations/{id}': vacations.delete_vacation,
+            'GET /vacations': 'vacations.list_vacations',
+            'POST /vacations': 'vacations.create_vacation',
+            'GET /vacations/{id}': 'vacations.get_vacation',
+            'PUT /vacations/{id}': 'vacations.update_vacation',
+            'DELETE /vacations/{id}': 'vacations.delete_vacation',
+            'GET /vacations/{vacation_id}/snapshot': 'vacations.get_vacation_snapshot',
 
             # Member routes
-            'GET /vacations/{vacation_id}/members': members.list_members,
-            'POST /vacations/{vacation_id}/members': members.add_member,
-            'DELETE /vacations/{vacation_id}/members/{member_id}': members.remove_member,
+            'GET /vacations/{vacation_id}/members': 'members.list_members',
+            'POST /vacations/{vacation_id}/members': 'members.add_member',
+            'DELETE /vacations/{vacation_id}/members/{member_id}': 'members.remove_member',
 
             # Event routes
-            'GET /vacations/{vacation_id}/events': events.list_events,
-            'POST /vacations/{vacation_id}/events': events.create_event,
-            'PUT /vacations/{vacation_id}/events/{event_id}': events.update_event,
-            'DELETE /vacations/{vacation_id}/events/{event_id}': events.delete_event,
+            'GET /vacations/{vacation_id}/events': 'events.list_events',
+            'POST /vacations/{vacation_id}/events': 'events.create_event',
+            'POST /vacations/{vacation_id}/events/bulk': 'events.bulk_create_events',
+            'PUT /vacations/{vacation_id}/events/bulk': 'events.bulk_update_events',
+            'PUT /vacations/{vacation_id}/events/{event_id}': 'events.update_event',
+            'DELETE /vacations/{vacation_id}/events/{event_id}': 'events.delete_event',
 
             # Excursion routes
-            'GET /vacations/{vacation_id}/excursions': excursions.list_excursions,
-            'POST /vacations/{vacation_id}/excursions': excursions.create_excursion,
-            'PUT /vacations/{vacation_id}/excursions/{excursion_id}': excursions.update_excursion,
-            'DELETE /vacations/{vacation_id}/excursions/{excursion_id}': excursions.delete_excursion,
+            'GET /vacations/{vacation_id}/excursions': 'excursions.list_excursions',
+            'POST /vacations/{vacation_id}/excursions': 'excursions.create_excursion',
+            'PUT /vacations/{vacation_id}/excursions/{excursion_id}': 'excursions.update_excursion',
+            'DELETE /vacations/{vacation_id}/excursions/{excursion_id}': 'excursions.delete_excursion',
 
             # Photo routes
-            'GET /vacations/{vacation_id}/photos': photos.list_photos,
-            'POST /vacations/{vacation_id}/photos': photos.upload_photo,
-            'DELETE /vacations/{vacation_id}/photos/{photo_id}': photos.delete_photo,
-            'GET /vacations/{vacation_id}/photos/{photo_id}/url': photos.get_photo_url,
+            'GET /vacations/{vacation_id}/photos': 'photos.list_photos',
+            'POST /vacations/{vacation_id}/photos': 'photos.upload_photo',
+            'POST /vacations/{vacation_id}/photos/urls': 'photos.get_photo_urls',
+            'POST /vacations/{vacation_id}/photos/{photo_id}/complete': 'photos.complete_upload',
+            'DELETE /vacations/{vacation_id}/photos/{photo_id}': 'photos.delete_photo',
+            'GET /vacations/{vacation_id}/photos/{photo_id}/url': 'photos.get_photo_url',
 
             # Chat routes
-            'GET /vacations/{vacation_id}/messages': chat.list_messages,
-            'POST /vacations/{vacation_id}/messages': chat.send_message,
-            'DELETE /vacations/{vacation_id}/messages/{message_id}': chat.delete_message,
+            'GET /vacations/{vacation_id}/messages': 'chat.list_messages',
+            'POST /vacations/{vacation_id}/messages': 'chat.send_message',
+            'DELETE /vacations/{vacation_id}/messages/{message_id}': 'chat.delete_message',
 
             # Packing list routes
-            'GET /vacations/{vacation_id}/packing': packing.get_packing_list,
-            'POST /vacations/{vacation_id}/packing': packing.add_packing_item,
-            'PUT /vacations/{vacation_id}/packing/{item_id}': packing.update_packing_item,
-            'DELETE /vacations/{vacation_id}/packing/{item_id}': packing.delete_packing_item,
+            'GET /vacations/{vacation_id}/packing': 'packing.get_packing_list',
+            'POST /vacations/{vacation_id}/packing': 'packing.add_packing_item',
+            'POST /vacations/{vacation_id}/packing/bulk': 'packing.bulk_add_packing_items',
+            'PUT /vacations/{vacation_id}/packing/bulk': 'packing.bulk_update_packing_items',
+            'PUT /vacations/{vacation_id}/packing/packed': 'packing.set_packed_items',
+            'GET /vacations/{vacation_id}/packing/templates': 'packing.list_packing_templates',
+            'POST /vacations/{vacation_id}/packing/templates/{template_id}': 'packing.apply_packing_template',
+            'PUT /vacations/{vacation_id}/packing/{item_id}': 'packing.update_packing_item',
+            'DELETE /vacations/{vacation_id}/packing/{item_id}': 'packing.delete_packing_item',
 
             # Itinerary routes
-            'GET /vacations/{vacation_id}/itinerary': itinerary.get_itinerary,
-            'POST /vacations/{vacation_id}/itinerary': itinerary.create_itinerary,
-            'PUT /vacations/{vacation_id}/itinerary/{itinerary_id}': itinerary.update_itinerary,
+            'GET /vacations/{vacation_id}/itinerary': 'itinerary.get_itinerary',
+            'POST /vacations/{vacation_id}/itinerary': 'itinerary.create_itinerary',
+            'PUT /vacations/{vacation_id}/itinerary/{itinerary_id}': 'itinerary.update_itinerary',
+            'POST /vacations/{vacation_id}/itinerary/{itinerary_id}/items/bulk': 'itinerary.bulk_add_itinerary_items',
+            'PUT /vacations/{vacation_id}/itinerary/{itinerary_id}/items/bulk': 'itinerary.bulk_update_itinerary_items',
+            'PUT /vacations/{vacation_id}/itinerary/{itinerary_id}/items/order': 'itinerary.reorder_itinerary_items',
 
             # Recommendations routes
-            'GET /vacations/{vacation_id}/recommendations': recommendations.get_recommendations,
+            'GET /vacations/{vacation_id}/recommendations': 'recommendations.get_recommendations',
         }
 
+        # Sub-requests are dispatched through this router
+        self.routes['POST /batch'] = self.batch
+
+        # Milliseconds spent importing each controller module
+        self.import_timings: Dict[str, float] = {}
+
+        self._tree = _RouteNode()
+        for route_key, handler in self.routes.items():
+            self._insert(route_key, handler)
+
+    def add_route(self, route_key: str, handler) -> None:
+        """
+        Register a handler for a 'METHOD /path/{param}' route key
+
+        The handler is either a callable or a '<module>.<function>' name
+        under the controllers package, imported on first use.
+        """
+        self.routes[route_key] = handler
+        self._insert(route_key, handler)
+
+    def _insert(self, route_key: str, handler) -> None:
+        """Add a route to the segment tree"""
+        method, pattern = route_key.split(' ', 1)
+        node = self._tree
+        param_names = []
+
+        for segment in _split_path(pattern):
+            if segment.startswith('{') and segment.endswith('}'):
+                param_names.append(segment[1:-1])
+                if node.param is None:
+                    node.param = _RouteNode()
+                node = node.param
+            else:
+                node = node.children.setdefault(segment, _RouteNode())
+
+        node.handlers[method] = (handler, tuple(param_names))
+
     def route(self, method: str, path: str, event: Dict[str, Any]) -> Dict[str, Any]:
         """Route request to appropriate handler"""
-        # Try exact match first
-        route_key = f"{method} {path}"
-        if route_key in self.routes:
-            return self.routes[route_key](event)
-
-        # Try pattern matching for parameterized routes
-        for pattern, handler in self.routes.items():
-            if self._match_pattern(pattern, route_key, event):
-                return handler(event)
-
-        return create_response(404, {'error': 'Route not found'})
-
-    def _match_pattern(self, pattern: str, route_key: str, event: Dict[str, Any]) -> bool:
-        """Match route pattern with parameters"""
-        pattern_parts = pattern.split('/')
-        route_parts = route_key.split('/')
-
-        if len(pattern_parts) != len(route_parts):
-            return False
-
-        params = {}
-        for i, part in enumerate(pattern_parts):
-            if part.startswith('{') and part.endswith('}'):
-                param_name = part[1:-1]
-                params[param_name] = route_parts[i]
-            elif part != route_parts[i]:
-                return False
-
-        event['path_parameters'] = params
-        return True
+        segments = _split_path(path)
+        values = []
+        node = self._find(self._tree, segments, 0, values, method)
+
+        if node is None:
+            allowed = self._allowed_methods(self._tree, segments, 0)
+            if not allowed:
+                return create_response(404, {'error': 'Route not found'})
+            return create_response(405, {'error': 'Method not allowed'}, {'Allow': ', '.join(sorted(allowed))})
+
+        handler, param_names = node.handlers[method]
+        if isinstance(handler, str):
+            handler = self._load_handler(handler)
+            node.handlers[method] = (handler, param_names)
+
+        event['path_parameters'] = dict(zip(param_names, values))
+        return handler(event)
+
+    def batch(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Run several API requests in one invocation
+
+        Body: {"requests": [{"method", "path", "body", "query", "headers"}],
+               "atomic": false}
+
+        Sub-requests share the caller's verified token, membership cache and
+        database transaction. Each one runs in a savepoint, so a failed
+        sub-request is undone without affecting the others. With atomic set,
+        the first failure stops the batch and rolls everything back.
+        Results come back in order as {"status", "headers", "body"}.
+        """
+        from utils.database import savepoint, mark_rollback_only, take_statements_invalidated
+
+        body = event.get('body_json') or {}
+        requests = body.get('requests')
+        atomic = bool(body.get('atomic', False))
+
+        if not isinstance(requests, list) or not requests:
+            return create_response(400, {'error': 'requests must be a non-empty list'})
+        if len(requests) > MAX_BATCH_SIZE:
+            return create_response(400, {'error': f'At most {MAX_BATCH_SIZE} requests per batch'})
+
+        for request in requests:
+            if (not isinstance(request, dict)
+                    or not isinstance(request.get('method'), str)
+                    or not isinstance(request.get('path'), str)):
+                return create_response(400, {'error': 'Each request needs a method and a path'})
+            if _split_path(request['path'])[:1] == ['batch']:
+                return create_response(400, {'error': 'Batches cannot be nested'})
+
+        memberships = event.setdefault('memberships', {})
+        results = []
+        failed = False
+
+        for request in requests:
+            if failed:
+                results.append(_serialize_result(
+                    424, {}, serializer.dumps({'error': 'Skipped after an earlier failure'})
+                ))
+                continue
+
+            method = request['method'].upper()
+            sub_event = {
+                'requestContext': {'http': {'method': method}},
+                'rawPath': request['path'],
+                'headers': {k.lower(): v for k, v in (request.get('headers') or {}).items()},
+                'queryStringParameters': request.get('query') or {},
+                'user': event.get('user'),
+                'body_json': request.get('body') or {},
+                'memberships': memberships,
+            }
+
+            # A sub-request that failed because a migration invalidated the
+            # prepared statements was rolled back, so it is run once more
+            for attempt in range(2):
+                with savepoint() as sp:
+                    response = self.route(method, request['path'], sub_event)
+                    status = response.get('statusCode', 500)
+                    if status >= 400:
+                        sp.rollback = True
+                        memberships.clear()
+
+                if not take_statements_invalidated() or status < 500:
+                    break
+
+            results.append(_serialize_result(status, response.get('headers', {}), response.get('body')))
+
+            if atomic and status >= 400:
+                failed = True
+                mark_rollback_only()
+
+        committed = not failed
+        serialized_body = (
+            '{"success":' + ('true' if committed else 'false')
+            + ',"committed":' + ('true' if committed else 'false')
+            + ',"data":[' + ','.join(results) + ']}'
+        )
+        return create_raw_response(200, serialized_body)
+
+    def _load_handler(self, name: str):
+        """Resolve a '<module>.<function>' handler name, importing its controller"""
+        module_name, function_name = name.rsplit('.', 1)
+        qualified_name = f"{CONTROLLERS_PACKAGE}.{module_name}"
+
+        module = sys.modules.get(qualified_name)
+        if module is None:
+            start = time.perf_counter()
+            module = importlib.import_module(qualified_name)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.import_timings[module_name] = elapsed_ms
+            print(f"Loaded controller {module_name} in {elapsed_ms:.1f}ms")
+
+        return getattr(module, function_name)
+
+    def preload(self) -> None:
+        """Import every controller and resolve every handler up front"""
+        stack = [self._tree]
+        while stack:
+            node = stack.pop()
+            for method, (handler, param_names) in node.handlers.items():
+                if isinstance(handler, str):
+                    node.handlers[method] = (self._load_handler(handler), param_names)
+            stack.extend(node.children.values())
+            if node.param is not None:
+                stack.append(node.param)
+
+    def _find(self, node: '_RouteNode', segments: List[str], index: int,
+              values: List[str], method: str) -> Optional['_RouteNode']:
+        """
+        Walk the segment tree to a node handling method
+
+        Static segments are preferred over parameters, but a static branch
+        without a handler for the method falls back to the parameter one:
+        DELETE .../packing/bulk reaches DELETE .../packing/{item_id}, since
+        packing/bulk only has POST and PUT.
+        """
+        if index == len(segments):
+            return node if method in node.handlers else None
+
+        segment = segments[index]
+
+        child = node.children.get(segment)
+        if child is not None:
+            found = self._find(child, segments, index + 1, values, method)
+            if found is not None:
+                return found
+
+        if node.param is not None and segment:
+            values.append(segment)
+            found = self._find(node.param, segments, index + 1, values, method)
+            if found is not None:
+                return found
+            values.pop()
+
+        return None
+
+    def _allowed_methods(self, node: '_RouteNode', segments: List[str], index: int) -> set:
+        """Methods of every route matching the path, for a 405's Allow header"""
+        if index == len(segments):
+            return set(node.handlers)
+
+        segment = segments[index]
+        methods = set()
+
+        child = node.children.get(segment)
+        if child is not None:
+            methods |= self._allowed_methods(child, segments, index + 1)
+        if node.param is not None and segment:
+            methods |= self._allowed_methods(node.param, segments, index + 1)
+
+        return methods
+
+
+class _RouteNode:
+    """One path segment in the route tree"""
+
+    __slots__ = ('children', 'param', 'handlers')
+
+    def __init__(self):
+        self.children = {}
+        self.param = None
+        self.handlers = {}
+
+
+def _serialize_result(status: int, headers: Dict[str, str], body: Optional[str]) -> str:
+    """
+    Serialize one batch result, splicing in the already serialized body
+
+    Sub-responses are JSON strings; embedding them directly avoids parsing
+    and re-encoding every sub-response.
+    """
+    kept_headers = {k: v for k, v in headers.items() if k in ('ETag', 'Cache-Control', 'Allow')}
+    return (
+        '{"status":' + str(int(status))
+        + ',"headers":' + serializer.dumps(kept_headers)
+        + ',"body":' + (body or 'null') + '}'
+    )
+
+
+def _split_path(path: str) -> List[str]:
+    """Split a path into segments, ignoring leading and trailing slashes"""
+    path = path.strip('/')
+    return path.split('/') if path else []
 
 
 router = Router()
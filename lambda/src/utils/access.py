@@ -0,0 +1,235 @@
+"""
+Vacation access utilities
+"""
+
+import os
+from typing import Optional, Dict, Any, List
+from utils.database import execute_query, on_rollback
+from utils.auth import get_user_id
+from utils.cache import TTLCache, MISSING
+
+
+# Membership roles and vacation headers change rarely but are read on almost
+# every request. Writes in this container invalidate them; the TTLs bound
+# how long a write made by another container can go unseen.
+MEMBERSHIP_CACHE_TTL = float(os.environ.get('MEMBERSHIP_CACHE_TTL', '30'))
+VACATION_CACHE_TTL = float(os.environ.get('VACATION_CACHE_TTL', '15'))
+ACCESS_CACHE_SIZE = int(os.environ.get('ACCESS_CACHE_SIZE', '2048'))
+
+# Roles keyed by (vacation_id, user_id); only memberships are cached, so a
+# newly added member never waits out a TTL to get in
+_membership_cache = TTLCache('memberships', ACCESS_CACHE_SIZE, MEMBERSHIP_CACHE_TTL)
+
+# Vacation rows with their member/event/excursion counts, keyed by ID
+_vacation_cache = TTLCache('vacations', ACCESS_CACHE_SIZE, VACATION_CACHE_TTL)
+
+
+# Membership predicate to fold into data queries; takes the user ID as its
+# only parameter and correlates on the given vacation ID column
+MEMBER_EXISTS_SQL = (
+    "EXISTS (SELECT 1 FROM vacation_members WHERE vacation_id = {column} AND user_id = %s{role})"
+)
+
+
+def member_exists(column: str, owner_only: bool = False) -> str:
+    """
+    Build an EXISTS predicate checking the current user's membership
+
+    Args:
+        column: SQL expression holding the vacation ID, e.g. 'v.id'
+        owner_only: Only match if the user owns the vacation
+
+    Returns:
+        SQL fragment with one %s placeholder for the user ID
+    """
+    role = " AND role = 'owner'" if owner_only else ''
+    return MEMBER_EXISTS_SQL.format(column=column, role=role)
+
+
+def get_member_role(event: Dict[str, Any], vacation_id: str, use_cache: bool = True) -> Optional[str]:
+    """
+    Look up the current user's role in a vacation
+
+    Results are cached on the event, so repeated checks within one request
+    cost a single query.
+
+    Write paths whose statements don't repeat the membership check pass
+    use_cache=False. The role is then read from the database, and the
+    membership row is locked FOR SHARE, so the member can't be removed
+    before the request's transaction ends.
+
+    Args:
+        event: Lambda event dict
+        vacation_id: Vacation ID
+        use_cache: Accept a role cached by this request or container
+
+    Returns:
+        Role string, or None if the user is not a member
+    """
+    memberships = event.setdefault('memberships', {})
+    if use_cache and vacation_id in memberships:
+        return memberships[vacation_id]
+
+    user_id = get_user_id(event)
+    role = _membership_cache.get((_cache_key(vacation_id), user_id)) if use_cache else MISSING
+    if role is MISSING:
+        lock = '' if use_cache else ' FOR SHARE'
+        result = execute_query(
+            f"SELECT role FROM vacation_members WHERE vacation_id = %s AND user_id = %s{lock}",
+            (vacation_id, user_id),
+            fetch_one=True
+        )
+        role = result['role'] if result else None
+        remember_role(vacation_id, user_id, role)
+
+    memberships[vacation_id] = role
+    return role
+
+
+def has_access(event: Dict[str, Any], vacation_id: str, use_cache: bool = True) -> bool:
+    """Check if the current user is a member of a vacation"""
+    return get_member_role(event, vacation_id, use_cache) is not None
+
+
+def fetch_member_rows(
+    event: Dict[str, Any],
+    vacation_id: str,
+    table: str,
+    order_by: Optional[str] = None,
+    columns: str = 't.*',
+    join_filter: str = 'TRUE',
+    params: tuple = (),
+    limit: Optional[int] = None
+) -> Optional[List[Dict]]:
+    """
+    Fetch a vacation's rows from a table together with the access check
+
+    The membership row drives a LEFT JOIN onto the table, so a non-member
+    gets no rows back and a member with no data gets one all-NULL row.
+    Both cases are told apart in a single round-trip.
+
+    Args:
+        event: Lambda event dict
+        vacation_id: Vacation ID
+        table: Table with id and vacation_id columns
+        order_by: ORDER BY expression over the table alias t
+        columns: Select list over the table alias t; must include t.id
+        join_filter: Extra condition on t, e.g. a keyset condition
+        params: Parameters for join_filter
+        limit: Maximum number of rows
+
+    Returns:
+        List of rows, or None if the user is not a member
+    """
+    # The rows come from a LATERAL subquery so its ORDER BY ... LIMIT can
+    # walk the table's (vacation_id, sort keys) index and stop early; the
+    # row number carries that order through the join
+    order = f"ORDER BY {order_by}" if order_by else ''
+    row_number = f", ROW_NUMBER() OVER ({order}) AS _row" if order_by else ''
+    limit_clause = f"LIMIT {int(limit)}" if limit is not None else ''
+
+    query = f"""
+        SELECT t.*, vm.role AS member_role
+        FROM vacation_members vm
+        LEFT JOIN LATERAL (
+            SELECT {columns}{row_number}
+            FROM {table} t
+            WHERE t.vacation_id = vm.vacation_id AND {join_filter}
+            {order}
+            {limit_clause}
+        ) t ON TRUE
+        WHERE vm.vacation_id = %s AND vm.user_id = %s
+    """
+    if order_by:
+        query += " ORDER BY t._row"
+
+    user_id = get_user_id(event)
+    rows = execute_query(query, tuple(params) + (vacation_id, user_id))
+    if not rows:
+        event.setdefault('memberships', {})[vacation_id] = None
+        _membership_cache.invalidate((_cache_key(vacation_id), user_id))
+        return None
+
+    event.setdefault('memberships', {})[vacation_id] = rows[0]['member_role']
+    remember_role(vacation_id, user_id, rows[0]['member_role'])
+
+    results = []
+    for row in rows:
+        del row['member_role']
+        row.pop('_row', None)
+        if row['id'] is not None:
+            results.append(row)
+
+    return results
+
+
+def _cache_key(vacation_id: Any) -> str:
+    """Normalize a vacation ID from a path or a row into a cache key"""
+    return str(vacation_id).lower()
+
+
+def remember_role(vacation_id: str, user_id: str, role: Optional[str]) -> None:
+    """
+    Cache a role read from, or just written to, vacation_members
+
+    A None role is not cached and drops any stale entry instead. The entry
+    is dropped again if the transaction that produced it is rolled back.
+
+    Args:
+        vacation_id: Vacation ID
+        user_id: Cognito user ID
+        role: Role string, or None if the user is not a member
+    """
+    key = (_cache_key(vacation_id), user_id)
+    if role is None:
+        _membership_cache.invalidate(key)
+        return
+
+    _membership_cache.set(key, role)
+    on_rollback(lambda: _membership_cache.invalidate(key))
+
+
+def invalidate_membership(vacation_id: str, user_id: Optional[str] = None) -> None:
+    """
+    Drop cached roles after a membership write
+
+    Args:
+        vacation_id: Vacation ID
+        user_id: Member to drop; every member of the vacation when None
+    """
+    vacation_id = _cache_key(vacation_id)
+    if user_id is not None:
+        _membership_cache.invalidate((vacation_id, user_id))
+    else:
+        _membership_cache.invalidate_where(lambda key: key[0] == vacation_id)
+
+
+def get_cached_vacation(vacation_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Get a vacation row with its counts from the in-process cache
+
+    Args:
+        vacation_id: Vacation ID
+
+    Returns:
+        Copy of the cached row, or None on a miss
+    """
+    vacation = _vacation_cache.get(_cache_key(vacation_id))
+    return None if vacation is MISSING else dict(vacation)
+
+
+def cache_vacation(vacation: Dict[str, Any]) -> None:
+    """Cache a vacation row with its counts, undone if the transaction rolls back"""
+    key = _cache_key(vacation['id'])
+    _vacation_cache.set(key, dict(vacation))
+    on_rollback(lambda: _vacation_cache.invalidate(key))
+
+
+def invalidate_vacation(vacation_id: str) -> None:
+    """
+    Drop a cached vacation row after a write to it or to a counted child table
+
+    Args:
+        vacation_id: Vacation ID
+    """
+    _vacation_cache.invalidate(_cache_key(vacation_id))
@@ -3,9 +3,209 @@ Authentication utilities
 """
 
 import os
+import json
+import time
+import threading
+import hashlib
 import jwt
-from typing import Optional, Dict
-from jwt import PyJWKClient
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+from jwt import PyJWKSet
+
+
+# Signing keys cached by kid across invocations of a warm container
+JWKS_CACHE_TTL = float(os.environ.get('JWKS_CACHE_TTL', '3600'))
+JWKS_FETCH_TIMEOUT = float(os.environ.get('JWKS_FETCH_TIMEOUT', '5'))
+
+# Minimum seconds between refetches triggered by an unknown kid
+JWKS_MIN_REFRESH_INTERVAL = 30.0
+
+_jwks_keys: Dict[str, Any] = {}
+_jwks_url: Optional[str] = None
+_jwks_fetched_at = 0.0
+_jwks_lock = threading.Lock()
+
+# Verified tokens, keyed by SHA-256 of the token, until their own exp
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '1024'))
+
+_token_cache: 'OrderedDict[str, tuple]' = OrderedDict()
+_token_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'revocations': 0}
+_token_cache_lock = threading.Lock()
+
+# Tokens revoked in this container, kept until their own exp
+_revoked_tokens: Dict[str, float] = {}
+
+
+def get_jwks_url() -> str:
+    """
+    Build the Cognito JWKS URL
+
+    JWKS_URL overrides it, e.g. with a file:// or localhost URL pointing at
+    a local key set when running offline.
+    """
+    override = os.environ.get('JWKS_URL')
+    if override:
+        return override
+
+    user_pool_id = os.environ.get('USER_POOL_ID')
+    region = os.environ.get('AWS_REGION', 'us-east-1')
+    return f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json'
+
+
+def _fetch_jwks(url: str) -> Dict[str, Any]:
+    """Download a JWKS document and index its signing keys by kid"""
+    # urllib.request pulls in http.client and email; only pay for it on a fetch
+    import urllib.request
+
+    with urllib.request.urlopen(url, timeout=JWKS_FETCH_TIMEOUT) as response:
+        jwks = json.load(response)
+
+    return {jwk.key_id: jwk.key for jwk in PyJWKSet.from_dict(jwks).keys}
+
+
+def get_signing_key(kid: str) -> Optional[Any]:
+    """
+    Look up a signing key by kid, refreshing the cached key set when needed
+
+    The key set is refetched when its TTL has expired, or once when an
+    unknown kid shows up (key rotation). Concurrent misses wait on a single
+    fetch instead of each downloading the document.
+
+    Args:
+        kid: Key ID from the token header
+
+    Returns:
+        Public key, or None if the kid is not in the key set
+    """
+    global _jwks_keys, _jwks_url, _jwks_fetched_at
+
+    url = get_jwks_url()
+
+    # Fast path: no locking while the cache is fresh
+    if url == _jwks_url and time.monotonic() - _jwks_fetched_at < JWKS_CACHE_TTL:
+        key = _jwks_keys.get(kid)
+        if key is not None:
+            return key
+
+    with _jwks_lock:
+        age = time.monotonic() - _jwks_fetched_at
+        same_url = url == _jwks_url
+
+        # Another caller may have refreshed the keys while we waited
+        if same_url and age < JWKS_CACHE_TTL:
+            if kid in _jwks_keys:
+                return _jwks_keys[kid]
+            if age < JWKS_MIN_REFRESH_INTERVAL:
+                return None
+
+        try:
+            keys = _fetch_jwks(url)
+        except Exception as e:
+            # Keep serving previously fetched keys if Cognito is unreachable
+            if same_url and kid in _jwks_keys:
+                print(f"JWKS refresh failed, using cached keys: {str(e)}")
+                return _jwks_keys[kid]
+            raise
+
+        _jwks_keys = keys
+        _jwks_url = url
+        _jwks_fetched_at = time.monotonic()
+
+        return _jwks_keys.get(kid)
+
+
+def _token_digest(token: str) -> str:
+    """Cache key for a token; the raw token is never kept in memory"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def _get_cached_token(digest: str) -> Optional[Dict]:
+    """Return cached user info for a verified token that has not expired"""
+    with _token_cache_lock:
+        entry = _token_cache.get(digest)
+        if entry is None:
+            _token_cache_stats['misses'] += 1
+            return None
+
+        user_info, expires_at = entry
+        if time.time() >= expires_at:
+            del _token_cache[digest]
+            _token_cache_stats['misses'] += 1
+            return None
+
+        _token_cache.move_to_end(digest)
+        _token_cache_stats['hits'] += 1
+        return dict(user_info)
+
+
+def _cache_token(digest: str, user_info: Dict, expires_at: float) -> None:
+    """Remember a verified token, evicting the least recently used entry"""
+    if TOKEN_CACHE_SIZE <= 0:
+        return
+
+    with _token_cache_lock:
+        _token_cache[digest] = (dict(user_info), expires_at)
+        _token_cache.move_to_end(digest)
+
+        while len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+            _token_cache_stats['evictions'] += 1
+
+
+def revoke_token(token: str) -> None:
+    """
+    Reject a token for the rest of its lifetime in this container
+
+    Call this when a token is revoked (e.g. on global sign-out). The token
+    is dropped from the verified-token cache and refused until its exp.
+    """
+    if token.startswith('Bearer '):
+        token = token.split(' ')[1]
+
+    try:
+        expires_at = float(jwt.decode(token, options={'verify_signature': False})['exp'])
+    except Exception:
+        expires_at = time.time() + JWKS_CACHE_TTL
+
+    digest = _token_digest(token)
+    now = time.time()
+
+    with _token_cache_lock:
+        for revoked, revoked_until in list(_revoked_tokens.items()):
+            if revoked_until <= now:
+                del _revoked_tokens[revoked]
+
+        _revoked_tokens[digest] = expires_at
+        _token_cache.pop(digest, None)
+        _token_cache_stats['revocations'] += 1
+
+
+def _is_token_revoked(digest: str) -> bool:
+    """Check whether a token digest has been revoked"""
+    revoked_until = _revoked_tokens.get(digest)
+    return revoked_until is not None and time.time() < revoked_until
+
+
+def clear_token_cache() -> None:
+    """Drop every cached token verification"""
+    with _token_cache_lock:
+        _token_cache.clear()
+
+
+def get_token_cache_stats() -> Dict:
+    """
+    Verified-token cache counters for this container
+
+    Returns:
+        Dict with hits, misses, evictions, revocations, size and hit_rate
+    """
+    with _token_cache_lock:
+        stats = dict(_token_cache_stats)
+        stats['size'] = len(_token_cache)
+
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+    return stats
 
 
 def verify_token(auth_header: str) -> Optional[Dict]:
@@ -25,20 +225,25 @@ def verify_token(auth_header: str) -> Optional[Dict]:
 
         token = auth_header.split(' ')[1]
 
-        # Get Cognito configuration
-        user_pool_id = os.environ.get('USER_POOL_ID')
-        region = os.environ.get('AWS_REGION', 'us-east-1')
+        # Skip signature verification for tokens we have already accepted
+        digest = _token_digest(token)
+        if _is_token_revoked(digest):
+            return None
 
-        # Build Cognito JWKS URL
-        jwks_url = f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}/.well-known/jwks.json'
+        cached = _get_cached_token(digest)
+        if cached is not None:
+            return cached
 
-        # Verify and decode token
-        jwks_client = PyJWKClient(jwks_url)
-        signing_key = jwks_client.get_signing_key_from_jwt(token)
+        # Look up the signing key from the cached Cognito key set
+        kid = jwt.get_unverified_header(token).get('kid')
+        signing_key = get_signing_key(kid) if kid else None
+        if signing_key is None:
+            print("Token verification error: unknown signing key")
+            return None
 
         decoded_token = jwt.decode(
             token,
-            signing_key.key,
+            signing_key,
             algorithms=['RS256'],
             options={'verify_exp': True}
         )
@@ -51,6 +256,9 @@ def verify_token(auth_header: str) -> Optional[Dict]:
             'token_use': decoded_token.get('token_use')
         }
 
+        if 'exp' in decoded_token:
+            _cache_token(digest, user_info, float(decoded_token['exp']))
+
         return user_info
 
     except Exception as e:
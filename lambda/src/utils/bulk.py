@@ -0,0 +1,309 @@
+"""
+Bulk write utilities
+"""
+
+import uuid
+from datetime import date, time
+from typing import Optional, Dict, Any, List, Tuple, Callable
+from psycopg2.extras import execute_values
+from utils.database import get_db_connection
+from utils.response import bulk_response, bad_request
+
+
+# Maximum number of items in one bulk request
+MAX_BULK_ITEMS = 500
+
+
+class ValidationError(ValueError):
+    """Raised by item validators for a single invalid item"""
+
+
+def get_bulk_items(body: Dict[str, Any]) -> List[Any]:
+    """
+    Extract the items array from a bulk request body
+
+    Raises:
+        ValidationError: If items is missing, empty or too long
+    """
+    items = body.get('items')
+    if not isinstance(items, list) or not items:
+        raise ValidationError('items must be a non-empty list')
+    if len(items) > MAX_BULK_ITEMS:
+        raise ValidationError(f'At most {MAX_BULK_ITEMS} items per request')
+    return items
+
+
+def validate_items(
+    items: List[Any],
+    validator: Callable[[Dict[str, Any]], Any]
+) -> Tuple[List[Any], List[Dict[str, Any]]]:
+    """
+    Run a validator over every item, collecting per-item errors
+
+    Args:
+        items: Items from the request body
+        validator: Returns the normalized item or raises ValidationError
+
+    Returns:
+        ([(index, normalized item)] for valid items,
+         [{'index', 'error'}] for invalid ones)
+    """
+    valid = []
+    errors = []
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'error': 'Item must be an object'})
+            continue
+        try:
+            valid.append((index, validator(item)))
+        except ValidationError as e:
+            errors.append({'index': index, 'error': str(e)})
+
+    return valid, errors
+
+
+def require(item: Dict[str, Any], field: str) -> Any:
+    """Return a required field, raising ValidationError if it is missing"""
+    value = item.get(field)
+    if value is None or value == '':
+        raise ValidationError(f'Missing required field: {field}')
+    return value
+
+
+def parse_str(value: Any, field: str, max_length: Optional[int] = None) -> Optional[str]:
+    """Validate a string, no longer than its column allows"""
+    if value is None:
+        return None
+    if not isinstance(value, str):
+        raise ValidationError(f'{field} must be a string')
+    if max_length is not None and len(value) > max_length:
+        raise ValidationError(f'{field} must be at most {max_length} characters')
+    return value
+
+
+def parse_uuid(value: Any, field: str) -> str:
+    """Validate a UUID string"""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        raise ValidationError(f'{field} must be a UUID')
+
+
+def parse_date(value: Any, field: str) -> Optional[str]:
+    """Validate an ISO date string"""
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ValidationError(f'{field} must be a YYYY-MM-DD date')
+
+
+def parse_time(value: Any, field: str) -> Optional[str]:
+    """Validate an ISO time string"""
+    if value is None:
+        return None
+    try:
+        return time.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ValidationError(f'{field} must be an HH:MM[:SS] time')
+
+
+def parse_int(value: Any, field: str, minimum: Optional[int] = None) -> Optional[int]:
+    """Validate an integer, no smaller than minimum if given"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValidationError(f'{field} must be an integer')
+    if minimum is not None and value < minimum:
+        raise ValidationError(f'{field} must be at least {minimum}')
+    return value
+
+
+def parse_bool(value: Any, field: str) -> Optional[bool]:
+    """Validate a boolean"""
+    if value is None:
+        return None
+    if not isinstance(value, bool):
+        raise ValidationError(f'{field} must be true or false')
+    return value
+
+
+def bulk_insert(table: str, columns: List[str], rows: List[tuple]) -> List[Dict]:
+    """
+    Insert many rows with one multi-row INSERT ... RETURNING *
+
+    Args:
+        table: Table name
+        columns: Column names, in the order of each row tuple
+        rows: Row value tuples
+
+    Returns:
+        Inserted rows
+    """
+    if not rows:
+        return []
+
+    query = f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s RETURNING *"
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            return execute_values(cursor, query, rows, page_size=len(rows), fetch=True)
+
+
+def bulk_update(
+    table: str,
+    column_types: Dict[str, str],
+    items: List[Dict[str, Any]],
+    scope_column: str,
+    scope_value: Any
+) -> List[Dict]:
+    """
+    Update many rows by id with one UPDATE ... FROM (VALUES ...) RETURNING *
+
+    Each item only changes the columns it contains; a per-column flag in
+    the VALUES list keeps the current value for the others.
+
+    Args:
+        table: Table name
+        column_types: Updatable column names mapped to their SQL types
+        items: Dicts with an 'id' plus any subset of the columns
+        scope_column: Column every updated row must match, e.g. vacation_id
+        scope_value: Value of scope_column
+
+    Returns:
+        Updated rows; ids outside the scope are silently skipped
+    """
+    if not items:
+        return []
+
+    columns = list(column_types)
+    template = '(' + ', '.join(
+        ['%s::uuid'] + [f'%s::{column_types[c]}, %s::boolean' for c in columns]
+    ) + ')'
+    value_columns = ', '.join(['id'] + [f'{c}, set_{c}' for c in columns])
+    assignments = ', '.join(
+        f'{c} = CASE WHEN v.set_{c} THEN v.{c} ELSE t.{c} END' for c in columns
+    )
+
+    rows = []
+    for item in items:
+        row = [item['id']]
+        for column in columns:
+            row.extend((item.get(column), column in item))
+        rows.append(tuple(row))
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            scope = cursor.mogrify('%s', (scope_value,)).decode('utf-8')
+            query = f"""
+                UPDATE {table} AS t SET {assignments}
+                FROM (VALUES %s) AS v({value_columns})
+                WHERE t.id = v.id AND t.{scope_column} = {scope}
+                RETURNING t.*
+            """
+            return execute_values(cursor, query, rows, template=template,
+                                  page_size=len(rows), fetch=True)
+
+
+def duplicate_ids(valid: List[Tuple[int, Dict[str, Any]]]) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]]]:
+    """
+    Split off (index, item) pairs repeating an earlier item's id
+
+    One UPDATE ... FROM (VALUES ...) can only apply one of them, and which
+    one is up to the planner, so later repeats are reported instead.
+
+    Returns:
+        (first item for each id, [{'index', 'error'}] for the repeats)
+    """
+    seen = set()
+    unique = []
+    errors = []
+    for index, item in valid:
+        if item['id'] in seen:
+            errors.append({'index': index, 'error': 'Duplicate id'})
+        else:
+            seen.add(item['id'])
+            unique.append((index, item))
+    return unique, errors
+
+
+def missing_ids(requested: List[Tuple[int, Dict[str, Any]]], returned: List[Dict]) -> List[Dict[str, Any]]:
+    """Per-item errors for requested (index, item) pairs whose id was not returned"""
+    found = {str(row['id']) for row in returned}
+    return [
+        {'index': index, 'error': 'Not found'}
+        for index, item in requested
+        if item['id'] not in found
+    ]
+
+
+def create_items(
+    body: Dict[str, Any],
+    validator: Callable[[Dict[str, Any]], tuple],
+    table: str,
+    columns: List[str],
+    prefix: tuple = (),
+    suffix: tuple = ()
+) -> Dict[str, Any]:
+    """
+    Validate and insert the items of a bulk create request
+
+    Invalid items are reported per index and the rest are inserted, unless
+    the body sets atomic, in which case any invalid item fails the request.
+
+    Args:
+        body: Request body with items and optional atomic flag
+        validator: Returns the item's column values or raises ValidationError
+        table: Table name
+        columns: All inserted columns: prefix, validated values, suffix
+        prefix: Values placed before each item's values, e.g. (vacation_id,)
+        suffix: Values placed after each item's values, e.g. (user_id,)
+
+    Raises:
+        ValidationError: If the items array itself is invalid
+    """
+    valid, errors = validate_items(get_bulk_items(body), validator)
+
+    if errors and (body.get('atomic') or not valid):
+        return bad_request('Validation failed', errors)
+
+    rows = bulk_insert(table, columns, [prefix + tuple(values) + suffix for _, values in valid])
+    return bulk_response(rows, errors, 201)
+
+
+def update_items(
+    body: Dict[str, Any],
+    validator: Callable[[Dict[str, Any]], Dict[str, Any]],
+    table: str,
+    column_types: Dict[str, str],
+    scope_column: str,
+    scope_value: Any
+) -> Dict[str, Any]:
+    """
+    Validate and apply the items of a bulk update request
+
+    Items whose id does not exist in the scope are reported as 'Not found',
+    and items repeating an earlier item's id as 'Duplicate id'. With atomic
+    set, any invalid, repeated or missing item fails the whole request
+    (the caller's unit of work rolls back on the error response).
+
+    Raises:
+        ValidationError: If the items array itself is invalid
+    """
+    valid, errors = validate_items(get_bulk_items(body), validator)
+    valid, duplicates = duplicate_ids(valid)
+    errors = sorted(errors + duplicates, key=lambda error: error['index'])
+
+    if errors and (body.get('atomic') or not valid):
+        return bad_request('Validation failed', errors)
+
+    rows = bulk_update(table, column_types, [item for _, item in valid], scope_column, scope_value)
+
+    missing = missing_ids(valid, rows)
+    if missing and body.get('atomic'):
+        return bad_request('Validation failed', missing)
+
+    errors = sorted(errors + missing, key=lambda error: error['index'])
+    return bulk_response(rows, errors)
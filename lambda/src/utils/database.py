@@ -4,16 +4,61 @@ Database connection utilities
 
 import os
 import json
-import boto3
+import time
+import select
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Optional, Dict
+from collections import OrderedDict
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor, execute_batch
+from typing import Optional, Dict, Sequence, Tuple, Callable
 from contextlib import contextmanager
 
 
 # Cache database credentials
 _db_credentials = None
 
+# Connection kept alive across invocations of a warm container
+_connection = None
+_connection_last_used = 0.0
+_connection_stats = {'hits': 0, 'misses': 0, 'reconnects': 0}
+
+# Autocommit connection for LISTEN, opened by the first long-poll
+_listen_connection = None
+
+# Unit of work for the request currently being handled, if any
+_unit_of_work = None
+
+# Named prepared statements on the cached connection, keyed by query text,
+# least recently used first; query texts that can't be prepared, likewise
+_prepared_statements: 'OrderedDict[str, str]' = OrderedDict()
+_unpreparable_queries: 'OrderedDict[str, None]' = OrderedDict()
+_prepared_stats = {'prepares': 0, 'hits': 0, 'failures': 0, 'evictions': 0, 'invalidations': 0}
+
+# Statement names are never reused, so one dropped from the registry can
+# still be deallocated later without clashing with a new one
+_statement_counter = 0
+
+# Set when the server rejected a prepared statement because the schema
+# changed; the statements are dropped and DEALLOCATE ALL runs once the
+# connection is out of the failed transaction
+_deallocate_pending = False
+_statements_invalidated = False
+
+# Server-side prepared statements pin sessions behind RDS Proxy; set
+# DB_PREPARED_STATEMENTS=0 to turn them off there
+PREPARED_STATEMENTS = os.environ.get('DB_PREPARED_STATEMENTS', '1') != '0'
+MAX_PREPARED_STATEMENTS = int(os.environ.get('DB_MAX_PREPARED_STATEMENTS', '256'))
+MAX_UNPREPARABLE_QUERIES = int(os.environ.get('DB_MAX_UNPREPARABLE_QUERIES', '256'))
+
+# SQLSTATE 0A000, raised when a migration changed the columns a prepared
+# statement returns (e.g. ALTER TABLE ... ADD COLUMN under SELECT *)
+STALE_PLAN_SQLSTATE = '0A000'
+STALE_PLAN_MESSAGE = 'cached plan must not change result type'
+
+# Seconds a cached connection may sit idle before it is pinged again
+HEALTH_CHECK_INTERVAL = float(os.environ.get('DB_HEALTH_CHECK_INTERVAL', '30'))
+CONNECT_TIMEOUT = int(os.environ.get('DB_CONNECT_TIMEOUT', '5'))
+
 
 def get_db_credentials() -> Dict:
     """
@@ -31,7 +76,10 @@ def get_db_credentials() -> Dict:
     if not secret_arn:
         raise ValueError('DB_SECRET_ARN environment variable not set')
 
-    # Get secret from Secrets Manager
+    # Get secret from Secrets Manager; boto3 is only needed once per
+    # container, so keep its import off the cold-start path
+    import boto3
+
     client = boto3.client('secretsmanager')
     response = client.get_secret_value(SecretId=secret_arn)
 
@@ -41,36 +89,591 @@ def get_db_credentials() -> Dict:
     return _db_credentials
 
 
+def _open_connection():
+    """Open a new database connection"""
+    credentials = get_db_credentials()
+
+    return psycopg2.connect(
+        host=credentials['host'],
+        port=credentials['port'],
+        database=credentials['dbname'],
+        user=credentials['username'],
+        password=credentials['password'],
+        cursor_factory=RealDictCursor,
+        connect_timeout=CONNECT_TIMEOUT,
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3
+    )
+
+
+def _close_quietly(conn) -> None:
+    """Close a connection, ignoring errors from an already broken socket"""
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+
+def _is_connection_usable(conn) -> bool:
+    """
+    Cheap health check for a cached connection
+
+    Only round-trips to the server when the connection has been idle for
+    longer than HEALTH_CHECK_INTERVAL, which is where RDS idle timeouts and
+    failovers show up.
+    """
+    if conn.closed:
+        return False
+
+    try:
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            conn.rollback()
+
+        if time.monotonic() - _connection_last_used < HEALTH_CHECK_INTERVAL:
+            return True
+
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _acquire_connection():
+    """Return the cached connection, reconnecting if it is missing or stale"""
+    global _connection
+
+    conn = _connection
+    if conn is not None and _is_connection_usable(conn):
+        _connection_stats['hits'] += 1
+        return conn
+
+    if conn is None:
+        _connection_stats['misses'] += 1
+    else:
+        _connection_stats['reconnects'] += 1
+        _close_quietly(conn)
+
+    _connection = None
+    _reset_prepared_statements()
+    _connection = _open_connection()
+    return _connection
+
+
+def close_db_connection() -> None:
+    """Close and forget the cached connection"""
+    global _connection
+
+    if _connection is not None:
+        _close_quietly(_connection)
+    _connection = None
+    _reset_prepared_statements()
+    _close_listen_connection()
+
+
+def get_connection_stats() -> Dict:
+    """
+    Connection reuse counters for this container
+
+    Returns:
+        Dict with hits, misses, reconnects and whether a connection is open
+    """
+    stats = dict(_connection_stats)
+    stats['connected'] = _connection is not None and not _connection.closed
+    return stats
+
+
+def _rollback_quietly(conn) -> None:
+    """Roll back a failed transaction, dropping the connection if it is broken"""
+    if conn.closed:
+        close_db_connection()
+        return
+
+    try:
+        conn.rollback()
+    except psycopg2.Error:
+        close_db_connection()
+
+
+class UnitOfWork:
+    """Request-scoped transaction shared by every helper in this module"""
+
+    def __init__(self):
+        self.connection = None
+        self.rollback_only = False
+        self.savepoints = 0
+        self.rollback_hooks = []
+
+    def run_rollback_hooks(self, start: int = 0) -> None:
+        """Run and drop the hooks registered since position start"""
+        hooks = self.rollback_hooks[start:]
+        del self.rollback_hooks[start:]
+        for hook in reversed(hooks):
+            try:
+                hook()
+            except Exception as e:
+                print(f"Rollback hook failed: {str(e)}")
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Run every statement inside the block on one connection and one transaction
+
+    The connection is only acquired when the first statement runs, so
+    requests that never touch the database pay nothing. The transaction
+    commits when the block exits normally, and rolls back on an exception
+    or when rollback_only has been set. Nested calls join the outer unit.
+
+    Usage:
+        with unit_of_work() as work:
+            execute_insert(...)
+            execute_query(...)
+    """
+    global _unit_of_work, _connection_last_used
+
+    if _unit_of_work is not None:
+        yield _unit_of_work
+        return
+
+    work = UnitOfWork()
+    _unit_of_work = work
+
+    try:
+        yield work
+        if work.connection is not None:
+            if work.rollback_only:
+                _rollback_quietly(work.connection)
+                work.run_rollback_hooks()
+            else:
+                work.connection.commit()
+    except Exception as e:
+        if work.connection is not None:
+            _rollback_quietly(work.connection)
+        work.run_rollback_hooks()
+        raise e
+    finally:
+        _unit_of_work = None
+        if work.connection is not None:
+            _connection_last_used = time.monotonic()
+
+
+def mark_rollback_only() -> None:
+    """Make the current unit of work roll back instead of committing"""
+    if _unit_of_work is not None:
+        _unit_of_work.rollback_only = True
+
+
+def on_rollback(hook: Callable[[], None]) -> None:
+    """
+    Register a callback to run if the current transaction is undone
+
+    Used to drop in-process cache entries that were filled from, or depend
+    on, uncommitted writes. Hooks registered inside a savepoint also run
+    when just that savepoint is rolled back. Outside a unit of work every
+    statement commits on its own, so there is nothing to register.
+
+    Args:
+        hook: Callable taking no arguments
+    """
+    if _unit_of_work is not None:
+        _unit_of_work.rollback_hooks.append(hook)
+
+
+class Savepoint:
+    """Handle for a savepoint opened by savepoint()"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rollback = False
+
+
+@contextmanager
+def savepoint():
+    """
+    Nested transaction inside the current unit of work
+
+    Statements in the block are released into the request transaction,
+    or undone on an exception or when the handle's rollback flag is set.
+    Rolling back also clears a transaction aborted by a failed statement.
+
+    Usage:
+        with savepoint() as sp:
+            response = handler(event)
+            sp.rollback = response['statusCode'] >= 400
+    """
+    work = _unit_of_work
+    if work is None:
+        raise RuntimeError('savepoint() requires an active unit_of_work()')
+
+    with get_db_connection() as conn:
+        handle = Savepoint(f'sp_{work.savepoints}')
+        work.savepoints += 1
+
+        with conn.cursor() as cursor:
+            cursor.execute(f'SAVEPOINT {handle.name}')
+        hooks_start = len(work.rollback_hooks)
+
+        try:
+            yield handle
+        except Exception as e:
+            with conn.cursor() as cursor:
+                cursor.execute(f'ROLLBACK TO SAVEPOINT {handle.name}')
+            work.run_rollback_hooks(hooks_start)
+            raise e
+
+        with conn.cursor() as cursor:
+            if handle.rollback:
+                cursor.execute(f'ROLLBACK TO SAVEPOINT {handle.name}')
+            cursor.execute(f'RELEASE SAVEPOINT {handle.name}')
+        if handle.rollback:
+            work.run_rollback_hooks(hooks_start)
+
+
+class Listener:
+    """Handle for a channel subscribed to by listen()"""
+
+    def __init__(self, conn, channel: str):
+        self.conn = conn
+        self.channel = channel
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Block until a notification arrives on the channel or timeout passes
+
+        Notifications arrive on the listening connection, so the request
+        transaction is left open and uncommitted while waiting. Statements
+        run after a wakeup see the notifying transaction's rows, since each
+        statement takes a fresh snapshot under READ COMMITTED.
+
+        Args:
+            timeout: Seconds to wait at most
+
+        Returns:
+            True if a notification arrived, False on timeout
+        """
+        if timeout <= 0:
+            return False
+
+        deadline = time.monotonic() + timeout
+
+        while True:
+            self.conn.poll()
+            if any(notify.channel == self.channel for notify in self.conn.notifies):
+                del self.conn.notifies[:]
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            select.select([self.conn], [], [], remaining)
+
+
+def _acquire_listen_connection():
+    """Return the cached autocommit connection used for LISTEN, reconnecting if needed"""
+    global _listen_connection
+
+    conn = _listen_connection
+    if conn is not None and not conn.closed:
+        return conn
+
+    _listen_connection = None
+    conn = _open_connection()
+    conn.autocommit = True
+    _listen_connection = conn
+    return conn
+
+
+def _close_listen_connection() -> None:
+    """Close and forget the LISTEN connection"""
+    global _listen_connection
+
+    if _listen_connection is not None:
+        _close_quietly(_listen_connection)
+    _listen_connection = None
+
+
+@contextmanager
+def listen(channel: str):
+    """
+    Subscribe to a NOTIFY channel for the duration of the block
+
+    LISTEN only takes effect once committed, and notifications are only
+    delivered between transactions, so the subscription lives on a second,
+    autocommit connection. The request's unit of work is never committed
+    early, whatever it has written.
+
+    Run the query that might be empty inside the block, after subscribing,
+    so a notification sent in between is not missed.
+
+    Usage:
+        with listen('chat_abc') as listener:
+            rows = fetch()
+            while not rows and listener.wait(deadline - time.monotonic()):
+                rows = fetch()
+
+    Args:
+        channel: Channel name; quoted as an identifier
+    """
+    quoted = '"' + channel.replace('"', '""') + '"'
+
+    try:
+        conn = _acquire_listen_connection()
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {quoted}')
+    except psycopg2.OperationalError:
+        # A connection that dropped while idle; reconnect once
+        _close_listen_connection()
+        conn = _acquire_listen_connection()
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN {quoted}')
+    del conn.notifies[:]
+
+    try:
+        yield Listener(conn, channel)
+    finally:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f'UNLISTEN {quoted}')
+            del conn.notifies[:]
+        except psycopg2.Error:
+            _close_listen_connection()
+
+
 @contextmanager
 def get_db_connection():
     """
     Context manager for database connections
 
+    The underlying connection is reused across invocations of a warm
+    container. Outside a unit of work each block runs in its own
+    transaction; inside one, the block joins the request transaction and
+    commit/rollback is left to unit_of_work().
+
     Usage:
         with get_db_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("SELECT * FROM vacations")
                 results = cursor.fetchall()
     """
-    credentials = get_db_credentials()
+    global _connection_last_used
 
-    conn = psycopg2.connect(
-        host=credentials['host'],
-        port=credentials['port'],
-        database=credentials['dbname'],
-        user=credentials['username'],
-        password=credentials['password'],
-        cursor_factory=RealDictCursor
-    )
+    work = _unit_of_work
+    if work is not None:
+        if work.connection is None:
+            work.connection = _acquire_connection()
+        yield work.connection
+        return
+
+    conn = _acquire_connection()
 
     try:
         yield conn
         conn.commit()
     except Exception as e:
-        conn.rollback()
+        _rollback_quietly(conn)
         raise e
     finally:
-        conn.close()
+        _connection_last_used = time.monotonic()
+
+
+def _reset_prepared_statements() -> None:
+    """Forget prepared statements; they only exist on the old connection"""
+    global _deallocate_pending
+
+    _prepared_statements.clear()
+    _unpreparable_queries.clear()
+    _deallocate_pending = False
+
+
+def _to_positional(query: str) -> Tuple[Optional[str], int]:
+    """
+    Rewrite %s placeholders as $1..$n for PREPARE
+
+    Returns:
+        (rewritten query, placeholder count); the query is None when it
+        can't be rewritten safely: named placeholders, dollar quoting, or
+        multiple statements
+    """
+    if '$' in query or ';' in query:
+        return None, 0
+
+    parts = []
+    count = 0
+    in_string = False
+    i = 0
+
+    while i < len(query):
+        char = query[i]
+        if char == "'":
+            in_string = not in_string
+        elif char == '%' and not in_string:
+            following = query[i + 1:i + 2]
+            if following == 's':
+                count += 1
+                parts.append(f'${count}')
+                i += 2
+                continue
+            if following == '%':
+                parts.append('%')
+                i += 2
+                continue
+            return None, 0
+        parts.append(char)
+        i += 1
+
+    return ''.join(parts), count
+
+
+def _remember_unpreparable(query: str) -> None:
+    """Execute a query text directly from now on, keeping the set bounded"""
+    _unpreparable_queries[query] = None
+    _unpreparable_queries.move_to_end(query)
+    while len(_unpreparable_queries) > MAX_UNPREPARABLE_QUERIES:
+        _unpreparable_queries.popitem(last=False)
+
+
+def _prepare(cursor, query: str, param_count: int) -> Optional[str]:
+    """
+    PREPARE a query on the current connection and register its name
+
+    Runs inside a savepoint so a statement Postgres can't prepare (e.g. a
+    parameter whose type can't be inferred) doesn't abort the transaction.
+    The savepoint is opened on its own: a syntax error fails a whole
+    multi-statement string, savepoint included. PREPARE itself is not
+    transactional, so later rollbacks keep it. When the registry is full,
+    the least recently used statement is deallocated along with opening
+    the savepoint.
+    """
+    global _statement_counter
+
+    positional, count = _to_positional(query)
+    if positional is None or count != param_count:
+        _remember_unpreparable(query)
+        return None
+
+    evicted = None
+    if len(_prepared_statements) >= MAX_PREPARED_STATEMENTS:
+        _, evicted = _prepared_statements.popitem(last=False)
+        _prepared_stats['evictions'] += 1
+
+    _statement_counter += 1
+    name = f'vaca_stmt_{_statement_counter}'
+    deallocate = f'DEALLOCATE {evicted}; ' if evicted else ''
+
+    cursor.execute(f'{deallocate}SAVEPOINT vaca_prepare')
+    try:
+        cursor.execute(f'PREPARE {name} AS {positional}; RELEASE SAVEPOINT vaca_prepare')
+    except psycopg2.Error as e:
+        cursor.execute('ROLLBACK TO SAVEPOINT vaca_prepare; RELEASE SAVEPOINT vaca_prepare')
+        print(f"Could not prepare statement, executing directly: {str(e).strip()}")
+        _prepared_stats['failures'] += 1
+        _remember_unpreparable(query)
+        return None
+
+    _prepared_statements[query] = name
+    _prepared_stats['prepares'] += 1
+    return name
+
+
+def _is_stale_plan(error: psycopg2.Error) -> bool:
+    """Whether an EXECUTE failed because the schema changed under it"""
+    return error.pgcode == STALE_PLAN_SQLSTATE and STALE_PLAN_MESSAGE in str(error)
+
+
+def _invalidate_prepared_statements() -> None:
+    """Drop every prepared statement after the schema changed under one"""
+    global _deallocate_pending, _statements_invalidated
+
+    _prepared_statements.clear()
+    _deallocate_pending = True
+    _statements_invalidated = True
+    _prepared_stats['invalidations'] += 1
+
+
+def _execute(cursor, query: str, params: Optional[tuple]) -> None:
+    """
+    Execute a query through a prepared statement when possible
+
+    A prepared statement gets its parameter types from the query, while a
+    direct execution sends Python values as literals. Cast any parameter
+    whose type matters (arrays, floats compared with real columns) so both
+    paths, and DB_PREPARED_STATEMENTS=0, behave the same.
+
+    If a migration changed what a prepared statement returns, all of them
+    are dropped. Outside a unit of work the statement is alone in its
+    transaction, so it is rolled back and run once more; inside one the
+    error propagates and the request is retried by the caller (see
+    take_statements_invalidated).
+    """
+    global _deallocate_pending
+
+    if not PREPARED_STATEMENTS or query in _unpreparable_queries or isinstance(params, dict):
+        cursor.execute(query, params)
+        return
+
+    if _deallocate_pending and cursor.connection.get_transaction_status() != extensions.TRANSACTION_STATUS_INERROR:
+        cursor.execute('DEALLOCATE ALL')
+        _deallocate_pending = False
+
+    name = _prepared_statements.get(query)
+    if name is None:
+        name = _prepare(cursor, query, len(params or ()))
+        if name is None:
+            cursor.execute(query, params)
+            return
+    else:
+        _prepared_statements.move_to_end(query)
+        _prepared_stats['hits'] += 1
+
+    try:
+        if params:
+            cursor.execute(f"EXECUTE {name}({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f'EXECUTE {name}')
+    except psycopg2.Error as e:
+        if not _is_stale_plan(e):
+            raise
+        _invalidate_prepared_statements()
+        if _unit_of_work is not None:
+            raise
+        cursor.connection.rollback()
+        _execute(cursor, query, params)
+
+
+def take_statements_invalidated() -> bool:
+    """
+    Report, once, that prepared statements were dropped after a schema change
+
+    The statement that hit the change failed inside a unit of work; a
+    caller that rolled that work back can run it again.
+
+    Returns:
+        True if statements were invalidated since the last call
+    """
+    global _statements_invalidated
+
+    invalidated = _statements_invalidated
+    _statements_invalidated = False
+    return invalidated
+
+
+def get_prepared_statement_stats() -> Dict:
+    """
+    Prepared statement counters for this container
+
+    Returns:
+        Dict with prepares, hits (executions of an already prepared
+        statement), failures, evictions (least recently used statements
+        deallocated to stay under the cap), invalidations (schema changes
+        that dropped every statement) and the number currently prepared
+    """
+    stats = dict(_prepared_stats)
+    stats['prepared'] = len(_prepared_statements)
+    return stats
 
 
 def execute_query(query: str, params: Optional[tuple] = None, fetch_one: bool = False):
@@ -87,7 +690,7 @@ def execute_query(query: str, params: Optional[tuple] = None, fetch_one: bool =
     """
     with get_db_connection() as conn:
         with conn.cursor() as cursor:
-            cursor.execute(query, params)
+            _execute(cursor, query, params)
 
             if cursor.description:  # Query returns data
                 if fetch_one:
@@ -110,6 +713,43 @@ def execute_insert(query: str, params: Optional[tuple] = None):
     """
     with get_db_connection() as conn:
         with conn.cursor() as cursor:
-            cursor.execute(query, params)
+            _execute(cursor, query, params)
             result = cursor.fetchone()
             return result['id'] if result else None
+
+
+def execute_returning(query: str, params: Optional[tuple] = None) -> Optional[Dict]:
+    """
+    Execute an INSERT/UPDATE/DELETE ... RETURNING query and return the row
+
+    Lets a mutation hand back the full row in the same round-trip instead
+    of re-selecting it.
+
+    Args:
+        query: SQL statement ending in RETURNING * (or a column list)
+        params: Query parameters
+
+    Returns:
+        First returned row, or None if no row was affected
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            _execute(cursor, query, params)
+            return cursor.fetchone()
+
+
+def execute_many(query: str, params_list: Sequence[tuple], page_size: int = 100) -> None:
+    """
+    Execute a statement once per parameter tuple, batching round-trips
+
+    Args:
+        query: SQL statement
+        params_list: Parameter tuples, one per execution
+        page_size: Statements sent per round-trip
+    """
+    if not params_list:
+        return
+
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            execute_batch(cursor, query, params_list, page_size=page_size)
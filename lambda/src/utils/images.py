@@ -0,0 +1,112 @@
+"""
+Image metadata and thumbnail utilities
+"""
+
+import io
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - depends on the deployment layer
+    Image = None
+    ImageOps = None
+
+
+THUMBNAIL_SIZE = 400
+THUMBNAIL_QUALITY = 85
+
+# Most pixels decoded to render a thumbnail; about 160 MB as RGBA
+MAX_DECODE_PIXELS = int(os.environ.get('MAX_DECODE_PIXELS', str(40_000_000)))
+
+# EXIF tags
+EXIF_IFD = 0x8769
+TAG_ORIENTATION = 0x0112
+TAG_DATETIME = 0x0132
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_OFFSET_TIME_ORIGINAL = 0x9011
+
+
+def _parse_exif_datetime(value: Any, offset: Any = None) -> Optional[datetime]:
+    """Parse an EXIF 'YYYY:MM:DD HH:MM:SS' value, with an optional '+HH:MM' offset"""
+    if not isinstance(value, str):
+        return None
+
+    try:
+        taken_at = datetime.strptime(value.strip().rstrip('\x00'), '%Y:%m:%d %H:%M:%S')
+    except ValueError:
+        return None
+
+    if isinstance(offset, str) and len(offset) == 6 and offset[0] in '+-':
+        try:
+            hours, minutes = int(offset[1:3]), int(offset[4:6])
+        except ValueError:
+            return taken_at
+        delta = timedelta(hours=hours, minutes=minutes)
+        taken_at = taken_at.replace(tzinfo=timezone(delta if offset[0] == '+' else -delta))
+
+    return taken_at
+
+
+def process_image(path: str) -> Dict[str, Any]:
+    """
+    Read an image's metadata and render a JPEG thumbnail
+
+    Only the header is parsed for metadata. JPEGs are decoded in draft mode,
+    which scales down during decoding, so memory stays proportional to the
+    thumbnail rather than the original. Other formats are decoded at full
+    size, so no thumbnail is rendered for one over MAX_DECODE_PIXELS.
+
+    Args:
+        path: Local file holding the image
+
+    Returns:
+        Dict with width and height (as displayed, after EXIF rotation),
+        taken_at (or None) and thumbnail (JPEG bytes, or None without Pillow
+        or for formats Pillow cannot read)
+    """
+    result = {'width': None, 'height': None, 'taken_at': None, 'thumbnail': None}
+    if Image is None:
+        return result
+
+    try:
+        image = Image.open(path)
+    except Exception as e:
+        print(f"Unreadable image: {str(e)}")
+        return result
+
+    with image:
+        width, height = image.size
+        exif = image.getexif()
+
+        # Orientations 5-8 are rotated by 90 degrees
+        if exif.get(TAG_ORIENTATION) in (5, 6, 7, 8):
+            width, height = height, width
+        result['width'], result['height'] = width, height
+
+        exif_ifd = exif.get_ifd(EXIF_IFD)
+        result['taken_at'] = (
+            _parse_exif_datetime(exif_ifd.get(TAG_DATETIME_ORIGINAL), exif_ifd.get(TAG_OFFSET_TIME_ORIGINAL))
+            or _parse_exif_datetime(exif.get(TAG_DATETIME))
+        )
+
+        try:
+            # After draft, size is what decoding will produce: reduced up to
+            # eightfold for JPEG, the full image for everything else
+            image.draft('RGB', (THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            decoded_width, decoded_height = image.size
+            if decoded_width * decoded_height > MAX_DECODE_PIXELS:
+                print(f"Not rendering thumbnail: {image.format} image of {decoded_width}x{decoded_height} pixels")
+                return result
+
+            image.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+            thumbnail = ImageOps.exif_transpose(image).convert('RGB')
+
+            output = io.BytesIO()
+            thumbnail.save(output, 'JPEG', quality=THUMBNAIL_QUALITY, optimize=True)
+            result['thumbnail'] = output.getvalue()
+        except Exception as e:
+            print(f"Could not render thumbnail: {str(e)}")
+
+    return result
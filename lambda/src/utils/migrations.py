@@ -0,0 +1,203 @@
+"""
+Database migration utilities
+
+Migrations are numbered SQL files, e.g. 003_composite_indexes.sql. Each one
+runs in its own transaction and is recorded in schema_migrations with a
+checksum, so running the whole directory again only applies what is new.
+"""
+
+import os
+import re
+import hashlib
+from psycopg2.extensions import cursor as TupleCursor
+from typing import Dict, List, Optional, Tuple
+
+
+MIGRATION_FILE = re.compile(r'^(\d+)_(\w+)\.sql$')
+
+# Arbitrary key for pg_advisory_lock so concurrent runners queue up
+MIGRATION_LOCK_ID = 727001
+
+# Table the initial schema creates, used to recognise databases set up by
+# running 001 with psql before the runner existed
+BASELINE_VERSION = 1
+BASELINE_TABLE = 'public.vacations'
+
+
+class MigrationError(Exception):
+    """Raised when the migration directory and the database disagree"""
+    pass
+
+
+class Migration:
+    """A numbered SQL migration file"""
+
+    def __init__(self, version: int, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def read(self) -> str:
+        with open(self.path, encoding='utf-8') as f:
+            return f.read()
+
+    def checksum(self) -> str:
+        return hashlib.sha256(self.read().encode('utf-8')).hexdigest()
+
+    def __repr__(self) -> str:
+        return f'{self.version:03d}_{self.name}'
+
+
+def discover_migrations(directory: str) -> List[Migration]:
+    """
+    List the migrations in a directory, in version order
+
+    Args:
+        directory: Directory holding NNN_name.sql files
+
+    Returns:
+        List of migrations
+
+    Raises:
+        MigrationError: If two files share a version number
+    """
+    migrations = {}
+    for file_name in sorted(os.listdir(directory)):
+        match = MIGRATION_FILE.match(file_name)
+        if not match:
+            continue
+
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f'Duplicate migration version {version}: {file_name}')
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, file_name))
+
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def _ensure_migrations_table(cursor) -> None:
+    """Create schema_migrations, baselining databases migrated by hand"""
+    cursor.execute("SELECT to_regclass('public.schema_migrations') IS NOT NULL")
+    if cursor.fetchone()[0]:
+        return
+
+    cursor.execute("""
+        CREATE TABLE schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum VARCHAR(64),
+            applied_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # The initial schema is not idempotent; if its tables are already there
+    # record it as applied instead of running it again
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL", (BASELINE_TABLE,))
+    if cursor.fetchone()[0]:
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, 'baseline', NULL)",
+            (BASELINE_VERSION,)
+        )
+
+
+def get_applied_migrations(conn) -> Dict[int, Optional[str]]:
+    """
+    Read the applied migrations from the database
+
+    Args:
+        conn: psycopg2 connection with no transaction of its own in progress
+
+    Returns:
+        Dict of version to checksum (None for a baseline entry)
+    """
+    try:
+        with conn.cursor(cursor_factory=TupleCursor) as cursor:
+            cursor.execute("SELECT to_regclass('public.schema_migrations') IS NOT NULL")
+            if not cursor.fetchone()[0]:
+                return {}
+            cursor.execute("SELECT version, checksum FROM schema_migrations")
+            return dict(cursor.fetchall())
+    finally:
+        if not conn.autocommit:
+            conn.rollback()
+
+
+def apply_migrations(
+    conn,
+    directory: str,
+    target: Optional[int] = None,
+    dry_run: bool = False
+) -> List[Tuple[Migration, str]]:
+    """
+    Apply every pending migration up to target, oldest first
+
+    A session advisory lock serialises concurrent runners. A migration that
+    fails is rolled back on its own and stops the run; the ones before it
+    stay applied.
+
+    Args:
+        conn: psycopg2 connection with no transaction of its own in progress;
+            its autocommit setting is restored afterwards
+        directory: Directory holding NNN_name.sql files
+        target: Highest version to apply, or None for all
+        dry_run: Only report what would be applied
+
+    Returns:
+        List of (migration, status) with status 'applied' or 'pending'
+
+    Raises:
+        MigrationError: If an applied migration's file has since changed
+    """
+    migrations = [m for m in discover_migrations(directory) if target is None or m.version <= target]
+    autocommit = conn.autocommit
+    conn.autocommit = False
+
+    try:
+        # Plain tuples, whatever cursor_factory the connection was opened with
+        with conn.cursor(cursor_factory=TupleCursor) as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+            try:
+                _ensure_migrations_table(cursor)
+                cursor.execute("SELECT version, checksum FROM schema_migrations")
+                applied = dict(cursor.fetchall())
+
+                # A dry run leaves no trace, not even the bookkeeping table
+                if dry_run:
+                    conn.rollback()
+                else:
+                    conn.commit()
+
+                results = []
+                for migration in migrations:
+                    checksum = migration.checksum()
+
+                    if migration.version in applied:
+                        recorded = applied[migration.version]
+                        if recorded is not None and recorded != checksum:
+                            raise MigrationError(f'{migration} was changed after it was applied')
+                        continue
+
+                    if dry_run:
+                        results.append((migration, 'pending'))
+                        continue
+
+                    try:
+                        cursor.execute(migration.read())
+                        cursor.execute(
+                            "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                            (migration.version, migration.name, checksum)
+                        )
+                        conn.commit()
+                    except Exception as e:
+                        conn.rollback()
+                        raise MigrationError(f'{migration} failed: {str(e).strip()}') from e
+
+                    results.append((migration, 'applied'))
+
+                return results
+            finally:
+                conn.rollback()
+                cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+                conn.commit()
+    finally:
+        conn.autocommit = autocommit
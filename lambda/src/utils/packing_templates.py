@@ -0,0 +1,75 @@
+"""
+Packing list templates
+
+Templates are bundled with the code (data/packing_templates.json). An item
+either has a fixed quantity (default 1) or a per_day rate, which is scaled
+by the trip's length and kept between the item's min and max, so a two-week
+trip doesn't pack fourteen swimsuits.
+"""
+
+import json
+import math
+import os
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+
+TEMPLATES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'packing_templates.json'
+)
+
+# Trip length used when a vacation has no dates, and the longest one scaled
+DEFAULT_TRIP_DAYS = 7
+MAX_TRIP_DAYS = 60
+
+_templates: Optional[Dict[str, Dict[str, Any]]] = None
+
+
+def load_templates() -> Dict[str, Dict[str, Any]]:
+    """Templates keyed by ID, in file order; loaded once per container"""
+    global _templates
+    if _templates is None:
+        with open(TEMPLATES_PATH, encoding='utf-8') as f:
+            _templates = {template['id']: template for template in json.load(f)['templates']}
+    return _templates
+
+
+def get_template(template_id: str) -> Optional[Dict[str, Any]]:
+    """Look up a template by ID"""
+    return load_templates().get(template_id)
+
+
+def trip_days(start_date: Optional[date], end_date: Optional[date]) -> int:
+    """Days in a trip, counting both ends"""
+    if not start_date or not end_date or end_date < start_date:
+        return DEFAULT_TRIP_DAYS
+    return min((end_date - start_date).days + 1, MAX_TRIP_DAYS)
+
+
+def item_quantity(item: Dict[str, Any], days: int) -> int:
+    """Quantity of a template item for a trip of the given length"""
+    if 'per_day' not in item:
+        return item.get('quantity', 1)
+
+    quantity = math.ceil(item['per_day'] * days)
+    quantity = max(quantity, item.get('min', 1))
+    if 'max' in item:
+        quantity = min(quantity, item['max'])
+    return quantity
+
+
+def expand_template(template: Dict[str, Any], days: int) -> List[Tuple[str, Optional[str], int]]:
+    """
+    Expand a template into packing items for a trip
+
+    Args:
+        template: Template dict
+        days: Trip length in days
+
+    Returns:
+        (item_name, category, quantity) tuples in template order
+    """
+    return [
+        (item['item_name'], item.get('category'), item_quantity(item, days))
+        for item in template['items']
+    ]
@@ -0,0 +1,170 @@
+"""
+Pagination utilities for list endpoints
+"""
+
+import base64
+import binascii
+import json
+from typing import Optional, Dict, Any, List, Sequence, Tuple
+
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 500
+
+
+class PaginationError(ValueError):
+    """Raised for a malformed limit, cursor or fields parameter"""
+
+
+def get_query_params(event: Dict[str, Any]) -> Dict[str, str]:
+    """Extract query string parameters from Lambda event"""
+    return event.get('queryStringParameters') or {}
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode sort key values as an opaque cursor token
+
+    Dates, times and UUIDs are stored as strings; Postgres casts them back
+    when they are compared against the sort columns.
+    """
+    plain = [v if v is None or isinstance(v, (bool, int, float)) else str(v) for v in values]
+    raw = json.dumps(plain, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str, size: int) -> List[Any]:
+    """Decode a cursor token back into its sort key values"""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError):
+        raise PaginationError('Invalid cursor')
+
+    if not isinstance(values, list) or len(values) != size:
+        raise PaginationError('Invalid cursor')
+
+    return values
+
+
+def _parse_limit(value: Optional[str]) -> int:
+    """Parse the limit parameter, clamped to MAX_LIMIT"""
+    if value is None or value == '':
+        return DEFAULT_LIMIT
+
+    try:
+        limit = int(value)
+    except ValueError:
+        raise PaginationError('limit must be an integer')
+
+    if limit < 1:
+        raise PaginationError('limit must be positive')
+
+    return min(limit, MAX_LIMIT)
+
+
+def _parse_fields(value: Optional[str], allowed_fields: Sequence[str]) -> Optional[List[str]]:
+    """Parse a comma-separated fields parameter; id is always included"""
+    if not value:
+        return None
+
+    fields = ['id']
+    for field in value.split(','):
+        field = field.strip()
+        if not field or field in fields:
+            continue
+        if field not in allowed_fields:
+            raise PaginationError(f'Unknown field: {field}')
+        fields.append(field)
+
+    return fields
+
+
+class Page:
+    """
+    Keyset page request parsed from limit, cursor and fields parameters
+
+    Rows are ordered by sort_keys, which must end with a unique column
+    (normally the id) so the cursor position is unambiguous. The sort keys
+    are selected under private aliases so a cursor can be built whatever
+    fields the client projected.
+    """
+
+    def __init__(
+        self,
+        event: Dict[str, Any],
+        sort_keys: Sequence[str],
+        allowed_fields: Sequence[str],
+        descending: bool = False,
+        cursor_param: str = 'cursor'
+    ):
+        params = get_query_params(event)
+
+        self.sort_keys = list(sort_keys)
+        self.descending = descending
+        self.limit = _parse_limit(params.get('limit'))
+        self.fields = _parse_fields(params.get('fields'), allowed_fields)
+
+        cursor = params.get(cursor_param)
+        self.after = decode_cursor(cursor, len(self.sort_keys)) if cursor else None
+
+        # Cursors of the first and last rows of the finished page
+        self.first_cursor: Optional[str] = None
+        self.last_cursor: Optional[str] = None
+
+    def columns(self, alias: str) -> str:
+        """Projected columns of the table aliased as alias"""
+        if self.fields is None:
+            return f'{alias}.*'
+        return ', '.join(f'{alias}.{field}' for field in self.fields)
+
+    def cursor_columns(self) -> str:
+        """Sort keys to add to the select list"""
+        return ', '.join(f'{key} AS _cursor_{i}' for i, key in enumerate(self.sort_keys))
+
+    def keyset_condition(self) -> Tuple[str, tuple]:
+        """
+        Condition selecting rows after the cursor
+
+        Returns:
+            (SQL fragment, params), or ('TRUE', ()) on the first page
+        """
+        if self.after is None:
+            return 'TRUE', ()
+
+        operator = '<' if self.descending else '>'
+        placeholders = ', '.join(['%s'] * len(self.sort_keys))
+        return f"({', '.join(self.sort_keys)}) {operator} ({placeholders})", tuple(self.after)
+
+    def order_by(self) -> str:
+        """ORDER BY expression matching the keyset condition"""
+        direction = ' DESC' if self.descending else ''
+        return ', '.join(f'{key}{direction}' for key in self.sort_keys)
+
+    @property
+    def fetch_limit(self) -> int:
+        """Rows to fetch; one extra tells whether another page exists"""
+        return self.limit + 1
+
+    def finish(self, rows: List[Dict]) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Trim fetched rows to the page and build the next cursor
+
+        Returns:
+            (rows without the private sort key columns, next cursor or None)
+        """
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+
+        first_values = last_values = None
+        for row in rows:
+            last_values = [row.pop(f'_cursor_{i}') for i in range(len(self.sort_keys))]
+            if first_values is None:
+                first_values = last_values
+
+        if rows:
+            self.first_cursor = encode_cursor(first_values)
+            self.last_cursor = encode_cursor(last_values)
+
+        next_cursor = self.last_cursor if has_more else None
+        return rows, next_cursor
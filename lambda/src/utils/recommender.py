@@ -0,0 +1,270 @@
+"""
+Recommendation scoring
+
+Candidates come from a dataset bundled with the code
+(data/recommendation_candidates.json), so scoring needs no network access.
+Each candidate is scored against a vacation's location, vibe and dates and
+against what the group has already planned. This runs when recommendations
+are precomputed, never while serving a request.
+"""
+
+import json
+import os
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set
+from urllib.parse import quote_plus
+
+
+CANDIDATES_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'recommendation_candidates.json'
+)
+
+RECOMMENDATION_CATEGORIES = ('restaurant', 'activity', 'attraction')
+
+# Recommendations kept per category
+RECOMMENDATIONS_PER_CATEGORY = int(os.environ.get('RECOMMENDATIONS_PER_CATEGORY', '20'))
+
+# Score weights; each component is between 0 and 1
+WEIGHT_LOCAL = 0.35
+WEIGHT_VIBE = 0.30
+WEIGHT_RATING = 0.20
+WEIGHT_SEASON = 0.15
+
+# Taken off candidates that repeat what is already planned
+PLANNED_OVERLAP_PENALTY = 0.15
+
+# Words that may appear in a vacation's free-text vibe, by prefix, and the
+# candidate tags they call for
+VIBE_TAGS = {
+    'relax': {'relaxing', 'beach', 'wellness', 'scenic'},
+    'chill': {'relaxing', 'beach', 'wellness', 'scenic'},
+    'beach': {'beach', 'water', 'relaxing'},
+    'adventur': {'adventure', 'outdoors', 'hiking', 'water'},
+    'outdoor': {'outdoors', 'hiking', 'scenic'},
+    'nature': {'outdoors', 'wildlife', 'scenic', 'hiking'},
+    'romanc': {'romantic', 'scenic', 'food', 'luxury'},
+    'romant': {'romantic', 'scenic', 'food', 'luxury'},
+    'honeymoon': {'romantic', 'luxury', 'relaxing'},
+    'family': {'family', 'wildlife', 'theme parks'},
+    'kid': {'family', 'theme parks'},
+    'party': {'nightlife', 'food'},
+    'nightlife': {'nightlife'},
+    'food': {'food'},
+    'culinar': {'food'},
+    'cultur': {'culture', 'history', 'art'},
+    'histor': {'history', 'culture'},
+    'art': {'art', 'culture'},
+    'luxur': {'luxury', 'wellness', 'food'},
+    'budget': {'budget'},
+    'wellness': {'wellness', 'relaxing'},
+}
+
+# Planned titles mentioning these words already cover candidates with the tag
+PLANNED_KEYWORD_TAGS = {
+    'snorkel': 'snorkeling',
+    'dive': 'water',
+    'diving': 'water',
+    'surf': 'water',
+    'beach': 'beach',
+    'hike': 'hiking',
+    'hiking': 'hiking',
+    'museum': 'culture',
+    'spa': 'wellness',
+    'massage': 'wellness',
+    'show': 'nightlife',
+    'bar': 'nightlife',
+    'club': 'nightlife',
+    'park': 'theme parks',
+}
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+# Parsed dataset, kept for the life of the container
+_dataset: Optional[Dict[str, Any]] = None
+
+
+def _words(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric words of a text"""
+    return _WORD.findall((text or '').lower())
+
+
+def load_candidates() -> Dict[str, Any]:
+    """
+    Load the candidate dataset on first use
+
+    Returns:
+        Dict with version, destinations (each with a normalized aliases
+        list) and anywhere (candidates that suit any destination)
+    """
+    global _dataset
+
+    if _dataset is None:
+        with open(CANDIDATES_PATH, encoding='utf-8') as f:
+            dataset = json.load(f)
+
+        for destination in dataset['destinations']:
+            destination['aliases'] = [' '.join(_words(alias)) for alias in destination['aliases']]
+
+        _dataset = dataset
+
+    return _dataset
+
+
+def dataset_version() -> str:
+    """Version of the candidate dataset, stored with each computed set"""
+    return load_candidates()['version']
+
+
+def find_destination(location: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Find the dataset destination a free-text location refers to
+
+    Aliases are matched as whole words, so "Kihei, Maui, HI" finds Maui
+    and "New York City" finds New York.
+    """
+    padded = f" {' '.join(_words(location))} "
+    for destination in load_candidates()['destinations']:
+        if any(f' {alias} ' in padded for alias in destination['aliases']):
+            return destination
+    return None
+
+
+def vibe_tags(vibe: Optional[str]) -> Set[str]:
+    """Candidate tags that suit a vacation's vibe"""
+    tags = set()
+    for word in _words(vibe):
+        for prefix, prefix_tags in VIBE_TAGS.items():
+            if word.startswith(prefix):
+                tags |= prefix_tags
+    return tags
+
+
+def trip_months(start_date: date, end_date: date) -> Dict[int, int]:
+    """Number of trip days falling in each month"""
+    months: Dict[int, int] = {}
+    day = start_date
+    while day <= end_date:
+        # Whole months at a time, so long trips don't iterate day by day
+        next_month = date(day.year + day.month // 12, day.month % 12 + 1, 1)
+        days = (min(end_date + timedelta(days=1), next_month) - day).days
+        months[day.month] = months.get(day.month, 0) + days
+        day = next_month
+    return months
+
+
+def planned_tags(planned_titles: Iterable[str]) -> Set[str]:
+    """Tags already covered by the vacation's events and excursions"""
+    tags = set()
+    for title in planned_titles:
+        for word in _words(title):
+            tag = PLANNED_KEYWORD_TAGS.get(word)
+            if tag:
+                tags.add(tag)
+    return tags
+
+
+def _is_planned(name_words: Set[str], planned_words: List[Set[str]]) -> bool:
+    """Whether a candidate's name already appears in a planned title"""
+    return any(name_words <= words for words in planned_words)
+
+
+def score_candidates(
+    location: Optional[str],
+    vibe: Optional[str],
+    start_date: date,
+    end_date: date,
+    planned_titles: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Score and rank the candidates for one vacation
+
+    Candidates at the vacation's destination outrank the generic ones.
+    Within that, they are ranked by how well their tags suit the vibe,
+    their rating and how much of the trip falls in their season; those
+    out of season for the whole trip, or already planned, are left out.
+
+    Args:
+        location: Vacation location
+        vibe: Vacation vibe, free text
+        start_date: First day of the trip
+        end_date: Last day of the trip
+        planned_titles: Titles of the vacation's events and excursions
+
+    Returns:
+        Up to RECOMMENDATIONS_PER_CATEGORY rows per category, best first,
+        with category, name, description, location, rating, price_level,
+        external_url, score and reason
+    """
+    dataset = load_candidates()
+    destination = find_destination(location)
+    wanted_tags = vibe_tags(vibe)
+    months = trip_months(start_date, end_date)
+    trip_days = sum(months.values()) or 1
+    covered_tags = planned_tags(planned_titles)
+    planned_words = [set(_words(title)) for title in planned_titles]
+
+    sources = [(candidate, False) for candidate in dataset['anywhere']]
+    if destination is not None:
+        sources = [(candidate, True) for candidate in destination['candidates']] + sources
+
+    ranked: Dict[str, List[Dict[str, Any]]] = {category: [] for category in RECOMMENDATION_CATEGORIES}
+
+    for candidate, local in sources:
+        category = candidate['category']
+        if category not in ranked:
+            continue
+
+        if _is_planned(set(_words(candidate['name'])), planned_words):
+            continue
+
+        season = 1.0
+        if candidate.get('months'):
+            season = sum(months.get(month, 0) for month in candidate['months']) / trip_days
+            if season == 0:
+                continue
+
+        tags = set(candidate.get('tags', ()))
+        matched_tags = tags & wanted_tags
+        vibe_score = len(matched_tags) / len(wanted_tags) if wanted_tags else 0.5
+        rating = candidate.get('rating') or 0
+
+        score = (
+            WEIGHT_LOCAL * (1.0 if local else 0.0)
+            + WEIGHT_VIBE * min(vibe_score * 2, 1.0)
+            + WEIGHT_RATING * rating / 5
+            + WEIGHT_SEASON * season
+        )
+        if tags & covered_tags:
+            score -= PLANNED_OVERLAP_PENALTY
+
+        reasons = []
+        if matched_tags:
+            reasons.append(f"Fits the {vibe.strip().lower()} vibe")
+        if candidate.get('months'):
+            reasons.append('In season during your dates')
+        if rating >= 4.7:
+            reasons.append(f'Rated {rating}')
+
+        candidate_location = candidate.get('location') or location
+        ranked[category].append({
+            'category': category,
+            'name': candidate['name'],
+            'description': candidate.get('description'),
+            'location': candidate_location,
+            'rating': rating or None,
+            'price_level': candidate.get('price_level'),
+            'external_url': candidate.get('url') or (
+                'https://www.google.com/maps/search/?api=1&query='
+                + quote_plus(f"{candidate['name']}, {candidate_location}")
+            ),
+            'score': round(score, 4),
+            'reason': '; '.join(reasons) or None,
+        })
+
+    results = []
+    for category in RECOMMENDATION_CATEGORIES:
+        rows = sorted(ranked[category], key=lambda row: (-row['score'], row['name']))
+        results.extend(rows[:RECOMMENDATIONS_PER_CATEGORY])
+
+    return results
@@ -2,8 +2,19 @@
 Response utilities for Lambda functions
 """
 
-import json
-from typing import Dict, Any, Optional
+import hashlib
+from typing import Dict, Any, Optional, List
+from utils import serializer
+
+
+# Cache-Control for polled resources: clients may keep a copy but must
+# revalidate it with If-None-Match every time
+REVALIDATE = 'private, no-cache'
+
+
+def max_age(seconds: float) -> str:
+    """Cache-Control letting the client reuse a response for some seconds before revalidating"""
+    return f'private, max-age={max(0, int(seconds))}'
 
 
 def create_response(
@@ -22,11 +33,21 @@ def create_response(
     Returns:
         API Gateway response dict
     """
+    return create_raw_response(status_code, serializer.dumps(body), headers)
+
+
+def create_raw_response(
+    status_code: int,
+    serialized_body: str,
+    headers: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """Wrap an already serialized body in an API Gateway response"""
     default_headers = {
         'Content-Type': 'application/json',
         'Access-Control-Allow-Origin': '*',
         'Access-Control-Allow-Headers': '*',
-        'Access-Control-Allow-Methods': '*'
+        'Access-Control-Allow-Methods': '*',
+        'Access-Control-Expose-Headers': 'ETag'
     }
 
     if headers:
@@ -35,10 +56,109 @@ def create_response(
     return {
         'statusCode': status_code,
         'headers': default_headers,
-        'body': json.dumps(body)
+        'body': serialized_body
     }
 
 
+def make_etag(*parts: Any) -> str:
+    """
+    Build a strong ETag from version parts (ids, updated_at, counts...)
+
+    Args:
+        parts: Values that change whenever the representation changes
+
+    Returns:
+        Quoted ETag string
+    """
+    raw = '\x1f'.join(str(part) for part in parts)
+    return '"' + hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(event: Dict[str, Any], etag: str) -> bool:
+    """Check an ETag against the request's If-None-Match header"""
+    headers = event.get('headers') or {}
+    header = headers.get('if-none-match') or headers.get('If-None-Match')
+    if not header:
+        return False
+
+    if header.strip() == '*':
+        return True
+
+    # If-None-Match uses weak comparison
+    for candidate in header.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+
+    return False
+
+
+def not_modified(etag: str, cache_control: str = REVALIDATE) -> Dict[str, Any]:
+    """Create a 304 not modified response"""
+    return create_raw_response(304, '', {'ETag': etag, 'Cache-Control': cache_control})
+
+
+def cached_response(
+    event: Dict[str, Any],
+    data: Any,
+    etag: Optional[str] = None,
+    cache_control: str = REVALIDATE,
+    **extra: Any
+) -> Dict[str, Any]:
+    """
+    Create a 200 success response with an ETag, or a 304 if it still matches
+
+    When etag is given (e.g. from make_etag over updated_at), a matching
+    If-None-Match returns 304 without serializing the data at all.
+    Otherwise the ETag is a hash of the serialized body.
+
+    Args:
+        event: Lambda event dict, for the If-None-Match header
+        data: Response data
+        etag: Precomputed ETag, if the data has a cheap version
+        cache_control: Cache-Control header for this route
+        extra: Additional top-level body keys, e.g. next_cursor
+
+    Returns:
+        API Gateway response dict
+    """
+    if etag is not None and etag_matches(event, etag):
+        return not_modified(etag, cache_control)
+
+    body = {'success': True, 'data': data}
+    body.update(extra)
+    serialized_body = serializer.dumps(body)
+
+    if etag is None:
+        etag = make_etag(serialized_body)
+        if etag_matches(event, etag):
+            return not_modified(etag, cache_control)
+
+    return create_raw_response(200, serialized_body, {'ETag': etag, 'Cache-Control': cache_control})
+
+
+def cached_json_response(
+    event: Dict[str, Any],
+    serialized_data: str,
+    cache_control: str = REVALIDATE
+) -> Dict[str, Any]:
+    """
+    Create a 200 success response around data that is already JSON
+
+    For payloads built by the database (e.g. json_build_object), which are
+    spliced into the envelope without being parsed. The ETag is a hash of
+    the JSON text.
+    """
+    etag = make_etag(serialized_data)
+    if etag_matches(event, etag):
+        return not_modified(etag, cache_control)
+
+    serialized_body = '{"success":true,"data":' + serialized_data + '}'
+    return create_raw_response(200, serialized_body, {'ETag': etag, 'Cache-Control': cache_control})
+
+
 def success_response(data: Any, message: Optional[str] = None) -> Dict[str, Any]:
     """Create a 200 success response"""
     body = {'success': True, 'data': data}
@@ -55,6 +175,16 @@ def created_response(data: Any, message: Optional[str] = None) -> Dict[str, Any]
     return create_response(201, body)
 
 
+def bulk_response(
+    data: Any,
+    errors: List[Dict[str, Any]],
+    status_code: int = 200
+) -> Dict[str, Any]:
+    """Create a response for a bulk write, listing per-item errors"""
+    body = {'success': True, 'data': data, 'errors': errors}
+    return create_response(status_code, body)
+
+
 def error_response(
     status_code: int,
     error: str,
@@ -0,0 +1,101 @@
+"""
+JSON serialization utilities
+
+Encodes the UUID, date, time, datetime and Decimal values in database rows.
+Uses orjson when installed, otherwise the stdlib encoder; JSON_SERIALIZER
+picks one explicitly.
+
+A Decimal is always written as a JSON number, as json_agg writes NUMERIC in
+the snapshot, so a column has one type in every response. The schema's
+NUMERIC columns are DECIMAL(10, 2) and DECIMAL(2, 1), and a float holds
+every value they can store exactly; a column with more than 15 significant
+digits would be rounded. NaN, which JSON has no number for, is null.
+"""
+
+import json
+import os
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the deployment layer
+    orjson = None
+
+
+def _encode_decimal(value: Decimal) -> Any:
+    """A float, or None for NaN and infinities"""
+    if value.is_finite():
+        return float(value)
+    return None
+
+
+# Exact-type dispatch; rows only ever hold these concrete types
+_ENCODERS = {
+    datetime: datetime.isoformat,
+    date: date.isoformat,
+    time: time.isoformat,
+    uuid.UUID: str,
+    Decimal: _encode_decimal,
+    set: list,
+    frozenset: list,
+}
+
+
+def _default(value: Any) -> Any:
+    """Encode types JSON has no native representation for"""
+    encoder = _ENCODERS.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+
+    # Subclasses, e.g. tz-aware datetime subclasses from drivers
+    for base, encoder in _ENCODERS.items():
+        if isinstance(value, base):
+            return encoder(value)
+
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+_stdlib_encoder = json.JSONEncoder(separators=(',', ':'), default=_default)
+
+
+def stdlib_dumps(value: Any) -> str:
+    """Serialize with the pure-Python encoder"""
+    return _stdlib_encoder.encode(value)
+
+
+def orjson_dumps(value: Any) -> str:
+    """Serialize with orjson; Decimal and sets go through _default"""
+    return orjson.dumps(value, default=_default).decode('utf-8')
+
+
+SERIALIZERS = {'stdlib': stdlib_dumps}
+if orjson is not None:
+    SERIALIZERS['orjson'] = orjson_dumps
+
+_serializer: Callable[[Any], str] = SERIALIZERS.get(
+    os.environ.get('JSON_SERIALIZER', 'orjson'), stdlib_dumps
+)
+
+
+def set_serializer(serializer: Callable[[Any], str]) -> None:
+    """
+    Replace the serializer used for every response body
+
+    Args:
+        serializer: Callable taking a value and returning a JSON string
+    """
+    global _serializer
+    _serializer = serializer
+
+
+def get_serializer() -> Callable[[Any], str]:
+    """Return the serializer currently in use"""
+    return _serializer
+
+
+def dumps(value: Any) -> str:
+    """Serialize a value to a JSON string"""
+    return _serializer(value)
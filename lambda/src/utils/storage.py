@@ -0,0 +1,142 @@
+"""
+S3 storage utilities
+"""
+
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from utils.cache import TTLCache, MISSING
+
+
+PHOTOS_BUCKET = os.environ.get('PHOTOS_BUCKET', '')
+
+# Point at a local S3 stand-in (MinIO, moto_server) when running offline
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL') or None
+
+# Seconds an upload URL stays valid
+UPLOAD_URL_EXPIRY = int(os.environ.get('UPLOAD_URL_EXPIRY', '900'))
+
+# Client kept across invocations of a warm container
+_s3_client = None
+
+# Signed GET URLs are reused until this fraction of their lifetime is left,
+# so a gallery reopened within the hour gets the same URLs (and hits the
+# app's image cache) without signing them again
+URL_CACHE_SIZE = int(os.environ.get('URL_CACHE_SIZE', '4096'))
+URL_REFRESH_FRACTION = 0.25
+
+_url_cache = TTLCache('signed_urls', URL_CACHE_SIZE, 0)
+
+
+def get_s3_client():
+    """
+    Get the S3 client, creating it on first use
+
+    boto3 is imported here rather than at module level so cold starts that
+    never touch S3 don't pay for it.
+    """
+    global _s3_client
+
+    if _s3_client is None:
+        import boto3
+        from botocore.config import Config
+
+        _s3_client = boto3.client(
+            's3',
+            endpoint_url=S3_ENDPOINT_URL,
+            config=Config(signature_version='s3v4', retries={'max_attempts': 3, 'mode': 'standard'})
+        )
+
+    return _s3_client
+
+
+def presign_put(bucket: str, key: str, content_type: str, expires_in: int = UPLOAD_URL_EXPIRY) -> str:
+    """Presigned PUT URL; the client must send the same Content-Type"""
+    return get_s3_client().generate_presigned_url(
+        'put_object',
+        Params={'Bucket': bucket, 'Key': key, 'ContentType': content_type},
+        ExpiresIn=expires_in
+    )
+
+
+def start_multipart_upload(bucket: str, key: str, content_type: str) -> str:
+    """Start a multipart upload and return its upload ID"""
+    response = get_s3_client().create_multipart_upload(Bucket=bucket, Key=key, ContentType=content_type)
+    return response['UploadId']
+
+
+def presign_upload_part(
+    bucket: str,
+    key: str,
+    upload_id: str,
+    part_number: int,
+    expires_in: int = UPLOAD_URL_EXPIRY
+) -> str:
+    """Presigned PUT URL for one part of a multipart upload"""
+    return get_s3_client().generate_presigned_url(
+        'upload_part',
+        Params={'Bucket': bucket, 'Key': key, 'UploadId': upload_id, 'PartNumber': part_number},
+        ExpiresIn=expires_in
+    )
+
+
+def complete_multipart_upload(bucket: str, key: str, upload_id: str, parts: List[Dict]) -> None:
+    """
+    Assemble a multipart upload from its parts
+
+    Args:
+        bucket: Bucket name
+        key: Object key
+        upload_id: Upload ID from start_multipart_upload()
+        parts: [{'PartNumber': n, 'ETag': etag}] in part order
+    """
+    get_s3_client().complete_multipart_upload(
+        Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts}
+    )
+
+
+def abort_multipart_upload(bucket: str, key: str, upload_id: str) -> None:
+    """Abort a multipart upload, discarding any uploaded parts"""
+    get_s3_client().abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+
+
+def delete_objects(bucket: str, keys: List[Optional[str]]) -> None:
+    """Delete objects, skipping empty keys"""
+    objects = [{'Key': key} for key in keys if key]
+    if objects:
+        get_s3_client().delete_objects(Bucket=bucket, Delete={'Objects': objects, 'Quiet': True})
+
+
+def presign_get(bucket: str, key: str, expires_in: int) -> Tuple[str, float]:
+    """
+    Presigned GET URL for an object, reused from the cache while fresh
+
+    Args:
+        bucket: Bucket name
+        key: Object key
+        expires_in: Lifetime of a newly signed URL in seconds
+
+    Returns:
+        (url, expiry as a Unix timestamp)
+    """
+    cache_key = (bucket, key, expires_in)
+    cached = _url_cache.get(cache_key)
+    if cached is not MISSING:
+        return cached
+
+    url = get_s3_client().generate_presigned_url(
+        'get_object', Params={'Bucket': bucket, 'Key': key}, ExpiresIn=expires_in
+    )
+    signed = (url, time.time() + expires_in)
+    _url_cache.set(cache_key, signed, ttl=expires_in * (1 - URL_REFRESH_FRACTION))
+    return signed
+
+
+def download_to_file(bucket: str, key: str, fileobj) -> None:
+    """Stream an object into a file in chunks, without holding it in memory"""
+    get_s3_client().download_fileobj(bucket, key, fileobj)
+
+
+def put_object(bucket: str, key: str, body: bytes, content_type: str) -> None:
+    """Upload a small object in one request"""
+    get_s3_client().put_object(Bucket=bucket, Key=key, Body=body, ContentType=content_type)
@@ -0,0 +1,37 @@
+"""
+Timeline utilities
+"""
+
+import heapq
+from typing import Any, List, Sequence, Tuple
+
+
+def find_overlaps(intervals: Sequence[Tuple[Any, Any]]) -> List[Tuple[int, int]]:
+    """
+    Find every pair of overlapping intervals with a sweep line
+
+    Intervals are visited by start; a heap keyed on end holds the ones still
+    open, so each interval is only compared with those it actually overlaps.
+    This runs in O(n log n + k) for k overlapping pairs, where comparing
+    every pair is O(n^2) however few overlaps there are. Intervals that
+    merely touch (one ends as the next starts) do not overlap.
+
+    Args:
+        intervals: (start, end) pairs of any comparable type, start < end
+
+    Returns:
+        (i, j) index pairs into intervals, i starting no later than j
+    """
+    order = sorted(range(len(intervals)), key=lambda i: intervals[i])
+    active: List[Tuple[Any, int]] = []
+    overlaps = []
+
+    for index in order:
+        start, end = intervals[index]
+        while active and active[0][0] <= start:
+            heapq.heappop(active)
+        for _, other in active:
+            overlaps.append((other, index))
+        heapq.heappush(active, (end, index))
+
+    return overlaps
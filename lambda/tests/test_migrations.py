@@ -0,0 +1,80 @@
+"""
+Migration directory tests
+
+Reads the migration files, without a database, and checks that they are
+numbered without gaps and that the composite indexes the query plan tests
+rely on exist once every migration has run.
+
+Usage:
+    python -m pytest lambda/tests/test_migrations.py
+"""
+
+import os
+import re
+import sys
+
+import pytest
+
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TESTS_DIR, '..', 'src')
+MIGRATIONS_DIR = os.path.join(TESTS_DIR, '..', '..', 'database', 'migrations')
+
+sys.path.insert(0, SRC_DIR)
+
+from utils.migrations import BASELINE_VERSION, discover_migrations  # noqa: E402
+
+
+CREATE_INDEX = re.compile(r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s+ON\s+(\w+)', re.I)
+DROP_INDEX = re.compile(r'DROP\s+INDEX\s+(?:IF\s+EXISTS\s+)?(\w+)', re.I)
+
+# Index each list endpoint is checked to read through (test_query_plans.py)
+PLAN_INDEXES = {
+    'idx_events_vacation_schedule': 'events',
+    'idx_chat_messages_vacation_seq': 'chat_messages',
+    'idx_photos_vacation_uploaded': 'photos',
+    'idx_packing_items_vacation_category': 'packing_items',
+    'idx_itineraries_vacation_user': 'itineraries',
+    'idx_itinerary_items_schedule': 'itinerary_items',
+}
+
+
+def _strip_comments(sql: str) -> str:
+    return re.sub(r'--[^\n]*', '', sql)
+
+
+def _index_statements():
+    """(migration, 'create' or 'drop', index, table) for every index statement, in order"""
+    statements = []
+    for migration in discover_migrations(MIGRATIONS_DIR):
+        sql = _strip_comments(migration.read())
+        found = [(match.start(), 'create', match.group(1), match.group(2)) for match in CREATE_INDEX.finditer(sql)]
+        found += [(match.start(), 'drop', match.group(1), None) for match in DROP_INDEX.finditer(sql)]
+        statements.extend((migration, action, index, table) for _, action, index, table in sorted(found))
+    return statements
+
+
+def test_migrations_are_numbered_without_gaps():
+    versions = [migration.version for migration in discover_migrations(MIGRATIONS_DIR)]
+    assert versions == list(range(1, len(versions) + 1))
+
+
+def test_no_index_is_created_and_then_dropped():
+    created_by = {}
+    for migration, action, index, _ in _index_statements():
+        if action == 'create' and migration.version > BASELINE_VERSION:
+            created_by[index] = migration
+        elif action == 'drop':
+            assert index not in created_by, f'{migration} drops {index}, created by {created_by[index]}'
+
+
+@pytest.mark.parametrize('index_name, table', sorted(PLAN_INDEXES.items()))
+def test_plan_index_exists_after_migrations(index_name, table):
+    indexes = {}
+    for _, action, index, index_table in _index_statements():
+        if action == 'create':
+            indexes[index] = index_table
+        else:
+            indexes.pop(index, None)
+
+    assert indexes.get(index_name) == table, f'{index_name} on {table} is not left by the migrations'
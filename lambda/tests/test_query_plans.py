@@ -0,0 +1,306 @@
+"""
+Query plan regression tests
+
+Runs the list endpoints against a real Postgres, captures the SQL they
+send, and checks with EXPLAIN that each one reads its table through the
+composite index added for it (migrations 003 and 007), rather than
+fetching and sorting every row of the vacation.
+
+TEST_DATABASE_URL must point at a disposable database: every migration is
+applied to it, and the seeded rows are deleted again afterwards. Without
+it the tests are skipped.
+
+Usage:
+    TEST_DATABASE_URL=postgresql://localhost/vacaagent_test python -m pytest lambda/tests
+"""
+
+import json
+import os
+import sys
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TESTS_DIR, '..', 'src')
+MIGRATIONS_DIR = os.path.join(TESTS_DIR, '..', '..', 'database', 'migrations')
+
+sys.path.insert(0, SRC_DIR)
+
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason='TEST_DATABASE_URL is not set')
+
+# Enough vacations that vacation_id is selective, each with enough rows that
+# sorting one would cost more than walking the index
+VACATIONS = 200
+ROWS_PER_VACATION = 500
+ITINERARIES_PER_VACATION = 20
+USER_ID = 'plan-test-user'
+
+INDEX_SCANS = ('Index Scan', 'Index Only Scan', 'Bitmap Index Scan')
+
+
+@pytest.fixture(scope='module')
+def database(monkeypatch_module):
+    """Migrated test database, with the app's connection pointed at it"""
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+    from utils import database as db
+    from utils.migrations import apply_migrations
+
+    conn = psycopg2.connect(TEST_DATABASE_URL)
+    apply_migrations(conn, MIGRATIONS_DIR)
+    conn.close()
+
+    db.close_db_connection()
+    monkeypatch_module.setattr(db, '_open_connection',
+                               lambda: psycopg2.connect(TEST_DATABASE_URL, cursor_factory=RealDictCursor))
+    monkeypatch_module.setattr(db, 'PREPARED_STATEMENTS', True)
+
+    yield db
+
+    db.close_db_connection()
+
+
+@pytest.fixture(scope='module')
+def monkeypatch_module():
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        yield monkeypatch
+
+
+@pytest.fixture(scope='module')
+def seeded(database):
+    """Vacations of the same size; the test user belongs to every one"""
+    import psycopg2
+
+    conn = psycopg2.connect(TEST_DATABASE_URL)
+    cursor = conn.cursor()
+    vacation_ids = [str(uuid.uuid4()) for _ in range(VACATIONS)]
+    itinerary_ids = [str(uuid.uuid4()) for _ in range(VACATIONS)]
+
+    _seed(cursor, vacation_ids, itinerary_ids)
+    cursor.execute('ANALYZE')
+    conn.commit()
+
+    yield {'vacation_id': vacation_ids[0], 'itinerary_id': itinerary_ids[0]}
+
+    cursor.execute('DELETE FROM vacations WHERE id = ANY(%s::uuid[])', (vacation_ids,))
+    conn.commit()
+    conn.close()
+
+
+def _seed(cursor, vacation_ids, itinerary_ids) -> None:
+    """Insert the vacations with rows of each kind the list endpoints read"""
+    start = date(2026, 6, 1)
+    cursor.execute(
+        """INSERT INTO vacations (id, name, location, start_date, end_date, created_by)
+           SELECT v, 'Plan test', 'Nowhere', %s, %s, %s FROM unnest(%s::uuid[]) v""",
+        (start, start + timedelta(days=41), USER_ID, vacation_ids)
+    )
+    cursor.execute(
+        """INSERT INTO vacation_members (vacation_id, user_id, role)
+           SELECT v, %s, 'owner' FROM unnest(%s::uuid[]) v""",
+        (USER_ID, vacation_ids)
+    )
+    rows = "unnest(%s::uuid[]) v CROSS JOIN generate_series(1, %s) g"
+    cursor.execute(
+        f"""INSERT INTO events (vacation_id, title, event_date, event_time, created_by)
+            SELECT v, 'Event ' || g, %s + (g %% 42), time '08:00' + (g %% 48) * interval '15 minutes', %s
+            FROM {rows}""",
+        (start, USER_ID, vacation_ids, ROWS_PER_VACATION)
+    )
+    cursor.execute(
+        f"""INSERT INTO chat_messages (vacation_id, user_id, message)
+            SELECT v, %s, 'Message ' || g FROM {rows}""",
+        (USER_ID, vacation_ids, ROWS_PER_VACATION)
+    )
+    cursor.execute(
+        f"""INSERT INTO packing_items (vacation_id, item_name, category, quantity, added_by)
+            SELECT v, 'Item ' || g, 'Category ' || (g %% 12), 1, %s FROM {rows}""",
+        (USER_ID, vacation_ids, ROWS_PER_VACATION)
+    )
+    cursor.execute(
+        f"""INSERT INTO photos (vacation_id, uploaded_by, s3_key, s3_bucket, status, uploaded_at)
+            SELECT v, %s, 'vacations/' || v || '/photos/' || g, 'bucket', 'ready',
+                   now() - g * interval '1 minute'
+            FROM {rows}""",
+        (USER_ID, vacation_ids, ROWS_PER_VACATION)
+    )
+    # The test user's itinerary, and other members' so the table isn't tiny
+    cursor.execute(
+        """INSERT INTO itineraries (id, vacation_id, user_id, title)
+           SELECT i, v, %s, 'Mine' FROM unnest(%s::uuid[], %s::uuid[]) AS t(v, i)""",
+        (USER_ID, vacation_ids, itinerary_ids)
+    )
+    cursor.execute(
+        f"""INSERT INTO itineraries (vacation_id, user_id, title)
+            SELECT v, 'member-' || g, 'Theirs' FROM {rows}""",
+        (vacation_ids, ITINERARIES_PER_VACATION)
+    )
+    cursor.execute(
+        f"""INSERT INTO itinerary_items (itinerary_id, item_type, custom_title, scheduled_date,
+                                         scheduled_time, display_order)
+            SELECT v, 'custom', 'Item ' || g, %s + (g %% 42), time '09:00', g
+            FROM {rows}""",
+        (start, itinerary_ids, ROWS_PER_VACATION)
+    )
+
+
+@pytest.fixture
+def captured(database, monkeypatch):
+    """(query, params) of every statement the app runs during a test"""
+    statements = []
+    execute = database._execute
+
+    def capture(cursor, query, params):
+        statements.append((query, params))
+        return execute(cursor, query, params)
+
+    monkeypatch.setattr(database, '_execute', capture)
+    return statements
+
+
+def _call(handler, path_parameters, query=None):
+    """Run a handler the way the router does, in a unit of work"""
+    from utils.database import unit_of_work
+
+    event = {
+        'user': {'user_id': USER_ID},
+        'path_parameters': path_parameters,
+        'queryStringParameters': query or {},
+        'headers': {},
+        'body_json': {},
+    }
+    with unit_of_work() as work:
+        response = handler(event)
+        work.rollback_only = True
+    return response
+
+
+def _index_scans(plan):
+    """(node type, index name) of every index scan in an EXPLAIN plan tree"""
+    scans = []
+    if plan.get('Node Type') in INDEX_SCANS:
+        scans.append((plan['Node Type'], plan.get('Index Name')))
+    for child in plan.get('Plans', []):
+        scans.extend(_index_scans(child))
+    return scans
+
+
+def _plans(statements, table):
+    """
+    (label, EXPLAIN plan) of the captured statements that read table
+
+    Each statement is explained twice: with its parameters inlined, and as
+    the prepared statement the app runs it as. Postgres may switch a
+    prepared statement to a generic plan, made without the parameter
+    values, after five executions; plan_cache_mode = force_generic_plan
+    gets that plan straight away.
+    """
+    import psycopg2
+    from utils.database import _to_positional
+
+    conn = psycopg2.connect(TEST_DATABASE_URL)
+    try:
+        cursor = conn.cursor()
+        cursor.execute('SET plan_cache_mode = force_generic_plan')
+        plans = []
+        for index, (query, params) in enumerate(statements):
+            if table not in query:
+                continue
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + query, params)
+            plans.append(('custom plan', cursor.fetchone()[0][0]['Plan']))
+
+            positional, count = _to_positional(query)
+            if positional is None or isinstance(params, dict):
+                continue
+            name = f'plan_test_{index}'
+            cursor.execute(f'PREPARE {name} AS {positional}')
+            arguments = f"({', '.join(['%s'] * count)})" if count else ''
+            cursor.execute(f'EXPLAIN (FORMAT JSON) EXECUTE {name}{arguments}', params)
+            plans.append(('generic plan', cursor.fetchone()[0][0]['Plan']))
+        return plans
+    finally:
+        conn.rollback()
+        conn.close()
+
+
+def assert_uses_index(statements, table, index_name, ordered=True):
+    """
+    Every captured statement reading table scans it through index_name
+
+    A paged read must walk the index in order (an Index or Index Only Scan);
+    one that reads every row of the vacation anyway may use a bitmap scan.
+    """
+    plans = _plans(statements, table)
+    assert any(label == 'generic plan' for label, _ in plans), f'no prepared statement read {table}'
+    for label, plan in plans:
+        scans = _index_scans(plan)
+        matches = [
+            node_type for node_type, name in scans
+            if name == index_name and (not ordered or node_type != 'Bitmap Index Scan')
+        ]
+        assert matches, f'{table} not read through {index_name} ({label}): {scans}'
+
+
+def _next_cursor(response):
+    return json.loads(response['body'])['next_cursor']
+
+
+def test_list_events_pages_through_schedule_index(seeded, captured):
+    from controllers.events import list_events
+
+    path = {'vacation_id': seeded['vacation_id']}
+    response = _call(list_events, path, {'limit': '50'})
+    assert response['statusCode'] == 200
+    _call(list_events, path, {'limit': '50', 'cursor': _next_cursor(response)})
+
+    assert_uses_index(captured, 'events', 'idx_events_vacation_schedule')
+
+
+def test_list_messages_pages_through_seq_index(seeded, captured):
+    from controllers.chat import list_messages
+
+    path = {'vacation_id': seeded['vacation_id']}
+    response = _call(list_messages, path, {'limit': '50'})
+    assert response['statusCode'] == 200
+    _call(list_messages, path, {'limit': '50', 'cursor': _next_cursor(response)})
+    _call(list_messages, path, {'since': '', 'limit': '50'})
+
+    assert_uses_index(captured, 'chat_messages', 'idx_chat_messages_vacation_seq')
+
+
+def test_list_photos_pages_through_uploaded_index(seeded, captured, monkeypatch):
+    from controllers import photos
+
+    # Only the query matters here, not the signed URLs
+    monkeypatch.setattr(photos, '_signed_urls', lambda bucket, key, thumbnail_key: {})
+
+    response = _call(photos.list_photos, {'vacation_id': seeded['vacation_id']}, {'limit': '50'})
+    assert response['statusCode'] == 200
+
+    assert_uses_index(captured, 'photos', 'idx_photos_vacation_uploaded')
+
+
+def test_packing_list_reads_category_index(seeded, captured):
+    from controllers.packing import get_packing_list
+
+    response = _call(get_packing_list, {'vacation_id': seeded['vacation_id']})
+    assert response['statusCode'] == 200
+
+    assert_uses_index(captured, 'packing_items', 'idx_packing_items_vacation_category', ordered=False)
+
+
+def test_itinerary_reads_itinerary_indexes(seeded, captured):
+    from controllers.itinerary import get_itinerary
+
+    response = _call(get_itinerary, {'vacation_id': seeded['vacation_id']},
+                     {'from': '2026-06-01', 'to': '2026-06-07'})
+    assert response['statusCode'] == 200
+
+    statements = [(query, params) for query, params in captured if 'FROM itineraries' in query]
+    assert_uses_index(statements, 'itineraries', 'idx_itineraries_vacation_user', ordered=False)
+    assert_uses_index(captured, 'itinerary_items', 'idx_itinerary_items_schedule', ordered=False)
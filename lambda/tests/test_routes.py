@@ -0,0 +1,68 @@
+"""
+Router tests
+
+Checks how the segment tree resolves paths where a static and a
+parameterized route sit at the same depth, using routes of its own next to
+the app's. No database is needed.
+
+Usage:
+    python -m pytest lambda/tests/test_routes.py
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TESTS_DIR, '..', 'src')
+
+sys.path.insert(0, SRC_DIR)
+
+from routes import Router  # noqa: E402
+
+
+def _handler(name):
+    return lambda event: {'statusCode': 200, 'handler': name, 'params': event['path_parameters']}
+
+
+@pytest.fixture
+def router():
+    router = Router()
+    router.add_route('POST /widgets/{widget_id}/parts/bulk', _handler('bulk_create'))
+    router.add_route('PUT /widgets/{widget_id}/parts/bulk', _handler('bulk_update'))
+    router.add_route('PUT /widgets/{widget_id}/parts/{part_id}', _handler('update'))
+    router.add_route('DELETE /widgets/{widget_id}/parts/{part_id}', _handler('delete'))
+    return router
+
+
+def test_static_segment_wins_when_it_has_the_method(router):
+    response = router.route('PUT', '/widgets/w1/parts/bulk', {})
+    assert response['handler'] == 'bulk_update'
+    assert response['params'] == {'widget_id': 'w1'}
+
+
+def test_parameter_branch_handles_methods_the_static_segment_lacks(router):
+    response = router.route('DELETE', '/widgets/w1/parts/bulk', {})
+    assert response['handler'] == 'delete'
+    assert response['params'] == {'widget_id': 'w1', 'part_id': 'bulk'}
+
+
+def test_parameter_branch_matches_other_values(router):
+    response = router.route('PUT', '/widgets/w1/parts/p1', {})
+    assert response['handler'] == 'update'
+    assert response['params'] == {'widget_id': 'w1', 'part_id': 'p1'}
+
+
+def test_method_no_route_handles_is_405_listing_every_match(router):
+    response = router.route('GET', '/widgets/w1/parts/bulk', {})
+    assert response['statusCode'] == 405
+    assert response['headers']['Allow'] == 'DELETE, POST, PUT'
+
+
+def test_unknown_path_is_404(router):
+    response = router.route('GET', '/widgets/w1/unknown', {})
+    assert response['statusCode'] == 404
+    assert json.loads(response['body'])['error'] == 'Route not found'
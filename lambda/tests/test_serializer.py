@@ -0,0 +1,78 @@
+"""
+Serializer tests
+
+Checks that every available serializer writes database values the same
+way, and that a Decimal column is a JSON number whatever its value. No
+database is needed.
+
+Usage:
+    python -m pytest lambda/tests/test_serializer.py
+"""
+
+import json
+import os
+import sys
+import uuid
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+
+import pytest
+
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TESTS_DIR, '..', 'src')
+
+sys.path.insert(0, SRC_DIR)
+
+from utils import serializer  # noqa: E402
+
+
+SERIALIZERS = sorted(serializer.SERIALIZERS.items())
+
+
+@pytest.mark.parametrize('name, dumps', SERIALIZERS)
+@pytest.mark.parametrize('value, expected', [
+    # Every DECIMAL(10, 2) and DECIMAL(2, 1) value round-trips through a float
+    (Decimal('149.99'), 149.99),
+    (Decimal('99999999.99'), 99999999.99),
+    (Decimal('-0.01'), -0.01),
+    (Decimal('4.5'), 4.5),
+    (Decimal('0E-2'), 0.0),
+    # More digits than a float holds: still a number, never a string
+    (Decimal('0.1000000000000000055511151231257827'), 0.1),
+    (Decimal('12345678901234567890.12'), 12345678901234567890.12),
+])
+def test_decimal_is_always_a_number(name, dumps, value, expected):
+    encoded = json.loads(dumps({'cost': value}))['cost']
+    assert type(encoded) is float
+    assert encoded == expected
+
+
+@pytest.mark.parametrize('name, dumps', SERIALIZERS)
+@pytest.mark.parametrize('value', [Decimal('NaN'), Decimal('Infinity'), Decimal('-Infinity')])
+def test_non_finite_decimal_is_null(name, dumps, value):
+    assert json.loads(dumps({'cost': value})) == {'cost': None}
+
+
+def test_serializers_agree_on_a_row():
+    row = {
+        'id': uuid.UUID('6f1c2a52-3c4b-4d7e-9a61-0f2b8c1d9e57'),
+        'start_date': date(2026, 1, 1),
+        'start_time': time(9, 30),
+        'created_at': datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc),
+        'cost': Decimal('149.99'),
+        'rating': Decimal('4.7'),
+        'tags': {'beach'},
+    }
+
+    outputs = {name: json.loads(dumps(row)) for name, dumps in SERIALIZERS}
+    assert outputs['stdlib'] == {
+        'id': '6f1c2a52-3c4b-4d7e-9a61-0f2b8c1d9e57',
+        'start_date': '2026-01-01',
+        'start_time': '09:30:00',
+        'created_at': '2026-01-01T12:00:00+00:00',
+        'cost': 149.99,
+        'rating': 4.7,
+        'tags': ['beach'],
+    }
+    assert all(output == outputs['stdlib'] for output in outputs.values())
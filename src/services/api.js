@@ -39,6 +39,7 @@ api.interceptors.response.use(
 export const vacationAPI = {
   getAll: () => api.get('/vacations'),
   getOne: (id) => api.get(`/vacations/${id}`),
+  getSnapshot: (id) => api.get(`/vacations/${id}/snapshot`),
   create: (data) => api.post('/vacations', data),
   update: (id, data) => api.put(`/vacations/${id}`, data),
   delete: (id) => api.delete(`/vacations/${id}`),
@@ -50,6 +51,8 @@ export const eventsAPI = {
   create: (vacationId, data) => api.post(`/vacations/${vacationId}/events`, data),
   update: (vacationId, eventId, data) => api.put(`/vacations/${vacationId}/events/${eventId}`, data),
   delete: (vacationId, eventId) => api.delete(`/vacations/${vacationId}/events/${eventId}`),
+  bulkCreate: (vacationId, items, atomic = false) => api.post(`/vacations/${vacationId}/events/bulk`, { items, atomic }),
+  bulkUpdate: (vacationId, items, atomic = false) => api.put(`/vacations/${vacationId}/events/bulk`, { items, atomic }),
 };
 
 // Excursions API
@@ -70,14 +73,37 @@ export const membersAPI = {
 // Photos API
 export const photosAPI = {
   getAll: (vacationId) => api.get(`/vacations/${vacationId}/photos`),
+  // data: { mime_type, file_size, file_name, caption }; returns the pending
+  // photo plus presigned URLs to send the bytes to with sendToS3()
   upload: (vacationId, data) => api.post(`/vacations/${vacationId}/photos`, data),
+  completeUpload: (vacationId, photoId, parts) =>
+    api.post(`/vacations/${vacationId}/photos/${photoId}/complete`, { parts }),
+  // Plain axios: S3 rejects the API's Authorization header
+  sendToS3: async (vacationId, { photo, upload }, blob) => {
+    if (!upload.multipart) {
+      return axios.put(upload.url, blob, { headers: upload.headers });
+    }
+    const parts = [];
+    for (const part of upload.parts) {
+      const start = (part.part_number - 1) * upload.part_size;
+      const response = await axios.put(part.url, blob.slice(start, start + upload.part_size));
+      parts.push({ part_number: part.part_number, etag: response.headers.etag });
+    }
+    return photosAPI.completeUpload(vacationId, photo.id, parts);
+  },
   delete: (vacationId, photoId) => api.delete(`/vacations/${vacationId}/photos/${photoId}`),
   getUrl: (vacationId, photoId) => api.get(`/vacations/${vacationId}/photos/${photoId}/url`),
+  // Fresh URLs for up to 200 photos, keyed by photo ID
+  getUrls: (vacationId, photoIds) =>
+    api.post(`/vacations/${vacationId}/photos/urls`, { photo_ids: photoIds }),
 };
 
 // Chat API
 export const chatAPI = {
-  getMessages: (vacationId) => api.get(`/vacations/${vacationId}/messages`),
+  getMessages: (vacationId, params = {}) => api.get(`/vacations/${vacationId}/messages`, { params }),
+  // Messages posted after a `since` token; waits up to `wait` seconds for one
+  poll: (vacationId, since, wait = 20) =>
+    api.get(`/vacations/${vacationId}/messages`, { params: { since: since || '', wait } }),
   sendMessage: (vacationId, message) => api.post(`/vacations/${vacationId}/messages`, { message }),
   deleteMessage: (vacationId, messageId) => api.delete(`/vacations/${vacationId}/messages/${messageId}`),
 };
@@ -88,18 +114,81 @@ export const packingAPI = {
   addItem: (vacationId, data) => api.post(`/vacations/${vacationId}/packing`, data),
   updateItem: (vacationId, itemId, data) => api.put(`/vacations/${vacationId}/packing/${itemId}`, data),
   deleteItem: (vacationId, itemId) => api.delete(`/vacations/${vacationId}/packing/${itemId}`),
+  bulkAdd: (vacationId, items, atomic = false) => api.post(`/vacations/${vacationId}/packing/bulk`, { items, atomic }),
+  bulkUpdate: (vacationId, items, atomic = false) => api.put(`/vacations/${vacationId}/packing/bulk`, { items, atomic }),
+  // Check and uncheck items in one request: { packed: [...ids], unpacked: [...ids] }
+  setPacked: (vacationId, changes) => api.put(`/vacations/${vacationId}/packing/packed`, changes),
+  // Record a checkbox tap; taps within PACKED_FLUSH_MS are sent as one setPacked
+  queuePacked: (vacationId, itemId, isPacked) => queuePacked(vacationId, itemId, isPacked),
+  getTemplates: (vacationId) => api.get(`/vacations/${vacationId}/packing/templates`),
+  // options: { days, skip_existing }
+  applyTemplate: (vacationId, templateId, options = {}) =>
+    api.post(`/vacations/${vacationId}/packing/templates/${templateId}`, options),
 };
 
+const PACKED_FLUSH_MS = 500;
+let pendingPacked = null;
+
+// Taps are collected per vacation, the last tap on an item winning, and
+// flushed together once the user pauses
+function queuePacked(vacationId, itemId, isPacked) {
+  if (pendingPacked && pendingPacked.vacationId !== vacationId) {
+    flushPacked();
+  }
+  if (!pendingPacked) {
+    let resolve;
+    let reject;
+    const promise = new Promise((res, rej) => {
+      resolve = res;
+      reject = rej;
+    });
+    pendingPacked = { vacationId, states: new Map(), timer: null, promise, resolve, reject };
+  }
+
+  pendingPacked.states.set(itemId, isPacked);
+  clearTimeout(pendingPacked.timer);
+  pendingPacked.timer = setTimeout(flushPacked, PACKED_FLUSH_MS);
+  return pendingPacked.promise;
+}
+
+function flushPacked() {
+  const batch = pendingPacked;
+  pendingPacked = null;
+  clearTimeout(batch.timer);
+
+  const packed = [];
+  const unpacked = [];
+  batch.states.forEach((isPacked, itemId) => (isPacked ? packed : unpacked).push(itemId));
+
+  packingAPI.setPacked(batch.vacationId, { packed, unpacked }).then(batch.resolve, batch.reject);
+}
+
 // Itinerary API
 export const itineraryAPI = {
-  get: (vacationId) => api.get(`/vacations/${vacationId}/itinerary`),
+  // Day-by-day timeline; params: { from, to, itinerary_id }
+  get: (vacationId, params = {}) => api.get(`/vacations/${vacationId}/itinerary`, { params }),
   create: (vacationId, data) => api.post(`/vacations/${vacationId}/itinerary`, data),
   update: (vacationId, itineraryId, data) => api.put(`/vacations/${vacationId}/itinerary/${itineraryId}`, data),
+  bulkAddItems: (vacationId, itineraryId, items, atomic = false) =>
+    api.post(`/vacations/${vacationId}/itinerary/${itineraryId}/items/bulk`, { items, atomic }),
+  bulkUpdateItems: (vacationId, itineraryId, items, atomic = false) =>
+    api.put(`/vacations/${vacationId}/itinerary/${itineraryId}/items/bulk`, { items, atomic }),
+  // itemIds in their new display order
+  reorderItems: (vacationId, itineraryId, itemIds) =>
+    api.put(`/vacations/${vacationId}/itinerary/${itineraryId}/items/order`, { item_ids: itemIds }),
 };
 
 // Recommendations API
 export const recommendationsAPI = {
-  get: (vacationId) => api.get(`/vacations/${vacationId}/recommendations`),
+  // params: { category: 'restaurant,activity', limit, cursor }; `refreshing`
+  // in the response means a newer set is being computed
+  get: (vacationId, params = {}) => api.get(`/vacations/${vacationId}/recommendations`, { params }),
+};
+
+// Batch API - runs several requests in one call
+// requests: [{ method, path, body, query, headers }]
+export const batchAPI = {
+  run: (requests, { atomic = false } = {}) => api.post('/batch', { requests, atomic }),
 };
 
 export default api;